@@ -1,98 +1,238 @@
-from typing import List
-from langgraph.graph import StateGraph
-from langchain_core.messages import HumanMessage, BaseMessage
+import uuid
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator, List, Optional
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.messages import AIMessageChunk, HumanMessage, BaseMessage
 
 from state import MarketAnalysisState
+from memory import ConversationMemory
+from sessions import session_store
+from feed import market_feed
+from prefetch import prefetcher
+from config import settings
 from nodes import (
     intent_classifier_node,
     fetch_market_data_node,
+    afetch_market_data_node,
     calculate_secret_indicator_node,
+    screen_universe_node,
+    ascreen_universe_node,
     response_node,
+    aresponse_node,
     error_response_node,
+    compact_memory_node,
     determine_next_node
 )
 
-def create_market_analysis_agent():
+if TYPE_CHECKING:
+    from langgraph.graph.state import CompiledStateGraph
+
+# Where each branching node can go next, keyed by the `next_node` it sets
+# (see determine_next_node); built once at import, shared by every compile
+ROUTES: Dict[str, Dict[str, str]] = {
+    node: {target: target for target in targets}
+    for node, targets in {
+        # Greetings are answered by the classifier itself
+        "intent_classifier": ("fetch_market_data", "screen_universe", "response", "error_response", "compact_memory"),
+        "fetch_market_data": ("calculate_secret_indicator", "error_response"),
+        "calculate_secret_indicator": ("response", "error_response"),
+        "screen_universe": ("response", "error_response")
+    }.items()
+}
+
+def create_market_analysis_agent(checkpointer: Optional[BaseCheckpointSaver] = None) -> "CompiledStateGraph":
     """
     Creates and compiles the market analysis agent with LangGraph.
+    Turns enter at the intent classifier with their per-turn fields already
+    reset by the caller (initial_turn_state). Greetings go straight on to
+    memory compaction; indicator turns run fetch -> score -> respond.
+    I/O-bound nodes carry an async variant, so the compiled graph runs
+    natively on an event loop under `ainvoke`. With a checkpointer, the
+    conversation of each `thread_id` is kept between turns.
     """
-    
-    def initial_state_modifier(state: MarketAnalysisState) -> MarketAnalysisState:
-        """Initialize state with default values."""
-        return {
-            "messages": [],
-            "market_data_cache": {},
-            "current_symbol": "",
-            "secret_indicator_result": 0.0,
-            "intent": "",
-            "next_node": "",
-            "error_message": ""
-        }
+    # Deferred with compilation itself: the graph runtime is the bulk of import time
+    from langgraph.graph import StateGraph
     
     workflow = StateGraph(MarketAnalysisState)
     
-    workflow.add_node("state_modifier", initial_state_modifier)
     workflow.add_node("intent_classifier", intent_classifier_node)
-    workflow.add_node("response", response_node)
+    workflow.add_node("fetch_market_data", RunnableLambda(fetch_market_data_node, afunc=afetch_market_data_node))
+    workflow.add_node("calculate_secret_indicator", calculate_secret_indicator_node)
+    workflow.add_node("screen_universe", RunnableLambda(screen_universe_node, afunc=ascreen_universe_node))
+    workflow.add_node("response", RunnableLambda(response_node, afunc=aresponse_node))
     workflow.add_node("error_response", error_response_node)
+    workflow.add_node("compact_memory", compact_memory_node)
     
-    workflow.set_entry_point("state_modifier")
+    workflow.set_entry_point("intent_classifier")
     
-    workflow.add_edge("state_modifier", "intent_classifier")
+    for node, routes in ROUTES.items():
+        workflow.add_conditional_edges(node, determine_next_node, routes)
+
+    workflow.add_edge("response", "compact_memory")
+    workflow.add_edge("error_response", "compact_memory")
+    workflow.add_edge("compact_memory", "__end__")
     
-    workflow.add_conditional_edges(
-        "intent_classifier",
-        determine_next_node,
-        {
-            "response": "response",
-            "error_response": "error_response"
-        }
-    )
+    return workflow.compile(checkpointer=checkpointer)
+
+@lru_cache(maxsize=None)
+def get_market_analysis_agent() -> "CompiledStateGraph":
+    """
+    The process-wide compiled agent. Every chat session shares it; sessions
+    are told apart by `thread_id` and persisted in the session store.
+    Starts the background market feed when MARKET_FEED_ENABLED is set, and
+    the hot-symbol prefetcher when PREFETCH_ENABLED is.
+    """
+    if settings.MARKET_FEED_ENABLED:
+        market_feed.start()
+    if settings.PREFETCH_ENABLED:
+        prefetcher.start()
+    return create_market_analysis_agent(checkpointer=session_store)
+
+def initial_turn_state(user_input: str) -> MarketAnalysisState:
+    """
+    Graph input for one turn: the new message and the per-turn fields reset.
+    Sessions keep their history in the checkpointer. The market data channel
+    starts empty: the fetch node fills in just the symbols the turn asks for.
+    """
+    return {
+        "messages": [HumanMessage(content=user_input)],
+        "market_data_cache": {},
+        "current_symbol": "",
+        "symbols": [],
+        "stale_symbols": [],
+        "secret_indicator_result": 0.0,
+        "indicator_results": {},
+        "indicator_ema": {},
+        "window": 0,
+        "window_points": {},
+        "top_k": 0,
+        "screen_results": {},
+        "intent": "",
+        "next_node": "",
+        "error_message": ""
+    }
 
+class _StreamingTurn:
+    """
+    Turns a graph stream (messages + updates modes) into reply text chunks.
+    """
     
-    workflow.add_edge("response", "__end__")
-    workflow.add_edge("error_response", "__end__")
+    def __init__(self):
+        self.streamed = False
+        self.reply: Optional[BaseMessage] = None
     
-    return workflow.compile()
+    def feed(self, mode: str, payload: Any) -> Optional[str]:
+        if mode == "messages":
+            message, metadata = payload
+            if (isinstance(message, AIMessageChunk) and message.content
+                    and metadata.get("langgraph_node") == "response"):
+                self.streamed = True
+                return message.content
+        elif mode == "updates":
+            for node, update in payload.items():
+                # Greetings are answered by the classifier, the rest by a response node
+                if node in ("intent_classifier", "response", "error_response") and update and update.get("messages"):
+                    self.reply = update["messages"][-1]
+        return None
+    
+    def finish(self) -> Iterator[str]:
+        if self.reply is None:
+            yield "I apologize, but I couldn't process your request. Please try again."
+            return
+        if not self.streamed:
+            yield self.reply.content
 
 class MarketAnalysisChat:
     """
     Chat interface for the market analysis agent that maintains conversation history.
+    
+    The history lives in the shared session store under `session_id`, so
+    each turn sends only the new message, and a chat can be picked up again
+    by creating a new MarketAnalysisChat with the same `session_id`.
     """
     
-    def __init__(self):
-        self.agent = create_market_analysis_agent()
-        self.conversation_history: List[BaseMessage] = []
+    def __init__(self, session_id: Optional[str] = None, memory: Optional[ConversationMemory] = None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.memory = memory
+        self.config: RunnableConfig = {"configurable": {"thread_id": self.session_id}}
+        if memory is not None:
+            self.config["configurable"]["memory"] = memory
+    
+    @property
+    def agent(self) -> "CompiledStateGraph":
+        """The shared compiled graph, built on the first turn rather than on import or construction."""
+        return get_market_analysis_agent()
+    
+    def _values(self) -> MarketAnalysisState:
+        return self.agent.get_state(self.config).values
+    
+    @property
+    def conversation_history(self) -> List[BaseMessage]:
+        """Messages currently inside the memory window."""
+        return list(self._values().get("messages", []))
+    
+    @property
+    def summary(self) -> str:
+        """Running summary of the turns that left the memory window."""
+        return self._values().get("summary", "")
+    
+    def _start_turn(self, user_input: str) -> MarketAnalysisState:
+        return initial_turn_state(user_input)
+    
+    def _finish_turn(self, result: MarketAnalysisState) -> str:
+        if result["messages"]:
+            return result["messages"][-1].content
+        else:
+            return "I apologize, but I couldn't process your request. Please try again."
     
     def chat(self, user_input: str) -> str:
         """
         Process user input and return agent response while maintaining chat history.
         """
-        user_message = HumanMessage(content=user_input)
-        self.conversation_history.append(user_message)
-        
-        initial_state = {
-            "messages": self.conversation_history.copy(),
-            "market_data_cache": {},
-            "current_symbol": "",
-            "secret_indicator_result": 0.0,
-            "intent": "",
-            "next_node": "",
-            "error_message": ""
-        }
-        
-        result = self.agent.invoke(initial_state)
-        
-        if result["messages"]:
-            response_message = result["messages"][-1]
-            self.conversation_history.append(response_message)
-            return response_message.content
-        else:
-            return "I apologize, but I couldn't process your request. Please try again."
+        initial_state = self._start_turn(user_input)
+        result = self.agent.invoke(initial_state, self.config)
+        return self._finish_turn(result)
+    
+    async def achat(self, user_input: str) -> str:
+        """
+        Async variant of `chat` that drives the graph with `ainvoke`, so many
+        sessions can overlap their I/O waits on one event loop.
+        """
+        initial_state = self._start_turn(user_input)
+        result = await self.agent.ainvoke(initial_state, self.config)
+        return self._finish_turn(result)
+    
+    def chat_stream(self, user_input: str) -> Iterator[str]:
+        """
+        Streaming variant of `chat`. Yields LLM tokens from the response node
+        as they arrive; templated replies (greeting, indicator report, errors)
+        are yielded in one piece as soon as they are ready.
+        """
+        initial_state = self._start_turn(user_input)
+        turn = _StreamingTurn()
+        for mode, payload in self.agent.stream(initial_state, self.config, stream_mode=["messages", "updates"]):
+            chunk = turn.feed(mode, payload)
+            if chunk:
+                yield chunk
+        yield from turn.finish()
+    
+    async def achat_stream(self, user_input: str) -> AsyncIterator[str]:
+        """
+        Async variant of `chat_stream` built on `astream`.
+        """
+        initial_state = self._start_turn(user_input)
+        turn = _StreamingTurn()
+        async for mode, payload in self.agent.astream(initial_state, self.config, stream_mode=["messages", "updates"]):
+            chunk = turn.feed(mode, payload)
+            if chunk:
+                yield chunk
+        for chunk in turn.finish():
+            yield chunk
     
     def reset_conversation(self):
         """Reset the conversation history."""
-        self.conversation_history = []
+        session_store.delete_thread(self.session_id)
 
 if __name__ == "__main__":
     chat = MarketAnalysisChat()
@@ -109,5 +249,7 @@ if __name__ == "__main__":
             break
             
         if user_input:
-            response = chat.chat(user_input)
-            print(f"\nAgent: {response}") 
\ No newline at end of file
+            print("\nAgent: ", end="", flush=True)
+            for chunk in chat.chat_stream(user_input):
+                print(chunk, end="", flush=True)
+            print() 
\ No newline at end of file
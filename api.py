@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Async HTTP chat service for the market analysis agent.
+
+    python api.py
+    # or
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+Every request runs under a deadline (API_REQUEST_TIMEOUT, 504 when it
+expires) and takes one of API_MAX_CONCURRENCY slots; when all slots are
+busy the request is rejected straight away with 429 instead of queueing.
+Turns of the same session run one at a time, in arrival order. On shutdown
+uvicorn stops accepting connections and gives in-flight turns up to
+API_DRAIN_TIMEOUT to finish (`python api.py` sets this; pass
+--timeout-graceful-shutdown when starting uvicorn directly).
+
+Sessions live in the process-wide session store, so when running several
+workers, route requests for the same session_id to the same worker
+(sticky routing on the session_id) or point them at a shared SESSION_DB.
+"""
+
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from agent import MarketAnalysisChat
+from config import settings
+from llm_clients import llm_clients
+from metrics import metrics
+from prefetch import prefetcher
+from sessions import session_store
+
+class ChatRequest(BaseModel):
+    message: str
+    session_id: Optional[str] = None
+
+class ChatResponse(BaseModel):
+    response: str
+    session_id: str
+
+class Overloaded(Exception):
+    """Raised when every concurrency slot is busy; answered with 429."""
+
+class ChatService:
+    """
+    Admission control and session affinity in front of MarketAnalysisChat.
+
+    Runs on a single event loop: the in-flight counter and per-session
+    locks are only touched from that loop.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        request_timeout: Optional[float] = None
+    ):
+        self.max_concurrency = max_concurrency if max_concurrency is not None else settings.API_MAX_CONCURRENCY
+        self.request_timeout = request_timeout if request_timeout is not None else settings.API_REQUEST_TIMEOUT
+        self.in_flight = 0
+        # session_id -> (lock, number of requests holding or waiting for it)
+        self._session_locks: Dict[str, list] = {}
+        self.served = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _admit(self) -> None:
+        if self.in_flight >= self.max_concurrency:
+            self.rejected += 1
+            raise Overloaded("Too many concurrent requests")
+        self.in_flight += 1
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def _session(self, session_id: str):
+        """Serializes turns of one session; the lock is dropped once nobody holds or awaits it."""
+        entry = self._session_locks.get(session_id)
+        if entry is None:
+            entry = self._session_locks[session_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._session_locks[session_id]
+
+    async def _turn(self, chat: MarketAnalysisChat, message: str) -> str:
+        async with self._session(chat.session_id):
+            return await chat.achat(message)
+
+    async def chat(self, message: str, session_id: Optional[str] = None) -> ChatResponse:
+        """
+        Runs one turn under the request deadline. Raises Overloaded when
+        the request isn't admitted and asyncio.TimeoutError
+        when the deadline expires.
+        """
+        self._admit()
+        try:
+            chat = MarketAnalysisChat(session_id=session_id or uuid.uuid4().hex)
+            try:
+                response = await asyncio.wait_for(self._turn(chat, message), self.request_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise
+            self.served += 1
+            return ChatResponse(response=response, session_id=chat.session_id)
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "served": self.served,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "sessions": session_store.stats(),
+            "prefetch": prefetcher.stats()
+        }
+
+def create_app(service: Optional[ChatService] = None) -> FastAPI:
+    """Builds the FastAPI app around `service` (a default ChatService if omitted)."""
+    service = service if service is not None else ChatService()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await llm_clients.aclose()
+
+    app = FastAPI(title="Market Analysis Agent", lifespan=lifespan)
+    app.state.service = service
+
+    @app.post("/chat", response_model=ChatResponse)
+    async def chat(request: ChatRequest) -> ChatResponse:
+        try:
+            return await service.chat(request.message, request.session_id)
+        except Overloaded as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Request timed out")
+
+    @app.delete("/sessions/{session_id}", status_code=204)
+    async def reset_session(session_id: str) -> None:
+        MarketAnalysisChat(session_id=session_id).reset_conversation()
+
+    @app.get("/health")
+    async def health() -> Dict[str, object]:
+        return service.stats()
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def prometheus_metrics() -> PlainTextResponse:
+        return PlainTextResponse(metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/metrics.json")
+    async def json_metrics() -> Dict[str, object]:
+        return metrics.to_dict()
+
+    return app
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        app,
+        host=settings.API_HOST,
+        port=settings.API_PORT,
+        timeout_graceful_shutdown=int(settings.API_DRAIN_TIMEOUT)
+    )
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Offline bulk processing of prerecorded user messages, e.g. for evaluations
+and nightly reports.
+
+    python batch.py messages.jsonl results.jsonl --workers 32
+
+Every input line is one message, answered as an independent single turn.
+The text is the first of "message", "text", "content", "input" or "body"
+(or --field), the id is "id" or "request_id" (the line number otherwise).
+Each output line is {"id", "line", "intent", "response"}, with "error" in
+place of "response" for turns that failed, in input order.
+
+The input is streamed in chunks of --chunk-size lines, so memory stays
+bounded however large the file is. Within a chunk the LLM-bound general
+turns go out together as one `llm.batch` call and every other turn runs
+through the graph concurrently, --workers at a time (also the concurrency
+of the LLM batch). After each chunk the output is flushed and a checkpoint
+(<output>.ckpt) records how far the input got; rerunning the same command
+resumes there, dropping any output written after the checkpoint.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+from config import settings
+
+TEXT_FIELDS = ("message", "text", "content", "input", "body")
+ID_FIELDS = ("id", "request_id")
+
+class _Record(NamedTuple):
+    line: int
+    id: Any
+    text: Optional[str]
+    error: Optional[str]
+
+def _parse(line: int, raw: str, field: Optional[str]) -> _Record:
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        return _Record(line, line, None, f"Invalid JSON: {e}")
+    if isinstance(data, str):
+        return _Record(line, line, data, None)
+    if not isinstance(data, dict):
+        return _Record(line, line, None, "Expected a JSON object or string")
+    record_id = next((data[key] for key in ID_FIELDS if key in data), line)
+    fields = (field,) if field else TEXT_FIELDS
+    text = next((data[key] for key in fields if isinstance(data.get(key), str)), None)
+    if text is None:
+        return _Record(line, record_id, None, f"No message text (looked for {', '.join(fields)})")
+    return _Record(line, record_id, text, None)
+
+def _chunks(f: TextIO, skip: int, size: int, field: Optional[str]) -> Iterator[Tuple[List[_Record], int]]:
+    """
+    Yields (records, last line number read) for every `size` lines after the
+    first `skip`; blank lines are counted but produce no record.
+    """
+    chunk: List[_Record] = []
+    pending = 0
+    for line, raw in enumerate(f, 1):
+        if line <= skip:
+            continue
+        pending += 1
+        if raw.strip():
+            chunk.append(_parse(line, raw, field))
+        if pending == size:
+            yield chunk, line
+            chunk, pending = [], 0
+    if pending:
+        yield chunk, line
+
+class Checkpoint:
+    """
+    Progress of one batch run: input lines done and the output size at that
+    point, rewritten atomically after every chunk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save(self, input_path: str, lines: int, output_bytes: int) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"input": os.path.abspath(input_path), "lines": lines, "output_bytes": output_bytes}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+@lru_cache(maxsize=None)
+def _batch_agent():
+    """The graph without a checkpointer: batch turns are independent and leave no sessions behind."""
+    from agent import create_market_analysis_agent
+    return create_market_analysis_agent()
+
+async def _graph_turn(record: _Record, intent: str, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    from agent import initial_turn_state
+
+    async with semaphore:
+        try:
+            result = await _batch_agent().ainvoke(initial_turn_state(record.text))
+            return {"id": record.id, "line": record.line, "intent": intent, "response": result["messages"][-1].content}
+        except Exception as e:
+            return {"id": record.id, "line": record.line, "intent": intent, "error": f"{type(e).__name__}: {e}"}
+
+async def _llm_batch(records: List[_Record], workers: int) -> List[Dict[str, Any]]:
+    """Answers general turns with one batched LLM call, filling the response cache like the response node."""
+    from metrics import metrics
+    from nodes import _general_prompt, get_llm_client
+    from response_cache import response_cache
+
+    if not records:
+        return []
+    start = time.perf_counter()
+    replies = await get_llm_client(temperature=0.7).abatch(
+        [_general_prompt(record.text) for record in records],
+        config={"max_concurrency": workers},
+        return_exceptions=True
+    )
+    latency = (time.perf_counter() - start) / len(records)
+    results = []
+    for record, reply in zip(records, replies):
+        result = {"id": record.id, "line": record.line, "intent": "general"}
+        if isinstance(reply, Exception):
+            result["error"] = f"{type(reply).__name__}: {reply}"
+        else:
+            metrics.record_llm_call("batch", reply)
+            response_cache.put(record.text, reply.content, settings.DEFAULT_MODEL, latency=latency)
+            result["response"] = reply.content
+        results.append(result)
+    return results
+
+async def _process(records: List[_Record], workers: int, semaphore: asyncio.Semaphore, stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Results for one chunk, in input order."""
+    from nodes import intent_matcher, intent_of
+    from response_cache import response_cache
+
+    results: Dict[int, Dict[str, Any]] = {}
+    general: List[_Record] = []
+    turns = []
+    for record in records:
+        if record.error is not None:
+            results[record.line] = {"id": record.id, "line": record.line, "intent": None, "error": record.error}
+            continue
+        intent = intent_of(intent_matcher.match(record.text))
+        stats["intents"][intent] = stats["intents"].get(intent, 0) + 1
+        if intent != "general":
+            turns.append(_graph_turn(record, intent, semaphore))
+            continue
+        cached = response_cache.get(record.text, settings.DEFAULT_MODEL)
+        if cached is not None:
+            results[record.line] = {"id": record.id, "line": record.line, "intent": intent, "response": cached}
+        else:
+            general.append(record)
+
+    if general:
+        stats["llm_batches"] += 1
+    answered, llm_answered = await asyncio.gather(asyncio.gather(*turns), _llm_batch(general, workers))
+    for result in list(answered) + llm_answered:
+        results[result["line"]] = result
+    return [results[record.line] for record in records]
+
+async def arun_batch(
+    input_path: str,
+    output_path: str,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    resume: bool = True,
+    field: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Processes `input_path` into `output_path` (see the module docstring) and
+    returns run statistics. With `resume`, continues from the checkpoint of
+    an earlier run over the same input.
+    """
+    workers = workers or settings.BATCH_WORKERS
+    chunk_size = chunk_size or settings.BATCH_CHUNK_SIZE
+    checkpoint = Checkpoint(f"{output_path}.ckpt")
+    state = checkpoint.load() if resume else {}
+    if state and state.get("input") != os.path.abspath(input_path):
+        raise ValueError(f"{checkpoint.path} belongs to another input ({state.get('input')}); rerun without resume")
+    skip = state.get("lines", 0)
+
+    stats: Dict[str, Any] = {"resumed_from_line": skip, "records": 0, "errors": 0, "intents": {}, "llm_batches": 0}
+    semaphore = asyncio.Semaphore(workers)
+    start = time.perf_counter()
+    with open(input_path) as source, open(output_path, "ab" if skip else "wb") as out:
+        # Anything past the checkpoint is from a run that stopped mid-chunk
+        out.truncate(state.get("output_bytes", 0) if skip else 0)
+        out.seek(0, os.SEEK_END)
+        for records, last_line in _chunks(source, skip, chunk_size, field):
+            results = await _process(records, workers, semaphore, stats)
+            out.write("".join(json.dumps(result) + "\n" for result in results).encode())
+            out.flush()
+            os.fsync(out.fileno())
+            checkpoint.save(input_path, last_line, out.tell())
+            stats["records"] += len(results)
+            stats["errors"] += sum("error" in result for result in results)
+
+    elapsed = time.perf_counter() - start
+    stats.update({
+        "workers": workers,
+        "chunk_size": chunk_size,
+        "elapsed_s": round(elapsed, 3),
+        "records_per_s": round(stats["records"] / elapsed, 2) if elapsed else 0.0
+    })
+    return stats
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    resume: bool = True,
+    field: Optional[str] = None
+) -> Dict[str, Any]:
+    """Synchronous wrapper around `arun_batch`."""
+    from llm_clients import llm_clients
+
+    async def run() -> Dict[str, Any]:
+        try:
+            return await arun_batch(input_path, output_path, workers, chunk_size, resume, field)
+        finally:
+            # The pooled async LLM transport is bound to this loop, which ends here
+            await llm_clients.aclose()
+
+    return asyncio.run(run())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="JSONL file with one message per line")
+    parser.add_argument("output", help="JSONL file to write results to")
+    parser.add_argument("--workers", type=int, default=settings.BATCH_WORKERS, help="turns processed at once")
+    parser.add_argument("--chunk-size", type=int, default=settings.BATCH_CHUNK_SIZE, help="input lines per chunk")
+    parser.add_argument("--field", help="JSON field holding the message text")
+    parser.add_argument("--no-resume", action="store_true", help="ignore any checkpoint and start over")
+    args = parser.parse_args()
+
+    stats = run_batch(args.input, args.output, args.workers, args.chunk_size, not args.no_resume, args.field)
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,682 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the Market Analysis Agent.
+
+Run all of them with `python benchmarks.py`, or pick some by name:
+`python benchmarks.py indicator`.
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+
+BENCHMARKS: Dict[str, Callable[..., None]] = {}
+
+# Cold start budget for a fresh worker: `import agent`, and import plus the
+# first greet turn (graph compilation included). Tracked by `startup`.
+IMPORT_BUDGET_MS = 600
+READY_BUDGET_MS = 1_000
+
+def benchmark(name: str):
+    """Register a benchmark under `name`."""
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+def _rss_mb() -> float:
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _timed(fn: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+@benchmark("indicator")
+def bench_indicator(sizes: Iterable[int] = (1_000, 100_000, 1_000_000)) -> None:
+    """Scalar secret_indicator loop vs one secret_indicator_batch call."""
+    from tools import secret_indicator, secret_indicator_batch
+
+    print("Secret indicator: scalar loop vs batch")
+    print(f"{'rows':>10} {'scalar (s)':>12} {'batch (s)':>12} {'speedup':>9}")
+
+    for n in sizes:
+        data_rng = np.random.default_rng(0)
+        price = data_rng.uniform(1, 50000, n)
+        volume = data_rng.integers(1000000, 10000000, n)
+        market_cap = data_rng.integers(1000000000, 100000000000, n)
+        change_24h = data_rng.uniform(-15, 15, n)
+        snapshots = [
+            {"price": p, "volume": v, "market_cap": m, "24h_change": c}
+            for p, v, m, c in zip(price.tolist(), volume.tolist(), market_cap.tolist(), change_24h.tolist())
+        ]
+
+        scalar_rng = np.random.default_rng(42)
+        scalar = _timed(lambda: [secret_indicator(snapshot, rng=scalar_rng) for snapshot in snapshots])
+        batch = _timed(lambda: secret_indicator_batch(
+            price, volume, market_cap, change_24h, rng=np.random.default_rng(42)
+        ))
+
+        print(f"{n:>10,} {scalar:>12.4f} {batch:>12.4f} {scalar / batch:>8.1f}x")
+
+@benchmark("matcher")
+def bench_matcher(iterations: int = 20_000) -> None:
+    """Legacy substring/regex intent scan vs the compiled IntentMatcher."""
+    import re
+    from matcher import IntentMatcher
+
+    def legacy_classifier(symbols):
+        crypto_patterns = [symbol.lower() for symbol in symbols] + ["crypto", "coin", "token"]
+        symbol_regex = re.compile(r'\b(' + "|".join(symbols) + r')\b')
+
+        def classify(text: str):
+            user_input = text.lower()
+            if any(p in user_input for p in ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"]):
+                return "greet"
+            if (any(p in user_input for p in ["secret indicator", "calculate", "analyze", "indicator"]) and
+                    any(p in user_input for p in crypto_patterns)):
+                return symbol_regex.findall(user_input.upper())
+            return "general"
+        return classify
+
+    short = "Calculate secret indicator for SOL"
+    long = " ".join(["Could you please take a careful look at the market for me today"] * 40) + " and analyze BTC"
+    universes = {
+        "5 symbols": ["SOL", "BTC", "ETH", "ADA", "DOT"],
+        "500 symbols": [f"T{i:03d}" for i in range(495)] + ["SOL", "BTC", "ETH", "ADA", "DOT"]
+    }
+
+    print(f"Intent matching ({iterations:,} messages each)")
+    print(f"{'message':>8} {'universe':>12} {'legacy us/msg':>14} {'matcher us/msg':>15}")
+    for label, text in (("short", short), ("long", long)):
+        for name, symbols in universes.items():
+            legacy = legacy_classifier(symbols)
+            matcher = IntentMatcher(symbols)
+            legacy_time = _timed(lambda: [legacy(text) for _ in range(iterations)])
+            matcher_time = _timed(lambda: [matcher.match(text) for _ in range(iterations)])
+            print(f"{label:>8} {name:>12} {legacy_time / iterations * 1e6:>14.2f} {matcher_time / iterations * 1e6:>15.2f}")
+
+@benchmark("memory")
+def bench_memory(turns: int = 10_000, bucket: int = 1_000) -> None:
+    """Per-turn chat latency over a long session, windowed memory vs unbounded history."""
+    from agent import MarketAnalysisChat
+    from memory import ConversationMemory
+
+    variants = {
+        "windowed (20 msgs)": ConversationMemory(max_messages=20, max_tokens=0),
+        "unbounded": ConversationMemory(max_messages=0, max_tokens=0)
+    }
+
+    print(f"Chat latency over {turns:,} greet turns (mean ms/turn per {bucket:,}-turn bucket)")
+    results = {}
+    chats = []
+    for name, memory in variants.items():
+        chat = MarketAnalysisChat(memory=memory)
+        chats.append(chat)
+        means = []
+        for _ in range(turns // bucket):
+            elapsed = _timed(lambda: [chat.chat("Hello!") for _ in range(bucket)])
+            means.append(elapsed / bucket * 1e3)
+        results[name] = means
+
+    print(f"{'turns':>8} " + " ".join(f"{name:>20}" for name in results))
+    for i in range(turns // bucket):
+        print(f"{(i + 1) * bucket:>8,} " + " ".join(f"{means[i]:>20.3f}" for means in results.values()))
+    print(f"{'held':>8} " + " ".join(f"{len(chat.conversation_history):>15,} msgs" for chat in chats))
+
+@benchmark("reducers")
+def bench_reducers(sizes: Iterable[int] = (100, 10_000, 100_000), steps: int = 20, runs: int = 5) -> None:
+    """Per-step graph cost vs history/cache size, copying reducers vs structural sharing."""
+    from typing import Any, Dict, List
+    from typing_extensions import Annotated, TypedDict
+    from langchain_core.messages import AIMessage
+    from langgraph.graph import StateGraph
+    import state
+
+    def copy_lists(left, right):
+        return (left or []) + (right or [])
+
+    def copy_cache(left, right):
+        return {**(left or {}), **(right or {})}
+
+    def build(list_reducer, cache_reducer):
+        class BenchState(TypedDict):
+            messages: Annotated[List[Any], list_reducer]
+            cache: Annotated[Dict[str, Any], cache_reducer]
+
+        workflow = StateGraph(BenchState)
+        names = [f"step_{i}" for i in range(steps)]
+        for i, name in enumerate(names):
+            message = AIMessage(content=name)
+            workflow.add_node(name, lambda state, i=i, message=message: {
+                "messages": [message], "cache": {f"key_{i}": i}
+            })
+        workflow.set_entry_point(names[0])
+        for a, b in zip(names, names[1:]):
+            workflow.add_edge(a, b)
+        workflow.add_edge(names[-1], "__end__")
+        return workflow.compile()
+
+    graphs = {
+        "copying": build(copy_lists, copy_cache),
+        "shared": build(state.merge_lists, state.merge_cache)
+    }
+
+    print(f"Graph step cost with {steps}-step graph (mean us/step over {runs} runs)")
+    print(f"{'size':>10} " + " ".join(f"{name:>12}" for name in graphs))
+    for size in sizes:
+        history = [AIMessage(content=str(i)) for i in range(size)]
+        cache = {f"symbol_{i}": {"price": i} for i in range(size)}
+        # Keep the fixture out of the cyclic GC so collections don't scale with it
+        gc.collect()
+        gc.freeze()
+        row = []
+        for graph in graphs.values():
+            elapsed = _timed(lambda: [graph.invoke({"messages": history, "cache": cache}) for _ in range(runs)])
+            row.append(elapsed / (runs * steps) * 1e6)
+        gc.unfreeze()
+        print(f"{size:>10,} " + " ".join(f"{value:>12.1f}" for value in row))
+
+@benchmark("sessions")
+def bench_sessions(sessions: int = 20_000, active: int = 2_000, bucket: int = 5_000, resumes: int = 500) -> None:
+    """RSS while opening many chat sessions, and resume latency from memory vs the SQLite spill."""
+    import tempfile
+    from langchain_core.messages import HumanMessage
+    from agent import create_market_analysis_agent
+    from sessions import SessionStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(max_sessions=active, path=os.path.join(tmp, "sessions.db"))
+        agent = create_market_analysis_agent(checkpointer=store)
+
+        def turn(session: int) -> None:
+            agent.invoke(
+                {"messages": [HumanMessage(content="Hello!")], "market_data_cache": {}},
+                {"configurable": {"thread_id": f"session-{session}"}}
+            )
+
+        print(f"Opening {sessions:,} sessions with at most {active:,} in memory")
+        print(f"{'sessions':>10} {'ms/turn':>9} {'RSS (MB)':>10} {'in memory':>10} {'spilled':>9}")
+        for start in range(0, sessions, bucket):
+            elapsed = _timed(lambda: [turn(session) for session in range(start, start + bucket)])
+            stats = store.stats()
+            print(f"{start + bucket:>10,} {elapsed / bucket * 1e3:>9.3f} {_rss_mb():>10.1f} "
+                  f"{stats['active']:>10,} {stats['spilled']:>9,}")
+
+        hot = _timed(lambda: [turn(session) for session in range(sessions - resumes, sessions)])
+        cold = _timed(lambda: [turn(session) for session in range(resumes)])
+        print(f"resume turn: {hot / resumes * 1e3:.3f} ms in memory, {cold / resumes * 1e3:.3f} ms from spill")
+        store.spill.close()
+
+@benchmark("feed")
+def bench_feed(symbols: int = 1_000, capacity: int = 3_600, reads: int = 100_000) -> None:
+    """Ring buffer memory per symbol, and latest-snapshot reads: feed vs market cache."""
+    from cache import MarketDataCache
+    from feed import MarketFeed
+    from tools import _generate_mock_marketdata
+
+    names = [f"T{i:04d}" for i in range(symbols)]
+    rss_before = _rss_mb()
+    feed = MarketFeed(names, capacity=capacity)
+    tick = _generate_mock_marketdata("SOL")
+    for ring in feed.rings.values():
+        for _ in range(capacity + 10):
+            ring.push(tick)
+    rss_after = _rss_mb()
+    stats = feed.stats()
+    per_symbol = stats["bytes"] / symbols
+    print(f"Feed memory: {symbols:,} symbols x {capacity:,} ticks (rings full and wrapped)")
+    print(f"ring bytes/symbol {per_symbol:,.0f}, total {stats['bytes'] / 2**20:.1f} MB, "
+          f"RSS grew {rss_after - rss_before:.1f} MB")
+
+    feed._thread = object()  # read as if running, without the polling thread
+    cache = MarketDataCache(max_size=symbols)
+    for name in names:
+        cache.put(name, tick)
+    feed_time = _timed(lambda: [feed.latest(names[i % symbols]) for i in range(reads)])
+    cache_time = _timed(lambda: [cache.get_or_fetch(names[i % symbols], _generate_mock_marketdata) for i in range(reads)])
+    print(f"latest snapshot: feed {feed_time / reads * 1e6:.2f} us/read, cache {cache_time / reads * 1e6:.2f} us/read")
+
+@benchmark("history")
+def bench_history(rows: int = 5_000_000, interval: int = 6, window: int = 86_400) -> None:
+    """Indicator over the last 24h of a long history: memory-mapped range read vs loading every column."""
+    import tempfile
+    import tracemalloc
+    import numpy as np
+    from history import FIELDS, OHLCVStore
+    from tools import secret_indicator_batch
+
+    with tempfile.TemporaryDirectory() as root:
+        store = OHLCVStore(root)
+        end = 1_700_000_000
+        timestamps = np.arange(end - (rows - 1) * interval, end + 1, interval, dtype=np.int64)
+        rng = np.random.default_rng(0)
+        for chunk in range(0, rows, 1_000_000):
+            part = timestamps[chunk:chunk + 1_000_000]
+            n = len(part)
+            store.extend("SOL", {
+                "timestamp": part,
+                "price": rng.uniform(90, 110, n),
+                "open": rng.uniform(90, 110, n),
+                "high": rng.uniform(100, 115, n),
+                "low": rng.uniform(85, 100, n),
+                "volume": rng.integers(1_000_000, 10_000_000, n),
+                "market_cap": rng.integers(10**9, 10**11, n),
+                "change_24h": rng.uniform(-15, 15, n)
+            })
+        store.close()
+        size = sum(os.path.getsize(os.path.join(root, "SOL", f"{field}.bin")) for field in FIELDS)
+        print(f"History: {rows:,} rows of SOL every {interval}s, {size / 2**20:.0f} MB on disk; scoring the last {window // 3600}h")
+
+        def ranged() -> None:
+            columns = OHLCVStore(root).range("SOL", end - window, end)
+            secret_indicator_batch(columns["price"], columns["volume"], columns["market_cap"], columns["change_24h"]).mean()
+
+        def full() -> None:
+            columns = {field: np.fromfile(os.path.join(root, "SOL", f"{field}.bin"), dtype=dtype) for field, dtype in FIELDS.items()}
+            lo = np.searchsorted(columns["timestamp"], end - window)
+            secret_indicator_batch(columns["price"][lo:], columns["volume"][lo:], columns["market_cap"][lo:], columns["change_24h"][lo:]).mean()
+
+        for name, fn in (("mmap range", ranged), ("full load", full)):
+            elapsed = min(_timed(fn) for _ in range(3))
+            tracemalloc.start()
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{name:<11} {elapsed * 1e3:9.2f} ms/query, peak allocated {peak / 2**20:8.2f} MB")
+
+@benchmark("rolling")
+def bench_rolling(history: Iterable[int] = (1_000, 100_000, 1_000_000), updates: int = 10_000) -> None:
+    """EMA of the indicator per new snapshot: incremental rolling state vs batch recompute over history."""
+    import numpy as np
+    from indicators import IndicatorEngine, batch_state
+    from tools import _generate_mock_marketdata
+
+    base = _generate_mock_marketdata("SOL")
+    snapshots = [base._replace(timestamp=i + 1) for i in range(updates)]
+    engine = IndicatorEngine(span=20)
+    incremental = _timed(lambda: [engine.update(snapshot, score=50.0) for snapshot in snapshots]) / updates
+    print("Rolling indicator: cost per new snapshot")
+    print(f"{'history':>10} {'incremental us':>15} {'recompute us':>14} {'speedup':>9}")
+    rng = np.random.default_rng(0)
+    for n in history:
+        scores = rng.uniform(0, 100, n)
+        volumes = rng.integers(1_000_000, 10_000_000, n)
+        runs = max(1, 200_000 // n)
+        recompute = _timed(lambda: [batch_state(scores, volumes, span=20) for _ in range(runs)]) / runs
+        print(f"{n:>10,} {incremental * 1e6:>15.2f} {recompute * 1e6:>14.1f} {recompute / incremental:>8.0f}x")
+
+@benchmark("screener")
+def bench_screener(universe: int = 100_000, fetch_latency: float = 0.0, workers: Iterable[int] = (1, 2, 4, 8)) -> None:
+    """Top-20 screen of a large universe: wall time and throughput vs worker processes."""
+    import tools
+    from screener import default_universe, screen, shutdown_pools
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    symbols = default_universe(universe)
+    saved = tools.MOCK_FETCH_LATENCY
+    tools.MOCK_FETCH_LATENCY = fetch_latency
+    print(f"Screener: top 20 of {len(symbols):,} symbols, fetch latency {fetch_latency}s, {cores} core(s) available")
+    print(f"{'workers':>8} {'seconds':>9} {'symbols/s':>11} {'speedup':>8}")
+    try:
+        baseline = None
+        for count in workers:
+            screen(20, symbols[:count * 100], workers=count)  # start the pool outside the timing
+            result = screen(20, symbols, workers=count)
+            baseline = baseline or result.elapsed
+            print(f"{count:>8} {result.elapsed:>9.2f} {result.screened / result.elapsed:>11,.0f} {baseline / result.elapsed:>7.2f}x")
+    finally:
+        tools.MOCK_FETCH_LATENCY = saved
+        shutdown_pools()
+
+@benchmark("hedging")
+def bench_hedging(calls: int = 2_000, concurrency: int = 100, spike_rate: float = 0.02, spike: float = 0.5) -> None:
+    """Fetch latency against a spiky fake upstream: p50/p99 and extra load with hedging off vs on."""
+    import asyncio
+    import random
+    import numpy as np
+    from hedging import HedgedExecutor
+
+    async def replay(hedging: bool):
+        rng = random.Random(0)
+
+        async def upstream(symbol: str) -> str:
+            await asyncio.sleep(spike if rng.random() < spike_rate else rng.uniform(0.01, 0.03))
+            return symbol
+
+        executor = HedgedExecutor(percentile=95, hedging=hedging, initial_delay=0.05)
+        latencies: List[float] = []
+
+        async def one(i: int) -> None:
+            start = time.perf_counter()
+            await executor.acall(upstream, f"T{i}")
+            latencies.append(time.perf_counter() - start)
+
+        for batch in range(0, calls, concurrency):
+            await asyncio.gather(*(one(i) for i in range(batch, min(calls, batch + concurrency))))
+        return np.percentile(np.asarray(latencies) * 1e3, [50, 99]), executor.stats()
+
+    print(f"Hedged fetches: {calls:,} calls, 10-30 ms upstream with {spike_rate:.0%} spikes of {spike * 1e3:.0f} ms")
+    print(f"{'hedging':>8} {'p50 ms':>8} {'p99 ms':>8} {'extra calls':>12}")
+    for hedging in (False, True):
+        (p50, p99), stats = asyncio.run(replay(hedging))
+        print(f"{'on' if hedging else 'off':>8} {p50:>8.1f} {p99:>8.1f} {stats['hedges'] / stats['calls']:>11.1%}")
+
+_COLD_START = """
+import json, sys, time
+start = time.perf_counter()
+import agent
+imported = time.perf_counter()
+chat = agent.MarketAnalysisChat()
+chat.chat("Hello!")
+ready = time.perf_counter()
+import tools
+tools.MOCK_FETCH_LATENCY = 0
+chat.chat("Analyze SOL")
+print(json.dumps({
+    "import_ms": (imported - start) * 1e3,
+    "ready_ms": (ready - start) * 1e3,
+    "llm_loaded": any(name in sys.modules for name in ("langchain_openai", "openai"))
+}))
+"""
+
+@benchmark("startup")
+def bench_startup(runs: int = 5, top: int = 8) -> None:
+    """Cold start of a fresh worker: import time, ready-to-serve time and heaviest imports, against the budget."""
+    results = []
+    for _ in range(runs):
+        child = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _COLD_START],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+    import_ms = float(np.median([result["import_ms"] for result in results]))
+    ready_ms = float(np.median([result["ready_ms"] for result in results]))
+
+    # Cumulative time of modules imported at the top level or directly by one,
+    # from the last run's -X importtime report (names are indented by depth)
+    modules = []
+    for line in child.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            if cumulative.strip().isdigit() and depth <= 1:
+                modules.append((int(cumulative) / 1e3, name.strip()))
+
+    def verdict(value: float, budget: float) -> str:
+        return "ok" if value <= budget else "OVER BUDGET"
+
+    print(f"Cold start (median of {runs} fresh interpreters)")
+    print(f"import agent            {import_ms:8.1f} ms  (budget {IMPORT_BUDGET_MS} ms, {verdict(import_ms, IMPORT_BUDGET_MS)})")
+    print(f"first greet turn ready  {ready_ms:8.1f} ms  (budget {READY_BUDGET_MS} ms, {verdict(ready_ms, READY_BUDGET_MS)})")
+    print(f"LLM stack loaded after greet + indicator turns: {any(result['llm_loaded'] for result in results)}")
+    print("heaviest imports (top level and their direct imports):")
+    for ms, name in sorted(modules, reverse=True)[:top]:
+        print(f"  {name:<28} {ms:8.1f} ms")
+
+@benchmark("batch")
+def bench_batch(records: int = 400, workers: Iterable[int] = (1, 4, 16, 64), fetch_latency: float = 0.02,
+                llm_latency: float = 0.05) -> None:
+    """Offline batch throughput by worker count, against the stub LLM; one worker is the sequential baseline."""
+    import tempfile
+    import batch
+    import tools
+    from cache import market_cache
+    from config import settings
+    from llm_clients import llm_clients
+    from response_cache import response_cache
+    from stub_llm import StubLLMServer
+
+    messages = ["Hello!", "Calculate secret indicator for SOL", "What is a blockchain? ({})", "Analyze BTC and ETH"]
+    stub = StubLLMServer(latency=llm_latency).start()
+    settings.OPENAI_BASE_URL = stub.base_url
+    llm_clients.api_key = llm_clients.api_key or "stub"
+    tools.MOCK_FETCH_LATENCY = fetch_latency
+    print(f"Offline batch: {records:,} messages (1/4 general), {fetch_latency * 1e3:.0f} ms fetches, "
+          f"{llm_latency * 1e3:.0f} ms stub LLM")
+    print(f"{'workers':>8} {'records/s':>10} {'elapsed s':>10} {'speed-up':>9} {'llm batches':>12}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "messages.jsonl")
+            with open(source, "w") as f:
+                for i in range(records):
+                    f.write(json.dumps({"id": i, "message": messages[i % 4].format(i)}) + "\n")
+            baseline = None
+            for count in workers:
+                market_cache.clear()
+                response_cache.clear()
+                stats = batch.run_batch(source, os.path.join(tmp, f"results-{count}.jsonl"), workers=count, resume=False)
+                baseline = baseline or stats["records_per_s"]
+                print(f"{count:>8} {stats['records_per_s']:>10.1f} {stats['elapsed_s']:>10.2f} "
+                      f"{stats['records_per_s'] / baseline:>8.1f}x {stats['llm_batches']:>12}")
+    finally:
+        llm_clients.close()
+        stub.stop()
+
+@benchmark("prefetch")
+def bench_prefetch(seconds: int = 1_800, rate: int = 20, symbols: int = 200, ttl: float = 30.0,
+                   fetch_latency: float = 0.5) -> None:
+    """Cold fetches and upstream calls under Zipf traffic (simulated clock), without prefetch and with top-N budgets."""
+    from cache import MarketDataCache
+    from prefetch import Prefetcher
+    from tools import _generate_mock_marketdata
+
+    rng = np.random.default_rng(0)
+    universe = [f"TKN{i:03d}" for i in range(symbols)]
+    weights = 1 / np.arange(1, symbols + 1) ** 1.2
+    traffic = rng.choice(symbols, size=(seconds, rate), p=weights / weights.sum())
+
+    def replay(top_n: int, budget: float) -> Dict[str, float]:
+        now = [0.0]
+        cache = MarketDataCache(default_ttl=ttl, stale_ttl=0, clock=lambda: now[0])
+        prefetcher = Prefetcher(cache, lambda symbol, deadline=None: _generate_mock_marketdata(symbol), top_n=top_n,
+                                budget=budget, interval=1, half_life=300, lead=2, feed=None, clock=lambda: now[0])
+        cold = 0
+        for second in range(seconds):
+            now[0] = float(second)
+            if top_n:
+                prefetcher.tick()
+            for i in traffic[second]:
+                symbol = universe[i]
+                prefetcher.record([symbol])
+                if cache.get(symbol) is None:
+                    cold += 1
+                    cache.put(symbol, _generate_mock_marketdata(symbol))
+        stats = prefetcher.stats()
+        return {
+            "cold": cold / (seconds * rate),
+            "hot": stats["hot_requests"] / (seconds * rate),
+            "cold_hot": stats["cold_hot_requests"],
+            "added_ms": cold * fetch_latency * 1e3 / (seconds * rate),
+            "upstream": (cold + stats["prefetches"]) / (seconds / 60),
+            "hit_ratio": stats["hit_ratio"],
+            "wasted": stats["wasted_ratio"]
+        }
+
+    print(f"Prefetch: {seconds // 60} min at {rate} req/s over {symbols} Zipf(1.2) symbols, TTL {ttl:.0f} s, "
+          f"{fetch_latency * 1e3:.0f} ms per cold fetch")
+    print(f"{'top N':>6} {'budget/min':>10} {'hot':>6} {'cold':>7} {'cold hot':>9} {'added ms':>9} {'upstream/min':>13} "
+          f"{'hit ratio':>10} {'wasted':>7}")
+    for top_n, budget in ((0, 0), (5, 30), (10, 60), (20, 60), (40, 60)):
+        r = replay(top_n, budget)
+        print(f"{top_n or '-':>6} {budget or '-':>10} {r['hot']:>6.1%} {r['cold']:>7.1%} {r['cold_hot']:>9} {r['added_ms']:>9.1f} "
+              f"{r['upstream']:>13.1f} {r['hit_ratio']:>10.1%} {r['wasted']:>7.1%}")
+
+@benchmark("graph")
+def bench_graph(turns: int = 500) -> None:
+    """Graph steps and per-turn latency by path: greet, indicator (warm market cache) and general (stub LLM)."""
+    import tools
+    from agent import create_market_analysis_agent, initial_turn_state
+    from config import settings
+    from llm_clients import llm_clients
+    from stub_llm import StubLLMServer
+
+    stub = StubLLMServer().start()
+    settings.OPENAI_BASE_URL = stub.base_url
+    llm_clients.api_key = llm_clients.api_key or "stub"
+    tools.MOCK_FETCH_LATENCY = 0
+    agent = create_market_analysis_agent()
+    paths = {
+        "greet": "Hello!",
+        "indicator": "Calculate secret indicator for SOL",
+        "general": "What is a blockchain?"
+    }
+    print(f"Graph paths: median of {turns} turns each, no checkpointer")
+    print(f"{'path':>10} {'steps':>6} {'ms/turn':>9}  nodes")
+    try:
+        for path, text in paths.items():
+            steps = [node for update in agent.stream(initial_turn_state(text), stream_mode="updates") for node in update]
+            latencies = []
+            for _ in range(turns):
+                start = time.perf_counter()
+                agent.invoke(initial_turn_state(text))
+                latencies.append(time.perf_counter() - start)
+            print(f"{path:>10} {len(steps):>6} {np.median(latencies) * 1e3:>9.3f}  {' -> '.join(steps)}")
+    finally:
+        llm_clients.close()
+        stub.stop()
+
+@benchmark("snapshots")
+def bench_snapshots(count: int = 1_000_000) -> None:
+    """Memory held by cached market data snapshots: legacy dicts vs MarketSnapshot."""
+    import random
+    import tracemalloc
+    from tools import MarketSnapshot
+
+    rng = random.Random(0)
+    rows = [
+        (f"T{i % 5000:04d}", round(rng.uniform(1, 50000), 2), round(rng.uniform(1, 50000), 2),
+         round(rng.uniform(1, 50000), 2), round(rng.uniform(1, 50000), 2), rng.randint(10**6, 10**7),
+         rng.randint(10**9, 10**11), 1_700_000_000 + i, round(rng.uniform(-15, 15), 2))
+        for i in range(count)
+    ]
+    variants = {
+        "dict": lambda row: dict(zip(("symbol", "price", "open", "high", "low", "volume",
+                                      "market_cap", "timestamp", "24h_change"), row)),
+        "MarketSnapshot": lambda row: MarketSnapshot(*row)
+    }
+
+    print(f"Memory for {count:,} cached snapshots (containers only; field values are shared)")
+    print(f"{'type':>16} {'total MB':>10} {'bytes/snapshot':>15} {'build (s)':>10}")
+    for name, build in variants.items():
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        cache = {i: build(row) for i, row in enumerate(rows)}
+        elapsed = time.perf_counter() - start
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:>16} {size / 2**20:>10.1f} {size / count:>15.1f} {elapsed:>10.2f}")
+        del cache
+
+@benchmark("metrics")
+def bench_metrics(turns: int = 2_000, calls: int = 200_000) -> None:
+    """Instrumentation overhead: per-turn latency and per-call wrapper cost, metrics on vs off."""
+    from agent import MarketAnalysisChat
+    from metrics import Metrics, metrics
+
+    noop = lambda: None
+    probe = Metrics(enabled=True)
+    wrapped = probe.node("probe")(noop)
+
+    chat = MarketAnalysisChat()
+    for _ in range(100):
+        chat.chat("Hello!")
+    print(f"Metrics overhead ({turns:,} greet turns, {calls:,} wrapped no-op calls)")
+    print(f"{'metrics':>8} {'ms/turn':>9} {'ns/call':>9}")
+    baseline = _timed(lambda: [noop() for _ in range(calls)])
+    for enabled in (False, True):
+        metrics.enabled = probe.enabled = enabled
+        per_turn = _timed(lambda: [chat.chat("Hello!") for _ in range(turns)]) / turns
+        per_call = (_timed(lambda: [wrapped() for _ in range(calls)]) - baseline) / calls
+        print(f"{'on' if enabled else 'off':>8} {per_turn * 1e3:>9.3f} {per_call * 1e9:>9.0f}")
+    metrics.enabled = True
+
+@benchmark("api")
+def bench_api(requests: int = 2_000, concurrency: int = 32, sessions: int = 200) -> None:
+    """Throughput and latency of the HTTP chat service against the stub LLM."""
+    import asyncio
+    import threading
+    import httpx
+    import uvicorn
+    from api import ChatService, create_app
+    from config import settings
+    from llm_clients import llm_clients
+    from stub_llm import StubLLMServer
+
+    stub = StubLLMServer().start()
+    settings.OPENAI_BASE_URL = stub.base_url
+    llm_clients.api_key = llm_clients.api_key or "stub"
+    service = ChatService(max_concurrency=concurrency * 2)
+    server = uvicorn.Server(uvicorn.Config(create_app(service), host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    messages = ["Hello!", "What is cryptocurrency?", "Calculate secret indicator for SOL", "How do markets work?"]
+    latencies = []
+    statuses: Dict[int, int] = {}
+
+    async def run() -> float:
+        queue = asyncio.Queue()
+        for i in range(requests):
+            queue.put_nowait(i)
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            async def worker():
+                while not queue.empty():
+                    i = queue.get_nowait()
+                    start = time.perf_counter()
+                    response = await client.post("/chat", json={
+                        "message": messages[i % len(messages)],
+                        "session_id": f"bench-{i % sessions}"
+                    })
+                    latencies.append(time.perf_counter() - start)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return time.perf_counter() - start
+
+    try:
+        elapsed = asyncio.run(run())
+    finally:
+        server.should_exit = True
+        thread.join()
+        stub.stop()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1e3
+    print(f"HTTP chat service: {requests:,} requests, concurrency {concurrency}, {sessions} sessions, stub LLM")
+    print(f"throughput {requests / elapsed:.1f} req/s, p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms")
+    print(f"status codes: {dict(sorted(statuses.items()))}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run: {', '.join(sorted(BENCHMARKS))} (default: all)")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    for name in args.names or sorted(BENCHMARKS):
+        BENCHMARKS[name]()
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import settings
+from metrics import metrics
+
+Fetcher = Callable[[str], Dict[str, Any]]
+AsyncFetcher = Callable[[str], Awaitable[Dict[str, Any]]]
+
+def parse_symbol_ttls(raw: str) -> Dict[str, float]:
+    """
+    Parses per-symbol TTL overrides of the form "BTC=10,SOL=15".
+    """
+    ttls = {}
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        symbol, ttl = item.split("=", 1)
+        ttls[symbol.strip().upper()] = float(ttl)
+    return ttls
+
+class _CacheEntry:
+    __slots__ = ("data", "stored_at")
+
+    def __init__(self, data: Dict[str, Any], stored_at: float):
+        self.data = data
+        self.stored_at = stored_at
+
+class MarketDataCache:
+    """
+    Process-wide market data cache shared across turns and sessions.
+
+    Entries are fresh for their symbol's TTL. Past that they are served stale
+    for up to `stale_ttl` more seconds while a background refresh runs, and
+    after that they count as a miss. The least recently used entry is evicted
+    once `max_size` symbols are held.
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        default_ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+        symbol_ttls: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_size = max_size if max_size is not None else settings.MARKET_DATA_CACHE_SIZE
+        self.default_ttl = default_ttl if default_ttl is not None else settings.MARKET_DATA_TTL
+        self.stale_ttl = stale_ttl if stale_ttl is not None else settings.MARKET_DATA_STALE_TTL
+        if symbol_ttls is None:
+            symbol_ttls = parse_symbol_ttls(settings.MARKET_DATA_SYMBOL_TTLS)
+        self.symbol_ttls = {symbol.upper(): ttl for symbol, ttl in symbol_ttls.items()}
+        self._clock = clock
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._refreshing = set()
+        self._refresh_tasks = set()
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    def ttl_for(self, symbol: str) -> float:
+        """Get the freshness TTL for a symbol."""
+        return self.symbol_ttls.get(symbol.upper(), self.default_ttl)
+
+    def _age(self, entry: _CacheEntry) -> float:
+        return self._clock() - entry.stored_at
+
+    def put(self, symbol: str, data: Dict[str, Any]) -> None:
+        """Store a snapshot, evicting least recently used entries if needed."""
+        symbol = symbol.upper()
+        with self._lock:
+            self._entries[symbol] = _CacheEntry(data, self._clock())
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached snapshot if it is still fresh, without fetching.
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None or self._age(entry) > self.ttl_for(symbol):
+                return None
+            self._entries.move_to_end(symbol)
+            return entry.data
+
+    def last(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """
+        The last snapshot stored for a symbol however old it is, or None;
+        the fallback when a fresh fetch can't finish in time.
+        """
+        with self._lock:
+            entry = self._entries.get(symbol.upper())
+            return entry.data if entry is not None else None
+
+    def expires_in(self, symbol: str) -> Optional[float]:
+        """Seconds until a symbol's entry stops being fresh (negative once it has), or None if absent."""
+        symbol = symbol.upper()
+        with self._lock:
+            entry = self._entries.get(symbol)
+            return self.ttl_for(symbol) - self._age(entry) if entry is not None else None
+
+    def _lookup(self, symbol: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Returns (data, needs_refresh) and updates the counters. Caller holds
+        the lock. data is None on a miss.
+        """
+        entry = self._entries.get(symbol)
+        if entry is not None:
+            age = self._age(entry)
+            ttl = self.ttl_for(symbol)
+            if age <= ttl:
+                self.hits += 1
+                metrics.inc("market_cache_requests_total", result="hit")
+                self._entries.move_to_end(symbol)
+                return entry.data, False
+            if age <= ttl + self.stale_ttl:
+                self.stale_hits += 1
+                metrics.inc("market_cache_requests_total", result="stale")
+                self._entries.move_to_end(symbol)
+                needs_refresh = symbol not in self._refreshing
+                self._refreshing.add(symbol)
+                return entry.data, needs_refresh
+        self.misses += 1
+        metrics.inc("market_cache_requests_total", result="miss")
+        return None, False
+
+    def get_or_fetch(self, symbol: str, fetcher: Fetcher) -> Dict[str, Any]:
+        """
+        Returns cached market data for a symbol, calling `fetcher` on a miss.
+        Stale entries are returned immediately and refreshed in the background.
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            data, needs_refresh = self._lookup(symbol)
+        if needs_refresh:
+            threading.Thread(target=self._refresh, args=(symbol, fetcher), daemon=True).start()
+        if data is not None:
+            return data
+
+        data = fetcher(symbol)
+        self.put(symbol, data)
+        return data
+
+    async def aget_or_fetch(self, symbol: str, afetcher: AsyncFetcher) -> Dict[str, Any]:
+        """
+        Async counterpart of `get_or_fetch`; background refreshes run as tasks
+        on the current event loop.
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            data, needs_refresh = self._lookup(symbol)
+        if needs_refresh:
+            # Hold a reference so the task isn't garbage collected mid-flight
+            task = asyncio.get_running_loop().create_task(self._arefresh(symbol, afetcher))
+            self._refresh_tasks.add(task)
+            task.add_done_callback(self._refresh_tasks.discard)
+        if data is not None:
+            return data
+
+        data = await afetcher(symbol)
+        self.put(symbol, data)
+        return data
+
+    def _refresh(self, symbol: str, fetcher: Fetcher) -> None:
+        try:
+            data = fetcher(symbol)
+        except Exception:
+            # Keep serving the stale entry; the next request past the stale
+            # window will fetch synchronously and surface the error.
+            data = None
+        self._finish_refresh(symbol, data)
+
+    async def _arefresh(self, symbol: str, afetcher: AsyncFetcher) -> None:
+        try:
+            data = await afetcher(symbol)
+        except Exception:
+            data = None
+        self._finish_refresh(symbol, data)
+
+    def _finish_refresh(self, symbol: str, data: Optional[Dict[str, Any]]) -> None:
+        if data is not None:
+            self.put(symbol, data)
+        with self._lock:
+            self._refreshing.discard(symbol)
+            if data is not None:
+                self.refreshes += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self._reset_counters()
+
+    def stats(self) -> Dict[str, int]:
+        """Get hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes
+            }
+
+    def __contains__(self, symbol: str) -> bool:
+        return self.get(symbol) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+market_cache = MarketDataCache()
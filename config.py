@@ -1,4 +1,5 @@
 import os
+from typing import List
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,4 +9,97 @@ class Settings:
     DEFAULT_MODEL: str = os.getenv("DEFAULT_MODEL", "gpt-4o-mini")
     OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 
+    # Shared HTTP pool for LLM clients
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    LLM_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "60"))
+
+    # Conversation memory window (0 disables a limit) and how older turns are summarized
+    MEMORY_MAX_MESSAGES: int = int(os.getenv("MEMORY_MAX_MESSAGES", "20"))
+    MEMORY_MAX_TOKENS: int = int(os.getenv("MEMORY_MAX_TOKENS", "0"))
+    MEMORY_SUMMARIZER: str = os.getenv("MEMORY_SUMMARIZER", "extractive")  # "extractive" or "llm"
+
+    # Node/tool latency, cache and LLM counters (metrics.py); off makes them no-ops
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # HTTP chat service (api.py)
+    API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
+    API_PORT: int = int(os.getenv("API_PORT", "8000"))
+    # Requests served at once; anything beyond is rejected with 429
+    API_MAX_CONCURRENCY: int = int(os.getenv("API_MAX_CONCURRENCY", "64"))
+    API_REQUEST_TIMEOUT: float = float(os.getenv("API_REQUEST_TIMEOUT", "30"))
+    # How long shutdown waits for in-flight requests
+    API_DRAIN_TIMEOUT: float = float(os.getenv("API_DRAIN_TIMEOUT", "30"))
+
+    # Chat sessions: how many stay in memory, how long an idle one stays
+    # before it is spilled, and the SQLite file spilled sessions go to
+    SESSION_MAX_ACTIVE: int = int(os.getenv("SESSION_MAX_ACTIVE", "10000"))
+    SESSION_IDLE_TTL: float = float(os.getenv("SESSION_IDLE_TTL", "900"))
+    SESSION_DB: str = os.getenv("SESSION_DB", "sessions.db")
+
+    # Response cache for general-intent LLM answers
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    # Optional SQLite file for a persistent cache; empty keeps it in memory only
+    RESPONSE_CACHE_DB: str = os.getenv("RESPONSE_CACHE_DB", "")
+
+    # Tickers recognised by the intent classifier, e.g. "SOL,BTC,ETH"
+    SUPPORTED_SYMBOLS: List[str] = [
+        symbol.strip().upper()
+        for symbol in os.getenv("SUPPORTED_SYMBOLS", "SOL,BTC,ETH,ADA,DOT").split(",")
+        if symbol.strip()
+    ]
+
+    # Market data cache
+    MARKET_DATA_CACHE_SIZE: int = int(os.getenv("MARKET_DATA_CACHE_SIZE", "1024"))
+    MARKET_DATA_TTL: float = float(os.getenv("MARKET_DATA_TTL", "30"))
+    MARKET_DATA_STALE_TTL: float = float(os.getenv("MARKET_DATA_STALE_TTL", "30"))
+    # Per-symbol overrides, e.g. "BTC=10,SOL=15"
+    MARKET_DATA_SYMBOL_TTLS: str = os.getenv("MARKET_DATA_SYMBOL_TTLS", "")
+    # Background market feed: when enabled, a thread polls every supported
+    # symbol each MARKET_FEED_INTERVAL seconds into a ring buffer holding the
+    # last MARKET_FEED_CAPACITY ticks, and requests read from it
+    MARKET_FEED_ENABLED: bool = os.getenv("MARKET_FEED_ENABLED", "false").lower() in ("1", "true", "yes")
+    MARKET_FEED_INTERVAL: float = float(os.getenv("MARKET_FEED_INTERVAL", "1"))
+    MARKET_FEED_CAPACITY: int = int(os.getenv("MARKET_FEED_CAPACITY", "3600"))
+    # Prefetch of hot symbols (prefetch.py): when enabled, the PREFETCH_TOP_N
+    # most requested symbols (request counts halve every PREFETCH_HALF_LIFE
+    # seconds) are refreshed before their cache entry expires, checked every
+    # PREFETCH_INTERVAL seconds, spending at most PREFETCH_BUDGET upstream
+    # calls per minute
+    PREFETCH_ENABLED: bool = os.getenv("PREFETCH_ENABLED", "false").lower() in ("1", "true", "yes")
+    PREFETCH_TOP_N: int = int(os.getenv("PREFETCH_TOP_N", "5"))
+    PREFETCH_BUDGET: float = float(os.getenv("PREFETCH_BUDGET", "60"))
+    PREFETCH_INTERVAL: float = float(os.getenv("PREFETCH_INTERVAL", "1"))
+    PREFETCH_HALF_LIFE: float = float(os.getenv("PREFETCH_HALF_LIFE", "300"))
+    # Optional on-disk OHLCV history (history.py): directory every fetched
+    # snapshot is appended to (empty, the default, disables it) and seconds of
+    # history kept per symbol (0 = keep everything)
+    HISTORY_DIR: str = os.getenv("HISTORY_DIR", "")
+    HISTORY_RETENTION: float = float(os.getenv("HISTORY_RETENTION", "604800"))
+    # Span of the rolling EMA of the indicator score kept per symbol (indicators.py)
+    INDICATOR_EMA_SPAN: int = int(os.getenv("INDICATOR_EMA_SPAN", "20"))
+    # Universe screener (screener.py): synthetic universe size on top of the
+    # supported symbols, worker processes (0 = one per core), concurrent
+    # fetches per worker, and how many results "top tokens" returns by default
+    SCREENER_UNIVERSE_SIZE: int = int(os.getenv("SCREENER_UNIVERSE_SIZE", "10000"))
+    SCREENER_WORKERS: int = int(os.getenv("SCREENER_WORKERS", "0"))
+    SCREENER_FETCH_CONCURRENCY: int = int(os.getenv("SCREENER_FETCH_CONCURRENCY", "1000"))
+    SCREENER_TOP_K: int = int(os.getenv("SCREENER_TOP_K", "10"))
+    # Per-turn deadline for market data fetches in seconds (0 = none); past it
+    # the last cached snapshot is served, marked stale
+    FETCH_DEADLINE: float = float(os.getenv("FETCH_DEADLINE", "2"))
+    # Send a duplicate upstream request once the first is slower than this
+    # percentile of recent fetch latencies
+    FETCH_HEDGE_ENABLED: bool = os.getenv("FETCH_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+    FETCH_HEDGE_PERCENTILE: float = float(os.getenv("FETCH_HEDGE_PERCENTILE", "95"))
+    # Worker threads used to fetch several symbols in parallel
+    FETCH_POOL_SIZE: int = int(os.getenv("FETCH_POOL_SIZE", "16"))
+    # Offline batch runs (batch.py): turns in flight at once and input lines
+    # per chunk (one LLM batch and one checkpoint per chunk)
+    BATCH_WORKERS: int = int(os.getenv("BATCH_WORKERS", "16"))
+    BATCH_CHUNK_SIZE: int = int(os.getenv("BATCH_CHUNK_SIZE", "256"))
+
 settings = Settings() 
\ No newline at end of file
@@ -0,0 +1,173 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+from config import settings
+from metrics import metrics
+from tools import MarketSnapshot, _generate_mock_marketdata, record_snapshot
+
+# One row per tick; the numeric fields of a MarketSnapshot
+TICK_DTYPE = np.dtype([
+    ("timestamp", np.int64),
+    ("price", np.float64),
+    ("open", np.float64),
+    ("high", np.float64),
+    ("low", np.float64),
+    ("volume", np.int64),
+    ("market_cap", np.int64),
+    ("24h_change", np.float64)
+])
+
+TickSource = Callable[[str], MarketSnapshot]
+
+class TickRing:
+    """
+    Fixed-capacity ring buffer of ticks for one symbol.
+
+    Backed by one preallocated structured NumPy array, so memory is
+    `capacity * TICK_DTYPE.itemsize` bytes no matter how many ticks are
+    pushed; the oldest tick is overwritten once the ring is full. Pushing
+    and reading the latest tick are O(1).
+    """
+
+    __slots__ = ("symbol", "capacity", "_ticks", "_count", "_latest", "_lock")
+
+    def __init__(self, symbol: str, capacity: int):
+        if capacity < 1:
+            raise ValueError("Ring capacity must be at least 1")
+        self.symbol = symbol
+        self.capacity = capacity
+        self._ticks = np.zeros(capacity, dtype=TICK_DTYPE)
+        self._count = 0
+        # The newest tick as pushed, so reading it needs no conversion
+        self._latest: Optional[MarketSnapshot] = None
+        self._lock = threading.Lock()
+
+    def push(self, tick: MarketSnapshot) -> None:
+        """Appends a tick."""
+        row = (tick.timestamp, tick.price, tick.open, tick.high, tick.low, tick.volume, tick.market_cap, tick.change_24h)
+        with self._lock:
+            self._ticks[self._count % self.capacity] = row
+            self._count += 1
+            self._latest = tick
+
+    def latest(self) -> Optional[MarketSnapshot]:
+        """The newest tick as pushed, or None if empty."""
+        return self._latest
+
+    def window(self, n: Optional[int] = None) -> np.ndarray:
+        """Copy of the last `n` ticks (all held ticks by default), oldest first."""
+        with self._lock:
+            held = min(self._count, self.capacity)
+            n = held if n is None else min(n, held)
+            end = self._count % self.capacity
+            if end >= n:
+                return self._ticks[end - n:end].copy()
+            return np.concatenate((self._ticks[self.capacity - (n - end):], self._ticks[:end]))
+
+    @property
+    def pushed(self) -> int:
+        """Ticks pushed since creation, including overwritten ones."""
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        return self._ticks.nbytes
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+class MarketFeed:
+    """
+    Background ingestion of market ticks.
+
+    A daemon thread polls `source` for every symbol each `interval` seconds
+    and pushes the ticks into a TickRing per symbol, so request handlers can
+    read the latest snapshot with no I/O. `latest` returns None while the
+    feed is stopped or when a symbol's newest tick is older than `max_age`,
+    letting callers fall back to an on-demand fetch.
+    """
+
+    def __init__(
+        self,
+        symbols: Iterable[str],
+        source: TickSource = _generate_mock_marketdata,
+        interval: Optional[float] = None,
+        capacity: Optional[int] = None,
+        max_age: Optional[float] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.interval = interval if interval is not None else settings.MARKET_FEED_INTERVAL
+        self.capacity = capacity if capacity is not None else settings.MARKET_FEED_CAPACITY
+        self.max_age = max_age if max_age is not None else settings.MARKET_DATA_TTL
+        self.source = source
+        self._clock = clock
+        self.rings: Dict[str, TickRing] = {
+            symbol.upper(): TickRing(symbol.upper(), self.capacity) for symbol in symbols
+        }
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def poll(self) -> None:
+        """Pulls one tick per symbol from the source and records it like any fetched snapshot."""
+        for symbol, ring in self.rings.items():
+            try:
+                ring.push(record_snapshot(self.source(symbol)))
+            except Exception:
+                self.errors += 1
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            started = self._clock()
+            self.poll()
+            self._stop.wait(max(0.0, self.interval - (self._clock() - started)))
+
+    def start(self) -> "MarketFeed":
+        """Starts the feed thread (no-op if already running); the first ticks are in before it returns."""
+        if not self.running:
+            self._stop.clear()
+            self.poll()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="market-feed")
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def latest(self, symbol: str) -> Optional[MarketSnapshot]:
+        """Newest snapshot for `symbol` if the feed is running and it is fresh enough, else None."""
+        if self._thread is None:
+            return None
+        ring = self.rings.get(symbol.upper())
+        snapshot = ring.latest() if ring is not None else None
+        if snapshot is None or self._clock() - snapshot.timestamp > self.max_age:
+            metrics.inc("market_feed_requests_total", result="miss")
+            return None
+        metrics.inc("market_feed_requests_total", result="hit")
+        return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-symbol tick counts and ring memory, plus the total."""
+        symbols = {
+            symbol: {"held": len(ring), "pushed": ring.pushed, "bytes": ring.nbytes}
+            for symbol, ring in self.rings.items()
+        }
+        return {
+            "running": self.running,
+            "errors": self.errors,
+            "bytes": sum(ring.nbytes for ring in self.rings.values()),
+            "symbols": symbols
+        }
+
+market_feed = MarketFeed(settings.SUPPORTED_SYMBOLS)
+metrics.describe("market_feed_requests_total", "Reads of the background market feed by result (hit, miss).")
@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import numpy as np
+
+from metrics import metrics
+
+# Latency samples needed before the hedge delay follows the observed percentile
+MIN_SAMPLES = 20
+# Recompute the percentile after this many new samples
+_REFRESH_EVERY = 32
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when no attempt of a hedged call finished before its deadline."""
+
+class HedgedExecutor:
+    """
+    Runs upstream calls under a deadline, hedging slow ones.
+
+    When the first attempt hasn't answered after the `percentile` latency of
+    recent successful calls, one duplicate is sent and whichever finishes
+    first wins; a failed attempt leaves the other to finish. Until
+    MIN_SAMPLES latencies are known the hedge goes out after `initial_delay`.
+    If nothing has succeeded by the deadline (a `time.monotonic()` value),
+    DeadlineExceeded is raised and the losing attempts are left to finish
+    (threads) or cancelled (asyncio).
+
+    Threaded callers use `call`, which runs attempts on a small pool so the
+    caller can stop waiting at the deadline; asyncio callers use `acall`.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        hedging: bool = True,
+        initial_delay: float = 1.0,
+        window: int = 1000,
+        max_workers: int = 32,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.percentile = percentile
+        self.hedging = hedging
+        self.initial_delay = initial_delay
+        self._latencies: deque = deque(maxlen=window)
+        self._delay = initial_delay
+        self._new_samples = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedged-fetch")
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_misses = 0
+
+    def record(self, latency: float) -> None:
+        """Adds the latency of a successful attempt."""
+        with self._lock:
+            self._latencies.append(latency)
+            self._new_samples += 1
+            samples = len(self._latencies)
+            if samples >= MIN_SAMPLES and (self._new_samples >= _REFRESH_EVERY or samples == MIN_SAMPLES):
+                self._delay = float(np.percentile(self._latencies, self.percentile))
+                self._new_samples = 0
+
+    def hedge_delay(self) -> float:
+        """How long the first attempt gets before a hedge is sent."""
+        return self._delay
+
+    def _timed(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        start = self._clock()
+        result = fn(*args, **kwargs)
+        self.record(self._clock() - start)
+        return result
+
+    async def _atimed(self, fn: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict) -> Any:
+        start = self._clock()
+        result = await fn(*args, **kwargs)
+        self.record(self._clock() - start)
+        return result
+
+    def _next_wakeup(self, hedge_at: Optional[float], deadline: Optional[float]) -> Optional[float]:
+        times = [t for t in (hedge_at, deadline) if t is not None]
+        return max(0.0, min(times) - self._clock()) if times else None
+
+    def _finish(self, hedge: Any, outcome: str) -> None:
+        """Counts a finished call; `outcome` is "primary", "hedge", "error" or "deadline"."""
+        with self._lock:
+            self.calls += 1
+            if hedge is not None:
+                self.hedges += 1
+            if outcome == "hedge":
+                self.hedge_wins += 1
+            elif outcome == "deadline":
+                self.deadline_misses += 1
+        metrics.inc("hedged_calls_total", outcome=outcome, hedged="true" if hedge is not None else "false")
+
+    def call(self, fn: Callable[..., Any], *args, deadline: Optional[float] = None, **kwargs) -> Any:
+        """Runs `fn(*args, **kwargs)` hedged, under `deadline`."""
+        hedge_at = self._clock() + self.hedge_delay() if self.hedging else None
+        pending: Set[Future] = {self._pool.submit(self._timed, fn, args, kwargs)}
+        hedge: Optional[Future] = None
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=self._next_wakeup(hedge_at, deadline), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._finish(hedge, "hedge" if future is hedge else "primary")
+                    return future.result()
+                error = future.exception()
+            now = self._clock()
+            if deadline is not None and now >= deadline:
+                break
+            if hedge_at is not None and now >= hedge_at and pending:
+                hedge = self._pool.submit(self._timed, fn, args, kwargs)
+                pending.add(hedge)
+                hedge_at = None
+        if pending or error is None:
+            for future in pending:
+                future.cancel()
+            self._finish(hedge, "deadline")
+            raise DeadlineExceeded(f"No response within the deadline ({getattr(fn, '__name__', 'call')})")
+        self._finish(hedge, "error")
+        raise error
+
+    async def acall(self, fn: Callable[..., Awaitable[Any]], *args, deadline: Optional[float] = None, **kwargs) -> Any:
+        """Async counterpart of `call`; attempts still running at the end are cancelled."""
+        hedge_at = self._clock() + self.hedge_delay() if self.hedging else None
+        pending: Set[asyncio.Future] = {asyncio.ensure_future(self._atimed(fn, args, kwargs))}
+        hedge: Optional[asyncio.Future] = None
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=self._next_wakeup(hedge_at, deadline), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        self._finish(hedge, "hedge" if task is hedge else "primary")
+                        return task.result()
+                    error = task.exception()
+                now = self._clock()
+                if deadline is not None and now >= deadline:
+                    break
+                if hedge_at is not None and now >= hedge_at and pending:
+                    hedge = asyncio.ensure_future(self._atimed(fn, args, kwargs))
+                    pending.add(hedge)
+                    hedge_at = None
+        finally:
+            for task in pending:
+                task.cancel()
+        if pending or error is None:
+            self._finish(hedge, "deadline")
+            raise DeadlineExceeded(f"No response within the deadline ({getattr(fn, '__name__', 'call')})")
+        self._finish(hedge, "error")
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "deadline_misses": self.deadline_misses,
+                "hedge_delay": self._delay,
+                "samples": len(self._latencies)
+            }
+
+metrics.describe("hedged_calls_total", "Upstream calls by outcome (primary, hedge, error, deadline) and whether a hedge was sent.")
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Append-only on-disk OHLCV history, one memory-mapped column file per symbol and field.
+
+Backfill mock history for a symbol, e.g. to try "SOL indicator over the last 24h":
+
+    python history.py SOL --hours 48 --interval 300
+"""
+
+import argparse
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+
+# Column dtypes; "timestamp" (unix seconds, non-decreasing) is the index
+FIELDS: Dict[str, np.dtype] = {
+    "timestamp": np.dtype(np.int64),
+    "price": np.dtype(np.float64),
+    "open": np.dtype(np.float64),
+    "high": np.dtype(np.float64),
+    "low": np.dtype(np.float64),
+    "volume": np.dtype(np.int64),
+    "market_cap": np.dtype(np.int64),
+    "change_24h": np.dtype(np.float64)
+}
+# Written last, so its length is the number of complete rows
+_DATA_FIELDS = [field for field in FIELDS if field != "timestamp"]
+
+class OHLCVStore:
+    """
+    Columnar history store under `root`: `root/<SYMBOL>/<field>.bin` holds
+    one raw little-endian array per field, appended to as snapshots arrive.
+
+    Reads memory-map the column files, so a range query binary-searches the
+    timestamp column and returns views into the mapped files: only the pages
+    of the requested window are ever touched, never the full history.
+
+    Rows more than `retention` seconds older than a symbol's newest row are
+    dropped (0 keeps everything). Trimming rewrites the symbol's files, so
+    it waits until a tenth of the retention has piled up past the cutoff.
+    """
+
+    def __init__(self, root: str, retention: Optional[float] = None):
+        self.root = root
+        self.retention = retention if retention is not None else settings.HISTORY_RETENTION
+        self._lock = threading.Lock()
+        # (symbol, field) -> open append handle
+        self._files: Dict[Tuple[str, str], Any] = {}
+        # (symbol, field) -> (rows mapped, memmap)
+        self._maps: Dict[Tuple[str, str], Tuple[int, np.ndarray]] = {}
+        self._last_timestamp: Dict[str, int] = {}
+        self._first_timestamp: Dict[str, int] = {}
+
+    def _path(self, symbol: str, field: str, directory: Optional[str] = None) -> str:
+        return os.path.join(directory or os.path.join(self.root, symbol), f"{field}.bin")
+
+    def _rows(self, symbol: str) -> int:
+        try:
+            return os.path.getsize(self._path(symbol, "timestamp")) // FIELDS["timestamp"].itemsize
+        except OSError:
+            return 0
+
+    def _handle(self, symbol: str, field: str):
+        # Caller holds the lock.
+        handle = self._files.get((symbol, field))
+        if handle is None:
+            os.makedirs(os.path.join(self.root, symbol), exist_ok=True)
+            handle = self._files[(symbol, field)] = open(self._path(symbol, field), "ab", buffering=0)
+        return handle
+
+    def _truncate_partial_rows(self, symbol: str) -> None:
+        """
+        Recovers from an interrupted trim and drops data rows past the
+        timestamp column, left by an interrupted append. Caller holds the lock.
+        """
+        directory, trimmed, old = self._trim_dirs(symbol)
+        if not os.path.isdir(directory) and os.path.isdir(old):
+            os.rename(old, directory)
+        shutil.rmtree(trimmed, ignore_errors=True)
+        shutil.rmtree(old, ignore_errors=True)
+
+        rows = self._rows(symbol)
+        for field in _DATA_FIELDS:
+            path = self._path(symbol, field)
+            if os.path.exists(path) and os.path.getsize(path) > rows * FIELDS[field].itemsize:
+                os.truncate(path, rows * FIELDS[field].itemsize)
+        timestamps = self._column(symbol, "timestamp", rows)
+        self._last_timestamp[symbol] = int(timestamps[-1]) if rows else -1
+        self._first_timestamp[symbol] = int(timestamps[0]) if rows else -1
+
+    def _trim_dirs(self, symbol: str) -> Tuple[str, str, str]:
+        directory = os.path.join(self.root, symbol)
+        return directory, os.path.join(self.root, f".{symbol}.trim"), os.path.join(self.root, f".{symbol}.old")
+
+    def _trim(self, symbol: str, cutoff: int) -> None:
+        """
+        Drops rows older than `cutoff`. The kept rows are written to a new
+        directory that is then swapped in, so a crash leaves either the old
+        or the trimmed files, never a mix. Caller holds the lock.
+        """
+        rows = self._rows(symbol)
+        start = int(np.searchsorted(self._column(symbol, "timestamp", rows), cutoff, side="left"))
+        directory, trimmed, old = self._trim_dirs(symbol)
+        os.makedirs(trimmed, exist_ok=True)
+        for field in FIELDS:
+            # Copied out first: the old files' maps stay valid for readers holding views
+            np.array(self._column(symbol, field, rows)[start:]).tofile(self._path(symbol, field, trimmed))
+            handle = self._files.pop((symbol, field), None)
+            if handle is not None:
+                handle.close()
+            self._maps.pop((symbol, field), None)
+        os.rename(directory, old)
+        os.rename(trimmed, directory)
+        shutil.rmtree(old, ignore_errors=True)
+        self._first_timestamp[symbol] = int(self._column(symbol, "timestamp", rows - start)[0]) if rows > start else -1
+
+    def extend(self, symbol: str, columns: Dict[str, Any]) -> int:
+        """
+        Appends rows given as one array per field (every field in FIELDS).
+        Rows older than the newest stored timestamp are dropped. Returns the
+        number of rows written.
+        """
+        symbol = symbol.upper()
+        arrays = {field: np.asarray(columns[field], dtype=dtype) for field, dtype in FIELDS.items()}
+        with self._lock:
+            if symbol not in self._last_timestamp:
+                self._truncate_partial_rows(symbol)
+            keep = arrays["timestamp"] >= self._last_timestamp[symbol]
+            if not keep.all():
+                arrays = {field: array[keep] for field, array in arrays.items()}
+            if not len(arrays["timestamp"]):
+                return 0
+            for field in _DATA_FIELDS + ["timestamp"]:
+                self._handle(symbol, field).write(arrays[field].astype(FIELDS[field].newbyteorder("<")).tobytes())
+            newest = self._last_timestamp[symbol] = int(arrays["timestamp"][-1])
+            if self._first_timestamp[symbol] < 0:
+                self._first_timestamp[symbol] = int(arrays["timestamp"][0])
+            if self.retention and self._first_timestamp[symbol] < newest - self.retention * 1.1:
+                self._trim(symbol, int(newest - self.retention))
+            return len(arrays["timestamp"])
+
+    def append(self, snapshot: Any) -> int:
+        """Appends one market data snapshot (anything with the FIELDS as attributes)."""
+        return self.extend(snapshot.symbol, {field: [getattr(snapshot, field)] for field in FIELDS})
+
+    def _column(self, symbol: str, field: str, rows: int) -> np.ndarray:
+        """Read-only memmap of the first `rows` rows of a column, reused until the file grows."""
+        key = (symbol, field)
+        mapped = self._maps.get(key)
+        if mapped is not None and mapped[0] >= rows:
+            return mapped[1][:rows]
+        if not rows:
+            return np.empty(0, dtype=FIELDS[field])
+        column = np.memmap(self._path(symbol, field), dtype=FIELDS[field].newbyteorder("<"), mode="r", shape=(rows,))
+        self._maps[key] = (rows, column)
+        return column
+
+    def range(
+        self,
+        symbol: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Rows with start <= timestamp <= end (either bound optional), as
+        zero-copy views into the mapped column files.
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            rows = self._rows(symbol)
+            timestamps = self._column(symbol, "timestamp", rows)
+            lo = int(np.searchsorted(timestamps, start, side="left")) if start is not None else 0
+            hi = int(np.searchsorted(timestamps, end, side="right")) if end is not None else rows
+            return {
+                field: self._column(symbol, field, rows)[lo:hi]
+                for field in (fields if fields is not None else FIELDS)
+            }
+
+    def count(self, symbol: str) -> int:
+        """Rows stored for `symbol`."""
+        return self._rows(symbol.upper())
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith(".") and os.path.isdir(os.path.join(self.root, name))
+        )
+
+    def close(self) -> None:
+        """Closes append handles and drops cached maps."""
+        with self._lock:
+            for handle in self._files.values():
+                handle.close()
+            self._files.clear()
+            self._maps.clear()
+            self._last_timestamp.clear()
+            self._first_timestamp.clear()
+
+def backfill(store: OHLCVStore, symbol: str, hours: float, interval: float = 300, end: Optional[float] = None) -> int:
+    """Appends mock snapshots every `interval` seconds over the `hours` before `end` (now)."""
+    from tools import _generate_mock_marketdata
+
+    end = int(end if end is not None else time.time())
+    timestamps = np.arange(end - int(hours * 3600), end + 1, int(interval), dtype=np.int64)
+    snapshots = [_generate_mock_marketdata(symbol) for _ in timestamps]
+    columns = {field: [getattr(snapshot, field) for snapshot in snapshots] for field in _DATA_FIELDS}
+    columns["timestamp"] = timestamps
+    return store.extend(symbol, columns)
+
+# Snapshots fetched by the tools layer are appended here; empty HISTORY_DIR disables it
+history_store: Optional[OHLCVStore] = OHLCVStore(settings.HISTORY_DIR) if settings.HISTORY_DIR else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill mock OHLCV history")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--hours", type=float, default=48)
+    parser.add_argument("--interval", type=float, default=300, help="seconds between snapshots")
+    parser.add_argument("--dir", default=settings.HISTORY_DIR or "market_history")
+    args = parser.parse_args()
+
+    store = OHLCVStore(args.dir)
+    for symbol in args.symbols:
+        written = backfill(store, symbol, args.hours, args.interval)
+        print(f"{symbol.upper()}: wrote {written} rows, {store.count(symbol)} total in {args.dir}")
+    store.close()
@@ -0,0 +1,159 @@
+import math
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from config import settings
+from tools import MarketSnapshot, secret_indicator, snapshot_listeners
+
+def volume_factor(volume: Any) -> Any:
+    """The volume term of the secret indicator, for a scalar or an array."""
+    return volume / 1000000 * 0.1
+
+class RollingState:
+    """
+    Rolling indicator state of one symbol: the latest score, exponential
+    moving averages of the score and the volume factor, and the running
+    mean/std of the score (Welford). Fixed size, updated in O(1).
+    `snapshot` is the last one folded in, which `score` belongs to.
+    """
+
+    __slots__ = ("symbol", "count", "snapshot", "timestamp", "score", "score_ema", "volume_ema", "mean", "_m2")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.count = 0
+        self.snapshot: Optional[MarketSnapshot] = None
+        self.timestamp = 0
+        self.score = 0.0
+        self.score_ema = 0.0
+        self.volume_ema = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, snapshot: MarketSnapshot, score: float, alpha: float) -> None:
+        volume = volume_factor(snapshot.volume)
+        self.count += 1
+        self.snapshot = snapshot
+        self.timestamp = snapshot.timestamp
+        self.score = score
+        if self.count == 1:
+            self.score_ema = score
+            self.volume_ema = volume
+        else:
+            self.score_ema += alpha * (score - self.score_ema)
+            self.volume_ema += alpha * (volume - self.volume_ema)
+        delta = score - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (score - self.mean)
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation of the scores seen."""
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "count": self.count,
+            "timestamp": self.timestamp,
+            "score": self.score,
+            "score_ema": self.score_ema,
+            "volume_ema": self.volume_ema,
+            "mean": self.mean,
+            "std": self.std
+        }
+
+class IndicatorEngine:
+    """
+    Incremental secret indicator per symbol.
+
+    Every snapshot that arrives is scored once and folded into the symbol's
+    RollingState, so smoothed values are read in O(1) instead of rescanning
+    history. Snapshots are told apart by value, not by their (whole-second)
+    timestamp: a different snapshot from the same second is folded in, while
+    the last snapshot seen again or an older one is ignored.
+    """
+
+    def __init__(self, span: Optional[int] = None, scorer: Callable[[MarketSnapshot], float] = secret_indicator):
+        self.span = span if span is not None else settings.INDICATOR_EMA_SPAN
+        if self.span < 1:
+            raise ValueError("EMA span must be at least 1")
+        self.alpha = 2 / (self.span + 1)
+        self.scorer = scorer
+        self._states: Dict[str, RollingState] = {}
+        self._lock = threading.Lock()
+
+    def update(self, snapshot: MarketSnapshot, score: Optional[float] = None) -> Optional[RollingState]:
+        """
+        Folds a new snapshot into its symbol's state, scoring it with
+        `scorer` unless `score` is given. Returns the state, or None if the
+        snapshot is the last one seen again or older than it.
+        """
+        symbol = snapshot.symbol.upper()
+        state = self._states.get(symbol)
+        if state is not None and self._seen(state, snapshot):
+            return None
+        if score is None:
+            score = self.scorer(snapshot)
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is None:
+                state = self._states[symbol] = RollingState(symbol)
+            elif self._seen(state, snapshot):
+                return None
+            state.update(snapshot, score, self.alpha)
+        return state
+
+    @staticmethod
+    def _seen(state: RollingState, snapshot: MarketSnapshot) -> bool:
+        return snapshot.timestamp < state.timestamp or snapshot == state.snapshot
+
+    def get(self, symbol: str) -> Optional[RollingState]:
+        return self._states.get(symbol.upper())
+
+    def latest_score(self, snapshot: Any) -> Optional[float]:
+        """Score already computed for `snapshot` when it is the last one folded in for its symbol, else None."""
+        state = self._states.get(str(snapshot.get("symbol", "")).upper())
+        if state is None or state.snapshot is None or tuple(state.snapshot.items()) != tuple(snapshot.items()):
+            return None
+        return state.score
+
+    def value(self, symbol: str) -> Optional[float]:
+        """Current EMA of the indicator score, or None if nothing has arrived for `symbol`."""
+        state = self._states.get(symbol.upper())
+        return state.score_ema if state is not None else None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+def ema(values: ArrayLike, alpha: float) -> float:
+    """
+    Final value of an exponential moving average seeded with the first
+    value, computed in one vectorized pass (batch reference for RollingState).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        raise ValueError("EMA of an empty series")
+    weights = alpha * (1 - alpha) ** np.arange(len(values) - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (len(values) - 1)
+    return float(weights @ values)
+
+def batch_state(scores: ArrayLike, volume: ArrayLike, span: int) -> Dict[str, float]:
+    """Recomputes from full history what RollingState holds after the same updates."""
+    scores = np.asarray(scores, dtype=np.float64)
+    alpha = 2 / (span + 1)
+    return {
+        "count": len(scores),
+        "score": float(scores[-1]),
+        "score_ema": ema(scores, alpha),
+        "volume_ema": ema(volume_factor(np.asarray(volume, dtype=np.float64)), alpha),
+        "mean": float(scores.mean()),
+        "std": float(scores.std())
+    }
+
+indicator_engine = IndicatorEngine()
+snapshot_listeners.append(indicator_engine.update)
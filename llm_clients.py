@@ -0,0 +1,142 @@
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from config import settings
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_openai import ChatOpenAI
+
+ClientKey = Tuple[str, float, str]
+
+class LLMClientRegistry:
+    """
+    Hands out long-lived ChatOpenAI clients keyed by (model, temperature, base_url).
+
+    Every client shares one pooled sync and one pooled async HTTP transport,
+    so connections are kept alive and reused across calls and clients. The
+    async transport belongs to the event loop that first uses it; long-lived
+    services should call it from a single loop.
+
+    httpx and langchain_openai are only imported when the first client is
+    created, so processes that never reach the LLM don't pay for loading them.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: Optional[float] = None,
+        api_key: Optional[str] = None
+    ):
+        self.max_connections = max_connections if max_connections is not None else settings.LLM_MAX_CONNECTIONS
+        self.max_keepalive_connections = (
+            max_keepalive_connections if max_keepalive_connections is not None
+            else settings.LLM_MAX_KEEPALIVE_CONNECTIONS
+        )
+        self.keepalive_expiry = keepalive_expiry if keepalive_expiry is not None else settings.LLM_KEEPALIVE_EXPIRY
+        self.timeout = timeout if timeout is not None else settings.LLM_TIMEOUT
+        self.api_key = api_key if api_key is not None else settings.OPENAI_API_KEY
+        self._clients: Dict[ClientKey, "ChatOpenAI"] = {}
+        self._http_client: Optional["httpx.Client"] = None
+        self._http_async_client: Optional["httpx.AsyncClient"] = None
+        self._lock = threading.Lock()
+        # Held so close()'s aclose tasks aren't garbage collected mid-flight
+        self._closing = set()
+        self.created = 0
+        self.reused = 0
+
+    def _transports(self) -> Tuple["httpx.Client", "httpx.AsyncClient"]:
+        # Caller holds the lock.
+        if self._http_client is None:
+            import httpx
+
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            )
+            self._http_client = httpx.Client(limits=limits, timeout=self.timeout)
+            self._http_async_client = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+        return self._http_client, self._http_async_client
+
+    def get(self, model: str, temperature: float, base_url: str) -> "ChatOpenAI":
+        """
+        Returns the client for (model, temperature, base_url), creating it on first use.
+        """
+        key = (model, temperature, base_url)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self.reused += 1
+                return client
+
+            from langchain_openai import ChatOpenAI
+
+            http_client, http_async_client = self._transports()
+            client = ChatOpenAI(
+                api_key=self.api_key,
+                model=model,
+                temperature=temperature,
+                base_url=base_url,
+                timeout=self.timeout,
+                http_client=http_client,
+                http_async_client=http_async_client
+            )
+            self._clients[key] = client
+            self.created += 1
+            return client
+
+    def stats(self) -> Dict[str, int]:
+        """Get client creation and reuse counters."""
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "created": self.created,
+                "reused": self.reused
+            }
+
+    def _detach(self) -> Optional["httpx.AsyncClient"]:
+        """Drops all clients, closes the sync transport and hands back the async one to close."""
+        with self._lock:
+            self._clients.clear()
+            if self._http_client is not None:
+                self._http_client.close()
+            http_async_client = self._http_async_client
+            self._http_client = None
+            self._http_async_client = None
+            return http_async_client
+
+    def close(self) -> None:
+        """
+        Drop all clients and close both shared transports. Code that ran the
+        async transport on an event loop it owns should `await aclose()`
+        before that loop ends: once the loop is closed, its connections can
+        only be dropped. Inside a running loop the async transport is closed
+        in a task; await `aclose` there instead to wait for it.
+        """
+        http_async_client = self._detach()
+        if http_async_client is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            try:
+                asyncio.run(http_async_client.aclose())
+            except RuntimeError:
+                # Its connections belong to a loop that is already closed
+                pass
+        else:
+            task = loop.create_task(http_async_client.aclose())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def aclose(self) -> None:
+        """Drop all clients and close both shared transports."""
+        http_async_client = self._detach()
+        if http_async_client is not None:
+            await http_async_client.aclose()
+
+llm_clients = LLMClientRegistry()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Load test for the Market Analysis Agent.
+
+Replays a JSONL corpus of conversations through MarketAnalysisChat against
+the local stub LLM, with a configurable number of sessions in flight and a
+configurable fake market data latency, then reports per-intent p50/p95/p99
+latency, throughput and peak RSS:
+
+    python loadtest.py --concurrency 32 --fetch-latency 0.05 --output results.json
+    python loadtest.py --baseline results.json   # show changes against a previous run
+
+Each corpus line is one session: {"session": "id", "turns": ["Hello!", ...]}.
+Turns of a session are sent in order; sessions run concurrently.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_CORPUS = "corpus/conversations.jsonl"
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    """Reads one session per line, skipping blank lines."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def _summary(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {"count": 0}
+    values = np.asarray(latencies) * 1e3
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(latencies),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(values.max()), 3)
+    }
+
+async def _replay(sessions: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    from agent import MarketAnalysisChat
+    from llm_clients import llm_clients
+    from nodes import intent_matcher, intent_of
+
+    def intent(text: str) -> str:
+        name = intent_of(intent_matcher.match(text))
+        return "indicator" if name == "calculate_indicator" else name
+
+    latencies: Dict[str, List[float]] = {"greet": [], "indicator": [], "screen": [], "general": []}
+    errors: List[str] = []
+    queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    for session in sessions:
+        queue.put_nowait(session)
+
+    async def worker() -> None:
+        while not queue.empty():
+            session = queue.get_nowait()
+            chat = MarketAnalysisChat()
+            for text in session["turns"]:
+                start = time.perf_counter()
+                try:
+                    await chat.achat(text)
+                except Exception as e:
+                    errors.append(f"{session.get('session', '?')}: {type(e).__name__}: {e}")
+                    continue
+                latencies[intent(text)].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        # The pooled async LLM transport is bound to this loop, which ends with the replay
+        await llm_clients.aclose()
+    elapsed = time.perf_counter() - start
+
+    turns = sum(len(values) for values in latencies.values())
+    return {
+        "turns": turns,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_s": round(turns / elapsed, 2) if elapsed else 0.0,
+        "latency": {
+            "all": _summary([value for values in latencies.values() for value in values]),
+            **{name: _summary(values) for name, values in latencies.items()}
+        }
+    }
+
+def run(
+    corpus: str = DEFAULT_CORPUS,
+    concurrency: int = 16,
+    repeat: int = 1,
+    fetch_latency: float = 0.05,
+    llm_latency: float = 0.0,
+    llm_reply: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Replays `corpus` `repeat` times through the agent against a local stub
+    LLM and returns the results as a JSON-ready dict.
+    """
+    import tools
+    from cache import market_cache
+    from config import settings
+    from llm_clients import llm_clients
+    from stub_llm import DEFAULT_REPLY, StubLLMServer
+
+    sessions = [
+        {**session, "session": f"{session.get('session', i)}#{r}"}
+        for r in range(repeat)
+        for i, session in enumerate(load_corpus(corpus))
+    ]
+
+    stub = StubLLMServer(reply=llm_reply or DEFAULT_REPLY, latency=llm_latency).start()
+    saved = (settings.OPENAI_BASE_URL, llm_clients.api_key, tools.MOCK_FETCH_LATENCY)
+    settings.OPENAI_BASE_URL = stub.base_url
+    llm_clients.api_key = llm_clients.api_key or "stub"
+    tools.MOCK_FETCH_LATENCY = fetch_latency
+    market_cache.clear()
+    try:
+        results = asyncio.run(_replay(sessions, concurrency))
+    finally:
+        settings.OPENAI_BASE_URL, llm_clients.api_key, tools.MOCK_FETCH_LATENCY = saved
+        llm_clients.close()
+        stub.stop()
+
+    return {
+        "config": {
+            "corpus": corpus,
+            "sessions": len(sessions),
+            "concurrency": concurrency,
+            "repeat": repeat,
+            "fetch_latency_s": fetch_latency,
+            "llm_latency_s": llm_latency
+        },
+        **results,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "llm_requests": stub.requests,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        }
+    }
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Lines describing how throughput, latency and RSS moved against `baseline`."""
+    def change(new: float, old: float) -> str:
+        return f"{old:.2f} -> {new:.2f} ({(new - old) / old * 100:+.1f}%)" if old else f"{old} -> {new}"
+
+    lines = [
+        f"turns/s      {change(results['turns_per_s'], baseline['turns_per_s'])}",
+        f"peak RSS MB  {change(results['peak_rss_mb'], baseline['peak_rss_mb'])}"
+    ]
+    for name, summary in results["latency"].items():
+        old = baseline["latency"].get(name, {})
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if key in summary and key in old:
+                lines.append(f"{name:<9} {key:<6} {change(summary[key], old[key])}")
+    return lines
+
+def _print_report(results: Dict[str, Any]) -> None:
+    config = results["config"]
+    print(f"Replayed {config['sessions']} sessions ({results['turns']} turns) at concurrency "
+          f"{config['concurrency']}, fetch latency {config['fetch_latency_s']}s, LLM latency {config['llm_latency_s']}s")
+    print(f"{'intent':>10} {'turns':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, summary in results["latency"].items():
+        if summary["count"]:
+            print(f"{name:>10} {summary['count']:>7} {summary['p50_ms']:>9.2f} "
+                  f"{summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f}")
+    print(f"throughput {results['turns_per_s']:.1f} turns/s, peak RSS {results['peak_rss_mb']:.1f} MB, "
+          f"errors {results['errors']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSONL file with one session per line")
+    parser.add_argument("--concurrency", type=int, default=16, help="sessions in flight at once")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the corpus this many times")
+    parser.add_argument("--fetch-latency", type=float, default=0.05, help="fake market data latency in seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="stub LLM latency in seconds")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    args = parser.parse_args()
+
+    results = run(
+        corpus=args.corpus,
+        concurrency=args.concurrency,
+        repeat=args.repeat,
+        fetch_latency=args.fetch_latency,
+        llm_latency=args.llm_latency
+    )
+    _print_report(results)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nAgainst {args.baseline}:")
+        print("\n".join(compare(results, baseline)))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+if __name__ == "__main__":
+    main()
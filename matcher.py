@@ -0,0 +1,134 @@
+import re
+import string
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+GREET_KEYWORDS = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"]
+INDICATOR_KEYWORDS = ["secret indicator", "calculate", "analyze", "indicator", "indicators"]
+SCREEN_KEYWORDS = ["top", "screen", "screener", "rank", "ranking", "best"]
+# What a ranking word needs alongside (besides an indicator keyword) to ask for a screen
+SCORE_KEYWORDS = ["score", "scores", "scoring", "highest", "ranked by"]
+CRYPTO_KEYWORDS = ["crypto", "cryptos", "cryptocurrency", "cryptocurrencies", "coin", "coins", "token", "tokens"]
+
+DEFAULT_SYMBOL_ALIASES = {
+    "SOLANA": "SOL",
+    "BITCOIN": "BTC",
+    "ETHEREUM": "ETH",
+    "CARDANO": "ADA",
+    "POLKADOT": "DOT"
+}
+
+# Seconds per unit of a "last 24h" style window
+WINDOW_UNITS = {"M": 60, "MIN": 60, "MINS": 60, "MINUTE": 60, "MINUTES": 60,
+                "H": 3600, "HR": 3600, "HRS": 3600, "HOUR": 3600, "HOURS": 3600,
+                "D": 86400, "DAY": 86400, "DAYS": 86400,
+                "W": 604800, "WEEK": 604800, "WEEKS": 604800}
+
+# "LAST 24H", "PAST 2 DAYS", "LAST HOUR" in an upper-cased, space-separated message
+_WINDOW_PATTERN = re.compile(
+    r"\b(?:LAST|PAST) (?:(\d+) ?)?(" + "|".join(sorted(WINDOW_UNITS, key=len, reverse=True)) + r")\b"
+)
+
+# "TOP 20" in an upper-cased, space-separated message
+_TOP_PATTERN = re.compile(r"\bTOP (\d+)\b")
+
+class IntentMatch(NamedTuple):
+    greet: bool
+    indicator: bool
+    crypto: bool
+    symbols: List[str]
+    window: int = 0  # seconds of history asked for ("over the last 24h"), 0 for none
+    screen: bool = False  # ranking the universe ("top 20 tokens", "rank coins by indicator")
+    top: int = 0  # how many results "top <n>" asked for, 0 if not given
+
+# Maps ASCII punctuation to spaces so a plain split() yields words
+_SEPARATORS = str.maketrans({char: " " for char in string.punctuation})
+
+class IntentMatcher:
+    """
+    Precompiled single-pass matcher for intent keywords and ticker symbols.
+
+    The message is upper-cased and split into words once, and every word is
+    resolved through a single dict of keywords, symbols and aliases. All of
+    that runs in C, so matching cost does not grow with the number of
+    supported tickers. The few multi-word keyword phrases are checked with a
+    substring scan of the normalized message.
+    """
+
+    def __init__(self, symbols: Iterable[str], aliases: Optional[Dict[str, str]] = None):
+        self.symbols = [symbol.upper() for symbol in symbols]
+
+        lookup: Dict[str, Tuple[str, Optional[str]]] = {}
+        for symbol in self.symbols:
+            lookup[symbol] = ("symbol", symbol)
+        for alias, symbol in (DEFAULT_SYMBOL_ALIASES if aliases is None else aliases).items():
+            if symbol.upper() in lookup:
+                lookup[alias.upper()] = ("symbol", symbol.upper())
+
+        self._phrases: List[Tuple[str, str]] = []
+        groups = (
+            ("greet", GREET_KEYWORDS),
+            ("indicator", INDICATOR_KEYWORDS),
+            ("screen", SCREEN_KEYWORDS),
+            ("score", SCORE_KEYWORDS),
+            ("crypto", CRYPTO_KEYWORDS)
+        )
+        for kind, keywords in groups:
+            for keyword in keywords:
+                if " " in keyword:
+                    self._phrases.append((f" {keyword.upper()} ", kind))
+                else:
+                    lookup[keyword.upper()] = (kind, None)
+        self._lookup = lookup
+
+    def match(self, text: str) -> IntentMatch:
+        """
+        Scans `text` once and reports which keyword groups and symbols it mentions.
+        Symbols are returned in order of appearance without duplicates.
+
+        Only an explicit ranking request counts as a screen: "top <n>", or a
+        ranking word together with an indicator or score keyword. "Best
+        crypto wallet", "top crypto news" or "rank my coins" do not.
+        """
+        found = set()
+        symbols: Dict[str, None] = {}
+
+        words = text.upper().translate(_SEPARATORS).split()
+        for kind, symbol in filter(None, map(self._lookup.get, words)):
+            if symbol is not None:
+                symbols[symbol] = None
+            else:
+                found.add(kind)
+
+        if self._phrases:
+            normalized = f" {' '.join(words)} "
+            for phrase, kind in self._phrases:
+                if kind not in found and phrase in normalized:
+                    found.add(kind)
+
+        window = 0
+        if "LAST" in words or "PAST" in words:
+            window = parse_window(" ".join(words))
+        top = 0
+        if "TOP" in words:
+            found_top = _TOP_PATTERN.search(" ".join(words))
+            top = int(found_top.group(1)) if found_top else 0
+
+        return IntentMatch(
+            "greet" in found,
+            "indicator" in found,
+            "crypto" in found or bool(symbols),
+            list(symbols),
+            window,
+            top > 0 or ("screen" in found and ("indicator" in found or "score" in found)),
+            top
+        )
+
+def parse_window(text: str) -> int:
+    """
+    Seconds covered by the first "last/past <n><unit>" phrase in `text`
+    ("last 24h", "past 2 days", "last hour"), or 0 if there is none.
+    """
+    found = _WINDOW_PATTERN.search(text.upper().translate(_SEPARATORS))
+    if found is None:
+        return 0
+    return int(found.group(1) or 1) * WINDOW_UNITS[found.group(2)]
@@ -0,0 +1,97 @@
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from config import settings
+from metrics import metrics
+
+Summarizer = Callable[[str, List[BaseMessage]], str]
+
+def estimate_tokens(message: BaseMessage) -> int:
+    """Cheap token estimate (~4 characters per token)."""
+    return len(str(message.content)) // 4 + 1
+
+def extractive_summarizer(summary: str, evicted: List[BaseMessage], max_lines: int = 10) -> str:
+    """
+    Folds evicted messages into the running summary without calling the LLM.
+    Keeps one short line per evicted user message and at most `max_lines`
+    lines overall, so the summary stays bounded.
+    """
+    lines = summary.splitlines() if summary else []
+    for message in evicted:
+        if isinstance(message, HumanMessage):
+            text = " ".join(str(message.content).split())
+            lines.append(f"- User asked: {text[:80]}")
+    return "\n".join(lines[-max_lines:])
+
+def llm_summarizer(summary: str, evicted: List[BaseMessage]) -> str:
+    """
+    Folds evicted messages into the running summary with the LLM.
+    """
+    from nodes import get_llm_client
+
+    transcript = "\n".join(f"{message.type}: {message.content}" for message in evicted)
+    llm = get_llm_client(temperature=0.0)
+    response = llm.invoke([
+        {"role": "system", "content": "Update the running summary of a conversation with a market analysis assistant. Reply with the new summary only, in at most five short sentences."},
+        {"role": "user", "content": f"Current summary:\n{summary or '(empty)'}\n\nNew messages:\n{transcript}"}
+    ])
+    metrics.record_llm_call("summarize", response)
+    return response.content
+
+SUMMARIZERS = {
+    "extractive": extractive_summarizer,
+    "llm": llm_summarizer
+}
+
+class ConversationMemory:
+    """
+    Bounded conversation memory policy.
+
+    Keeps the most recent messages of a session within a message-count
+    and/or token window. Older messages are folded into a running summary
+    as they fall out of the window, so each turn does a constant amount of
+    work no matter how long the session lives. Limits default to the
+    MEMORY_* settings; pass 0 to disable one. With both disabled the memory
+    is unbounded.
+
+    The policy is stateless: the window and summary live in the session's
+    checkpoint and the graph applies `compact` at the end of every turn.
+    """
+
+    def __init__(
+        self,
+        max_messages: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        summarizer: Optional[Summarizer] = None
+    ):
+        if max_messages is None:
+            max_messages = settings.MEMORY_MAX_MESSAGES
+        if max_tokens is None:
+            max_tokens = settings.MEMORY_MAX_TOKENS
+        # 0 disables a limit
+        self.max_messages = max_messages or None
+        self.max_tokens = max_tokens or None
+        self.summarizer = summarizer if summarizer is not None else SUMMARIZERS[settings.MEMORY_SUMMARIZER]
+
+    def compact(self, messages: Sequence[BaseMessage], summary: str = "") -> Optional[Tuple[List[BaseMessage], str]]:
+        """
+        Returns (window, summary) with everything that falls out of the
+        window folded into the summary, or None if `messages` already fits.
+        The newest message is always kept, even if it alone exceeds the
+        token budget.
+        """
+        count = len(messages)
+        start = 0
+        if self.max_messages is not None and count > self.max_messages:
+            start = count - self.max_messages
+        if self.max_tokens is not None:
+            tokens = sum(estimate_tokens(message) for message in messages[start:])
+            while tokens > self.max_tokens and start < count - 1:
+                tokens -= estimate_tokens(messages[start])
+                start += 1
+
+        if not start:
+            return None
+        return list(messages[start:]), self.summarizer(summary, list(messages[:start]))
+
@@ -0,0 +1,230 @@
+import functools
+import inspect
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+
+PREFIX = "market_agent_"
+
+# Upper bounds in seconds, from in-process steps up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram (Prometheus style: each bucket counts
+    observations <= its upper bound, plus +Inf).
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-th quantile; like Prometheus,
+        the largest finite bound when it falls past the last bucket.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, total in zip(self.buckets, self.cumulative()):
+            if total >= rank:
+                return bound
+        return self.buckets[-1]
+
+class Metrics:
+    """
+    In-process counters and latency histograms for the agent.
+
+    Nodes and tools are wrapped with `node`/`tool`, which time every call
+    and count errors; the cache and LLM call sites add their own counters.
+    Everything is exported as Prometheus text (`to_prometheus`) or JSON
+    (`to_dict`/`to_json`). With `enabled` off the wrappers just call
+    through and recording returns immediately.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = enabled if enabled is not None else settings.METRICS_ENABLED
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help: str) -> None:
+        self._help[name] = help
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def _timed(self, histogram: str, errors: str, label: str, value: str) -> Callable:
+        """
+        Decorator timing a sync or async function into `histogram` and counting
+        failures into `errors`: raised exceptions, and results that route to
+        the error path by setting `error_message`.
+        """
+        def record(start: float, result: Any, failed: bool) -> None:
+            self.observe(histogram, time.perf_counter() - start, **{label: value})
+            if failed or (isinstance(result, dict) and result.get("error_message")):
+                self.inc(errors, **{label: value})
+
+        def decorate(fn: Callable) -> Callable:
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await fn(*args, **kwargs)
+                    start = time.perf_counter()
+                    try:
+                        result = await fn(*args, **kwargs)
+                    except BaseException:
+                        record(start, None, True)
+                        raise
+                    record(start, result, False)
+                    return result
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException:
+                    record(start, None, True)
+                    raise
+                record(start, result, False)
+                return result
+            return wrapper
+        return decorate
+
+    def node(self, name: str) -> Callable:
+        """Instruments a graph node: latency histogram and error count by node."""
+        return self._timed("node_duration_seconds", "node_errors_total", "node", name)
+
+    def tool(self, name: str) -> Callable:
+        """Instruments a tool function: latency histogram and error count by tool."""
+        return self._timed("tool_duration_seconds", "tool_errors_total", "tool", name)
+
+    def record_llm_call(self, node: str, message: Any) -> None:
+        """Counts one LLM call and the tokens reported in the reply's usage metadata."""
+        if not self.enabled:
+            return
+        self.inc("llm_calls_total", node=node)
+        usage = getattr(message, "usage_metadata", None) or {}
+        for kind in ("input", "output"):
+            tokens = usage.get(f"{kind}_tokens")
+            if tokens:
+                self.inc("llm_tokens_total", tokens, node=node, kind=kind)
+
+    def reset(self) -> None:
+        """Drop every recorded series."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot of every series, with p50/p95/p99 bucket bounds for histograms."""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "p50": histogram.quantile(0.5),
+                        "p95": histogram.quantile(0.95),
+                        "p99": histogram.quantile(0.99),
+                        "buckets": dict(zip([f"{bound:g}" for bound in histogram.buckets] + ["+Inf"], histogram.cumulative()))
+                    }
+                    for key, histogram in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        return {"enabled": self.enabled, "counters": counters, "histograms": histograms}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    @staticmethod
+    def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = labels + extra
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = PREFIX + name
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} counter")
+                for key, value in series.items():
+                    lines.append(f"{full}{self._format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                full = PREFIX + name
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} histogram")
+                for key, histogram in series.items():
+                    bounds = [f"{bound:g}" for bound in histogram.buckets] + ["+Inf"]
+                    for bound, total in zip(bounds, histogram.cumulative()):
+                        lines.append(f"{full}_bucket{self._format_labels(key, (('le', bound),))} {total}")
+                    lines.append(f"{full}_sum{self._format_labels(key)} {histogram.sum:g}")
+                    lines.append(f"{full}_count{self._format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+metrics.describe("node_duration_seconds", "Time spent in each graph node.")
+metrics.describe("node_errors_total", "Node calls that raised or routed to the error response.")
+metrics.describe("tool_duration_seconds", "Time spent in each tool call.")
+metrics.describe("tool_errors_total", "Tool calls that raised.")
+metrics.describe("market_cache_requests_total", "Market data cache lookups by result (hit, stale, miss).")
+metrics.describe("market_fetch_stale_total", "Fetches past the turn deadline answered from the last cached snapshot.")
+metrics.describe("llm_calls_total", "LLM calls by calling node.")
+metrics.describe("llm_tokens_total", "LLM tokens by calling node and kind (input, output).")
@@ -1,48 +1,93 @@
-from typing import Literal
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional, Tuple
 from langchain_core.messages import AIMessage, HumanMessage
-from langchain_openai import ChatOpenAI
-from state import MarketAnalysisState
-from tools import fetch_mock_marketdata, secret_indicator
+from langchain_core.runnables import RunnableConfig
+from state import MarketAnalysisState, ReplaceMessages
+from tools import MarketSnapshot, fetch_market_data_coalesced, afetch_market_data_coalesced, secret_indicator, secret_indicator_batch
+from cache import market_cache
+from hedging import DeadlineExceeded
+from feed import market_feed
+from history import history_store
+from indicators import indicator_engine
+from matcher import IntentMatch, IntentMatcher
+from memory import ConversationMemory
+from metrics import metrics
+from prefetch import prefetcher
+from screener import ScreenResult, ascreen, screen
+from llm_clients import llm_clients
+from response_cache import response_cache
 from config import settings
-import re
-
-def get_llm_client(temperature: float = 0.7) -> ChatOpenAI:
-    """Get LLM client with specified temperature."""
-    return ChatOpenAI(
-        api_key=settings.OPENAI_API_KEY,
-        model=settings.DEFAULT_MODEL,
-        temperature=temperature,
-        base_url=settings.OPENAI_BASE_URL
-    )
+import asyncio
+import time
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+# Worker pool for fanning out multi-symbol fetches on the sync path
+_fetch_pool = ThreadPoolExecutor(max_workers=settings.FETCH_POOL_SIZE, thread_name_prefix="market-fetch")
+
+# Compiled once; matches keywords and symbols in a single scan per message
+intent_matcher = IntentMatcher(settings.SUPPORTED_SYMBOLS)
+
+# Memory window applied to sessions that don't bring their own policy
+default_memory = ConversationMemory()
+
+def get_llm_client(temperature: float = 0.7) -> "ChatOpenAI":
+    """
+    Get the shared, pooled LLM client for the configured model and temperature.
+    The OpenAI stack is imported on the first call, i.e. the first general-intent turn.
+    """
+    return llm_clients.get(settings.DEFAULT_MODEL, temperature, settings.OPENAI_BASE_URL)
+
+def intent_of(match: IntentMatch) -> str:
+    """The intent a matched message routes to: "greet", "screen", "calculate_indicator" or "general"."""
+    if match.greet:
+        return "greet"
+    if match.screen and match.crypto and not match.symbols:
+        return "screen"
+    if match.indicator and match.crypto:
+        return "calculate_indicator"
+    return "general"
 
+def _greet() -> MarketAnalysisState:
+    return {"intent": "greet", "messages": [AIMessage(content=GREETING_RESPONSE)], "next_node": "compact_memory"}
+
+@metrics.node("intent_classifier")
 def intent_classifier_node(state: MarketAnalysisState) -> MarketAnalysisState:
     """
     Classifies user intent from the latest message.
     Determines if user wants to greet, calculate indicator, or general chat.
+    Greetings are answered here with the precomputed greeting, skipping the
+    response node.
     """
     if not state["messages"]:
-        return {"intent": "greet", "next_node": "response"}
+        return _greet()
     
     last_message = state["messages"][-1]
     if isinstance(last_message, HumanMessage):
-        user_input = last_message.content.lower()
+        match = intent_matcher.match(last_message.content)
+        intent = intent_of(match)
         
-        greet_patterns = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"]
-        if any(pattern in user_input for pattern in greet_patterns):
-            return {"intent": "greet", "next_node": "response"}
+        if intent == "greet":
+            return _greet()
         
-        indicator_patterns = ["secret indicator", "calculate", "analyze", "indicator"]
-        crypto_patterns = ["sol", "btc", "eth", "ada", "dot", "crypto", "coin", "token"]
+        if intent == "screen":
+            return {
+                "intent": "screen",
+                "top_k": match.top or settings.SCREENER_TOP_K,
+                "next_node": "screen_universe"
+            }
         
-        if (any(pattern in user_input for pattern in indicator_patterns) and 
-            any(pattern in user_input for pattern in crypto_patterns)):
-            
-            symbol_match = re.search(r'\b(SOL|BTC|ETH|ADA|DOT)\b', user_input.upper())
-            symbol = symbol_match.group(1) if symbol_match else "SOL"
+        if intent == "calculate_indicator":
+            symbols = match.symbols or ["SOL"]
+            prefetcher.record(symbols)
             
             return {
                 "intent": "calculate_indicator", 
-                "current_symbol": symbol,
+                "current_symbol": symbols[0],
+                "symbols": symbols,
+                "window": match.window,
                 "next_node": "fetch_market_data"
             }
         
@@ -50,50 +95,151 @@ def intent_classifier_node(state: MarketAnalysisState) -> MarketAnalysisState:
     
     return {"intent": "general", "next_node": "response"}
 
-def fetch_market_data_node(state: MarketAnalysisState) -> MarketAnalysisState:
+def _requested_symbols(state: MarketAnalysisState) -> List[str]:
+    return state.get("symbols") or [state.get("current_symbol") or "SOL"]
+
+def _fetch_deadline(config: Optional[RunnableConfig]) -> Optional[float]:
     """
-    Fetches market data for the specified symbol and caches it.
+    Monotonic deadline for this turn's fetches: FETCH_DEADLINE seconds from
+    now, or the "fetch_deadline" given in the run's configurable.
     """
-    symbol = state.get("current_symbol", "SOL")
+    seconds = ((config or {}).get("configurable") or {}).get("fetch_deadline", settings.FETCH_DEADLINE)
+    return time.monotonic() + seconds if seconds else None
+
+def _fetch_result(symbols: List[str], results: List[Any]) -> MarketAnalysisState:
+    """
+    Turns per-symbol fetch results (data or exception) into a state update.
+    Symbols whose fetch missed the deadline fall back to their last cached
+    snapshot and are listed in `stale_symbols`.
+    """
+    stale = []
+    for i, (symbol, result) in enumerate(zip(symbols, results)):
+        if isinstance(result, DeadlineExceeded):
+            fallback = market_cache.last(symbol)
+            if fallback is not None:
+                results[i] = fallback
+                stale.append(symbol)
+                metrics.inc("market_fetch_stale_total")
     
-    try:
-        if symbol in state.get("market_data_cache", {}):
-            return {"next_node": "calculate_secret_indicator"}
-        
-        market_data = fetch_mock_marketdata(symbol)
-        
-        cache_update = {symbol: market_data}
-        
+    failed = [symbol for symbol, result in zip(symbols, results) if isinstance(result, Exception)]
+    if failed:
+        error = next(result for result in results if isinstance(result, Exception))
         return {
-            "market_data_cache": cache_update,
-            "next_node": "calculate_secret_indicator"
-        }
-        
-    except Exception as e:
-        return {
-            "error_message": f"Failed to fetch market data for {symbol}: {str(e)}",
+            "error_message": f"Failed to fetch market data for {', '.join(failed)}: {str(error) or type(error).__name__}",
             "next_node": "error_response"
         }
+    
+    return {
+        "market_data_cache": dict(zip(symbols, results)),
+        "stale_symbols": stale,
+        "next_node": "calculate_secret_indicator"
+    }
 
+def _fetch_one(symbol: str, deadline: Optional[float] = None) -> Any:
+    try:
+        return market_cache.get_or_fetch(symbol, partial(fetch_market_data_coalesced, deadline=deadline))
+    except Exception as e:
+        return e
+
+@metrics.node("fetch_market_data")
+def fetch_market_data_node(state: MarketAnalysisState, config: RunnableConfig) -> MarketAnalysisState:
+    """
+    Fetches market data for every requested symbol. Symbols covered by the
+    background market feed are read from it with no I/O; the rest go through
+    the shared market cache, in parallel on a worker pool when there are
+    several, so the node takes about one fetch latency regardless of how
+    many were asked for. Upstream calls are hedged and bounded by the turn's
+    fetch deadline.
+    """
+    symbols = _requested_symbols(state)
+    results = [market_feed.latest(symbol) for symbol in symbols]
+    pending = [i for i, result in enumerate(results) if result is None]
+    fetch = partial(_fetch_one, deadline=_fetch_deadline(config))
+    
+    if len(pending) == 1:
+        results[pending[0]] = fetch(symbols[pending[0]])
+    elif pending:
+        for i, result in zip(pending, _fetch_pool.map(fetch, [symbols[i] for i in pending])):
+            results[i] = result
+    
+    return _fetch_result(symbols, results)
+
+@metrics.node("fetch_market_data")
+async def afetch_market_data_node(state: MarketAnalysisState, config: RunnableConfig) -> MarketAnalysisState:
+    """
+    Async variant of `fetch_market_data_node` that awaits all fetches concurrently.
+    """
+    symbols = _requested_symbols(state)
+    results = [market_feed.latest(symbol) for symbol in symbols]
+    pending = [i for i, result in enumerate(results) if result is None]
+    afetch = partial(afetch_market_data_coalesced, deadline=_fetch_deadline(config))
+    
+    fetched = await asyncio.gather(
+        *(market_cache.aget_or_fetch(symbols[i], afetch) for i in pending),
+        return_exceptions=True
+    )
+    for i, result in zip(pending, fetched):
+        results[i] = result
+    
+    return _fetch_result(symbols, results)
+
+def _window_indicator(symbol: str, window: int) -> Tuple[Optional[float], int]:
+    """
+    Mean indicator score over the stored history of the last `window`
+    seconds, and the number of rows scored. Only that range of the
+    memory-mapped columns is read. (None, 0) when nothing is stored.
+    """
+    if history_store is None:
+        return None, 0
+    end = time.time()
+    columns = history_store.range(symbol, end - window, end, fields=("price", "volume", "market_cap", "change_24h"))
+    points = len(columns["price"])
+    if not points:
+        return None, 0
+    scores = secret_indicator_batch(columns["price"], columns["volume"], columns["market_cap"], columns["change_24h"])
+    return round(float(scores.mean()), 2), points
+
+@metrics.node("calculate_secret_indicator")
 def calculate_secret_indicator_node(state: MarketAnalysisState) -> MarketAnalysisState:
     """
-    Calculates the secret indicator using cached market data.
+    Calculates the secret indicator for every requested symbol using cached market data.
+    When a time window was asked for, each symbol is scored over its stored
+    history in that window instead, falling back to the current snapshot
+    when there is none. A snapshot the indicator engine already scored on
+    arrival is not scored again.
     """
-    symbol = state.get("current_symbol", "SOL")
+    symbols = _requested_symbols(state)
     market_data_cache = state.get("market_data_cache", {})
     
     try:
-        if symbol not in market_data_cache:
+        missing = [symbol for symbol in symbols if symbol not in market_data_cache]
+        if missing:
             return {
-                "error_message": f"No market data found for {symbol}",
+                "error_message": f"No market data found for {', '.join(missing)}",
                 "next_node": "error_response"
             }
         
-        market_data = market_data_cache[symbol]
-        indicator_result = secret_indicator(market_data)
+        indicator_results = {}
+        window_points = {}
+        window = state.get("window") or 0
+        for symbol in symbols:
+            score, points = _window_indicator(symbol, window) if window else (None, 0)
+            if score is None:
+                score = indicator_engine.latest_score(market_data_cache[symbol])
+            indicator_results[symbol] = score if score is not None else secret_indicator(market_data_cache[symbol])
+            if window:
+                window_points[symbol] = points
+        # Smoothed scores are kept up to date as snapshots arrive; just read them
+        indicator_ema = {
+            symbol: round(value, 2) for symbol in symbols
+            if (value := indicator_engine.value(symbol)) is not None
+        }
         
         return {
-            "secret_indicator_result": indicator_result,
+            "secret_indicator_result": indicator_results[symbols[0]],
+            "indicator_results": indicator_results,
+            "indicator_ema": indicator_ema,
+            "window_points": window_points,
             "next_node": "response"
         }
         
@@ -103,59 +249,237 @@ def calculate_secret_indicator_node(state: MarketAnalysisState) -> MarketAnalysi
             "next_node": "error_response"
         }
 
-def response_node(state: MarketAnalysisState) -> MarketAnalysisState:
+def _screen_update(result: ScreenResult) -> MarketAnalysisState:
+    if not result.hits:
+        return {
+            "error_message": f"Couldn't fetch market data for any of the {result.errors:,} screened symbols",
+            "next_node": "error_response"
+        }
+    return {
+        "screen_results": {
+            "hits": [
+                {"symbol": hit.symbol, "score": round(hit.score, 2), "price": hit.snapshot.price,
+                 "change_24h": hit.snapshot.change_24h}
+                for hit in result.hits
+            ],
+            "screened": result.screened,
+            "errors": result.errors,
+            "elapsed": round(result.elapsed, 2)
+        },
+        "next_node": "response"
+    }
+
+@metrics.node("screen_universe")
+def screen_universe_node(state: MarketAnalysisState) -> MarketAnalysisState:
     """
-    Generates appropriate response based on intent and available data.
+    Ranks the whole symbol universe by the secret indicator and keeps the top k.
+    """
+    try:
+        return _screen_update(screen(state.get("top_k") or settings.SCREENER_TOP_K))
+    except Exception as e:
+        return {"error_message": f"Failed to screen the universe: {str(e)}", "next_node": "error_response"}
+
+@metrics.node("screen_universe")
+async def ascreen_universe_node(state: MarketAnalysisState) -> MarketAnalysisState:
+    """
+    Async variant of `screen_universe_node`.
+    """
+    try:
+        return _screen_update(await ascreen(state.get("top_k") or settings.SCREENER_TOP_K))
+    except Exception as e:
+        return {"error_message": f"Failed to screen the universe: {str(e)}", "next_node": "error_response"}
+
+GREETING_RESPONSE = "Hello! I'm your market analysis assistant. I can help you calculate secret indicators for cryptocurrencies like SOL, BTC, ETH, ADA, and DOT. Just ask me to analyze any of these symbols!"
+
+GENERAL_SYSTEM_PROMPT = "You are a helpful market analysis assistant. Respond conversationally and guide users to ask about secret indicator calculations for cryptocurrencies."
+
+INTERPRETATION_GUIDE = """💡 Interpretation:
+• Score 0-30: Weak signal
+• Score 31-60: Moderate signal  
+• Score 61-80: Strong signal
+• Score 81-100: Very strong signal"""
+
+def _signal_strength(indicator_result: float) -> str:
+    return "Very strong" if indicator_result > 80 else "Strong" if indicator_result > 60 else "Moderate" if indicator_result > 30 else "Weak"
+
+def _market_data_lines(market_data: MarketSnapshot) -> str:
+    return f"""• Price: ${market_data.price:,.2f}
+• 24h Change: {market_data.change_24h:+.2f}%
+• Volume: {market_data.volume:,}
+• Market Cap: ${market_data.market_cap:,}"""
+
+def _format_window(seconds: int) -> str:
+    if seconds >= 2 * 86400 and seconds % 86400 == 0:
+        return f"{seconds // 86400}d"
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    return f"{max(1, seconds // 60)}m"
+
+def _window_note(state: MarketAnalysisState, symbol: str) -> str:
+    """What a windowed score covers, or "" for a plain snapshot score."""
+    window = state.get("window") or 0
+    if not window:
+        return ""
+    points = (state.get("window_points") or {}).get(symbol, 0)
+    if not points:
+        return f" (no stored history for the last {_format_window(window)}, scored on the current snapshot)"
+    return f" (average of {points} data point{'s' if points != 1 else ''} over the last {_format_window(window)})"
+
+def _stale_line(state: MarketAnalysisState, symbol: str) -> str:
+    if symbol not in (state.get("stale_symbols") or []):
+        return ""
+    timestamp = (state.get("market_data_cache") or {})[symbol].get("timestamp")
+    as_of = time.strftime("%H:%M:%S UTC", time.gmtime(timestamp)) if timestamp else "earlier"
+    return f"\n⚠️ Live data timed out; showing the last cached snapshot (as of {as_of})"
+
+def _ema_line(state: MarketAnalysisState, symbol: str) -> str:
+    value = (state.get("indicator_ema") or {}).get(symbol)
+    if value is None:
+        return ""
+    return f"\n📈 Smoothed Score (EMA-{indicator_engine.span}): {value}/100"
+
+def _templated_response(state: MarketAnalysisState) -> Optional[str]:
+    """
+    Builds the response for intents that don't need the LLM.
+    Returns None for general intents.
     """
     intent = state.get("intent", "general")
     
     if intent == "greet":
-        response = "Hello! I'm your market analysis assistant. I can help you calculate secret indicators for cryptocurrencies like SOL, BTC, ETH, ADA, and DOT. Just ask me to analyze any of these symbols!"
+        return GREETING_RESPONSE
         
-    elif intent == "calculate_indicator":
-        symbol = state.get("current_symbol", "SOL")
-        indicator_result = state.get("secret_indicator_result")
+    if intent == "screen":
+        results = state.get("screen_results") or {}
+        hits = results.get("hits") or []
+        if not hits:
+            return "I apologize, but I couldn't complete the screen. Please try again."
+        lines = "\n".join(
+            f"{rank:>2}. {hit['symbol']}: {hit['score']}/100 ({_signal_strength(hit['score'])}) • "
+            f"${hit['price']:,.2f} • {hit['change_24h']:+.2f}%"
+            for rank, hit in enumerate(hits, 1)
+        )
+        return f"""🏆 Top {len(hits)} of {results['screened']:,} tokens by Secret Indicator:
+
+{lines}
+
+{INTERPRETATION_GUIDE}
+"""
+    
+    if intent == "calculate_indicator":
+        symbols = _requested_symbols(state)
+        indicator_results = state.get("indicator_results") or {}
         market_data_cache = state.get("market_data_cache", {})
         
-        if indicator_result is not None and symbol in market_data_cache:
+        if len(symbols) == 1 and symbols[0] not in indicator_results:
+            # Single-symbol states may only carry the scalar result
+            indicator_results = {symbols[0]: state.get("secret_indicator_result")}
+        
+        missing = [
+            symbol for symbol in symbols
+            if indicator_results.get(symbol) is None or symbol not in market_data_cache
+        ]
+        if missing:
+            return f"I apologize, but I couldn't complete the analysis for {', '.join(missing)}. Please try again."
+        
+        if len(symbols) == 1:
+            symbol = symbols[0]
+            indicator_result = indicator_results[symbol]
             market_data = market_data_cache[symbol]
-            response = f"""🔍 Secret Indicator Analysis for {symbol}:
+            return f"""🔍 Secret Indicator Analysis for {symbol}:
 
 📊 Current Market Data:
-• Price: ${market_data['price']:,.2f}
-• 24h Change: {market_data['24h_change']:+.2f}%
-• Volume: {market_data['volume']:,}
-• Market Cap: ${market_data['market_cap']:,}
+{_market_data_lines(market_data)}{_stale_line(state, symbol)}
 
-🎯 Secret Indicator Score: {indicator_result}/100
+🎯 Secret Indicator Score: {indicator_result}/100{_window_note(state, symbol)}{_ema_line(state, symbol)}
 
-💡 Interpretation:
-• Score 0-30: Weak signal
-• Score 31-60: Moderate signal  
-• Score 61-80: Strong signal
-• Score 81-100: Very strong signal
+{INTERPRETATION_GUIDE}
 
-Current signal strength: {"Very strong" if indicator_result > 80 else "Strong" if indicator_result > 60 else "Moderate" if indicator_result > 30 else "Weak"}
+Current signal strength: {_signal_strength(indicator_result)}
 """
-        else:
-            response = f"I apologize, but I couldn't complete the analysis for {symbol}. Please try again."
-            
-    else:
+        
+        sections = "\n\n".join(
+            f"""📊 {symbol}:
+{_market_data_lines(market_data_cache[symbol])}{_stale_line(state, symbol)}
+🎯 Secret Indicator Score: {indicator_results[symbol]}/100 ({_signal_strength(indicator_results[symbol])} signal){_window_note(state, symbol)}{_ema_line(state, symbol)}"""
+            for symbol in symbols
+        )
+        return f"""🔍 Secret Indicator Analysis for {', '.join(symbols)}:
+
+{sections}
+
+{INTERPRETATION_GUIDE}
+"""
+    
+    return None
+
+def _general_prompt(content: str, summary: str = "") -> List[Dict[str, str]]:
+    """Prompt for a general answer, with the running summary of earlier turns as context if there is one."""
+    prompt = [{"role": "system", "content": GENERAL_SYSTEM_PROMPT}]
+    if summary:
+        prompt.append({"role": "system", "content": f"Summary of the conversation so far:\n{summary}"})
+    prompt.append({"role": "user", "content": content})
+    return prompt
+
+@metrics.node("response")
+def response_node(state: MarketAnalysisState) -> MarketAnalysisState:
+    """
+    Generates appropriate response based on intent and available data.
+    General answers see the running summary of earlier turns and are served
+    from the response cache when possible (only while there is no summary).
+    """
+    response = _templated_response(state)
+    
+    if response is None:
         # General response using LLM
-        llm = get_llm_client(temperature=0.7)
         last_message = state["messages"][-1] if state["messages"] else None
         
         if last_message:
-            llm_response = llm.invoke([
-                {"role": "system", "content": "You are a helpful market analysis assistant. Respond conversationally and guide users to ask about secret indicator calculations for cryptocurrencies."},
-                {"role": "user", "content": last_message.content}
-            ])
-            response = llm_response.content
+            # An answer given in the context of a summary is specific to this conversation
+            summary = state.get("summary", "")
+            response = None if summary else response_cache.get(last_message.content, settings.DEFAULT_MODEL)
+            if response is None:
+                llm = get_llm_client(temperature=0.7)
+                start = time.perf_counter()
+                llm_response = llm.invoke(_general_prompt(last_message.content, summary))
+                metrics.record_llm_call("response", llm_response)
+                response = llm_response.content
+                if not summary:
+                    response_cache.put(last_message.content, response, settings.DEFAULT_MODEL,
+                                       latency=time.perf_counter() - start)
         else:
             response = "How can I help you with market analysis today?"
     
     return {"messages": [AIMessage(content=response)]}
 
+@metrics.node("response")
+async def aresponse_node(state: MarketAnalysisState) -> MarketAnalysisState:
+    """
+    Async variant of `response_node` that awaits the LLM call.
+    """
+    response = _templated_response(state)
+    
+    if response is None:
+        last_message = state["messages"][-1] if state["messages"] else None
+        
+        if last_message:
+            # An answer given in the context of a summary is specific to this conversation
+            summary = state.get("summary", "")
+            response = None if summary else response_cache.get(last_message.content, settings.DEFAULT_MODEL)
+            if response is None:
+                llm = get_llm_client(temperature=0.7)
+                start = time.perf_counter()
+                llm_response = await llm.ainvoke(_general_prompt(last_message.content, summary))
+                metrics.record_llm_call("response", llm_response)
+                response = llm_response.content
+                if not summary:
+                    response_cache.put(last_message.content, response, settings.DEFAULT_MODEL,
+                                       latency=time.perf_counter() - start)
+        else:
+            response = "How can I help you with market analysis today?"
+    
+    return {"messages": [AIMessage(content=response)]}
+
+@metrics.node("error_response")
 def error_response_node(state: MarketAnalysisState) -> MarketAnalysisState:
     """
     Handles error cases and provides helpful error messages.
@@ -166,7 +490,23 @@ def error_response_node(state: MarketAnalysisState) -> MarketAnalysisState:
     
     return {"messages": [AIMessage(content=response)]}
 
-def determine_next_node(state: MarketAnalysisState) -> Literal["response", "error_response"]:
+@metrics.node("compact_memory")
+def compact_memory_node(state: MarketAnalysisState, config: RunnableConfig) -> Optional[MarketAnalysisState]:
+    """
+    Keeps the session's history inside its memory window, folding older
+    messages into the running summary. Uses the ConversationMemory passed
+    as `memory` in the run's configurable, or the default policy.
+    """
+    memory = config.get("configurable", {}).get("memory") or default_memory
+    compacted = memory.compact(state["messages"], state.get("summary", ""))
+    if compacted is None:
+        return None
+    window, summary = compacted
+    return {"messages": ReplaceMessages(window), "summary": summary}
+
+def determine_next_node(state: MarketAnalysisState) -> Literal[
+    "fetch_market_data", "calculate_secret_indicator", "screen_universe", "response", "error_response", "compact_memory"
+]:
     """
     Determines the next node based on the current state.
     """
@@ -0,0 +1,237 @@
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from cache import MarketDataCache, market_cache
+from config import settings
+from feed import MarketFeed, market_feed
+from metrics import metrics
+from tools import fetch_market_data_coalesced
+
+Fetcher = Callable[..., Any]
+
+class Prefetcher:
+    """
+    Keeps the hottest symbols warm in the market cache.
+
+    `record` counts requests per symbol, decayed with a `half_life` so the
+    counts follow current traffic. Every `interval` seconds a daemon thread
+    takes the `top_n` symbols with the highest counts (a single recent
+    request is not enough to be hot) and refreshes those whose cache entry
+    stops being fresh within `lead` seconds, soonest first, so requests for
+    them find a fresh entry instead of paying for a fetch. Refreshes spend
+    at most `budget` upstream calls per minute (a token bucket holding up to
+    one round of `top_n` calls); symbols the running market feed covers are
+    left to it.
+
+    Requests served a prefetched snapshot count as prefetch hits; a
+    prefetched snapshot replaced before any request was served it was
+    wasted budget. `cold_hot_requests` counts requests for a hot symbol
+    that still found no fresh entry.
+    """
+
+    def __init__(
+        self,
+        cache: MarketDataCache = market_cache,
+        fetcher: Fetcher = fetch_market_data_coalesced,
+        top_n: Optional[int] = None,
+        budget: Optional[float] = None,
+        interval: Optional[float] = None,
+        half_life: Optional[float] = None,
+        lead: Optional[float] = None,
+        feed: Optional[MarketFeed] = market_feed,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.cache = cache
+        self.fetcher = fetcher
+        self.top_n = top_n if top_n is not None else settings.PREFETCH_TOP_N
+        self.budget = budget if budget is not None else settings.PREFETCH_BUDGET
+        self.interval = interval if interval is not None else settings.PREFETCH_INTERVAL
+        self.half_life = half_life if half_life is not None else settings.PREFETCH_HALF_LIFE
+        # Refresh early enough to cover the wait for the next check plus a fetch
+        self.lead = lead if lead is not None else self.interval + (settings.FETCH_DEADLINE or 1.0)
+        self.feed = feed
+        self._clock = clock
+        # symbol -> (decayed request count, when it was last decayed)
+        self._counts: Dict[str, List[float]] = {}
+        # symbol -> [last prefetched snapshot, whether a request was served it]
+        self._prefetched: Dict[str, List[Any]] = {}
+        self._hot: List[str] = []
+        self._tokens = float(max(1, self.top_n))
+        self._refilled_at = clock()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, self.top_n), thread_name_prefix="prefetch")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._reset_counters()
+
+    def _reset_counters(self) -> None:
+        self.requests = 0
+        self.hot_requests = 0
+        self.prefetch_hits = 0
+        self.cold_hot_requests = 0
+        self.prefetches = 0
+        self.wasted = 0
+        self.budget_skips = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _decayed(self, count: List[float], now: float) -> float:
+        count[0] *= 0.5 ** ((now - count[1]) / self.half_life)
+        count[1] = now
+        return count[0]
+
+    def _feed_covers(self, symbol: str) -> bool:
+        return self.feed is not None and self.feed.running and symbol in self.feed.rings
+
+    def record(self, symbols: Iterable[str]) -> None:
+        """
+        Counts a request for `symbols`, made just before they are fetched,
+        and notes whether each will be served a prefetched, otherwise warm,
+        or cold entry.
+        """
+        now = self._clock()
+        for symbol in symbols:
+            symbol = symbol.upper()
+            data = self.cache.get(symbol)
+            with self._lock:
+                count = self._counts.get(symbol)
+                if count is None:
+                    self._counts[symbol] = [1.0, now]
+                else:
+                    self._decayed(count, now)
+                    count[0] += 1
+                self.requests += 1
+                hot = symbol in self._hot
+                self.hot_requests += hot
+                prefetched = self._prefetched.get(symbol)
+                if data is not None and prefetched is not None and prefetched[0] is data:
+                    prefetched[1] = True
+                    self.prefetch_hits += 1
+                    result = "prefetched"
+                elif data is not None or self._feed_covers(symbol):
+                    result = "warm"
+                else:
+                    self.cold_hot_requests += hot
+                    result = "cold"
+            metrics.inc("market_prefetch_requests_total", result=result)
+
+    def hot(self) -> List[str]:
+        """The `top_n` hottest symbols, hottest first."""
+        now = self._clock()
+        with self._lock:
+            for symbol, count in list(self._counts.items()):
+                # Forget symbols nobody has asked for in a long while
+                if self._decayed(count, now) < 0.01:
+                    del self._counts[symbol]
+            ranked = heapq.nlargest(self.top_n, self._counts.items(), key=lambda item: item[1][0])
+            self._hot = [symbol for symbol, count in ranked if count[0] > 1.0]
+            return list(self._hot)
+
+    def _take_token(self) -> bool:
+        now = self._clock()
+        with self._lock:
+            capacity = float(max(1, self.top_n))
+            self._tokens = min(capacity, self._tokens + (now - self._refilled_at) * self.budget / 60)
+            self._refilled_at = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def _prefetch(self, symbol: str) -> None:
+        deadline = time.monotonic() + settings.FETCH_DEADLINE if settings.FETCH_DEADLINE else None
+        try:
+            data = self.fetcher(symbol, deadline=deadline)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            metrics.inc("market_prefetch_fetches_total", result="error")
+            return
+        self.cache.put(symbol, data)
+        with self._lock:
+            self.prefetches += 1
+            previous = self._prefetched.get(symbol)
+            if previous is not None and not previous[1]:
+                self.wasted += 1
+            self._prefetched[symbol] = [data, False]
+        metrics.inc("market_prefetch_fetches_total", result="ok")
+
+    def tick(self) -> List[str]:
+        """
+        Refreshes the hot symbols about to expire, within the budget, and
+        returns the ones refreshed.
+        """
+        due = []
+        for symbol in self.hot():
+            if self._feed_covers(symbol):
+                continue
+            expires_in = self.cache.expires_in(symbol)
+            if expires_in is None or expires_in <= self.lead:
+                due.append((expires_in if expires_in is not None else float("-inf"), symbol))
+
+        refreshed = []
+        # Soonest to expire first; stable, so ties stay hottest first
+        for _, symbol in sorted(due, key=lambda item: item[0]):
+            if not self._take_token():
+                with self._lock:
+                    self.budget_skips += len(due) - len(refreshed)
+                metrics.inc("market_prefetch_fetches_total", len(due) - len(refreshed), result="over_budget")
+                break
+            refreshed.append(symbol)
+        list(self._pool.map(self._prefetch, refreshed))
+        return refreshed
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            started = self._clock()
+            self.tick()
+            self._stop.wait(max(0.0, self.interval - (self._clock() - started)))
+
+    def start(self) -> "Prefetcher":
+        """Starts the prefetch thread (no-op if already running)."""
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="prefetch")
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self) -> None:
+        """Forgets request counts and prefetched snapshots and resets the counters."""
+        with self._lock:
+            self._counts.clear()
+            self._prefetched.clear()
+            self._hot = []
+            self._reset_counters()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self.running,
+                "hot": list(self._hot),
+                "requests": self.requests,
+                "hot_requests": self.hot_requests,
+                "prefetch_hits": self.prefetch_hits,
+                "hit_ratio": self.prefetch_hits / self.requests if self.requests else 0.0,
+                "cold_hot_requests": self.cold_hot_requests,
+                "prefetches": self.prefetches,
+                "wasted": self.wasted,
+                "wasted_ratio": self.wasted / self.prefetches if self.prefetches else 0.0,
+                "budget_skips": self.budget_skips,
+                "errors": self.errors
+            }
+
+prefetcher = Prefetcher()
+metrics.describe("market_prefetch_requests_total", "Indicator symbol requests by the cache entry they found (prefetched, warm, cold).")
+metrics.describe("market_prefetch_fetches_total", "Prefetch refreshes by result (ok, error, over_budget).")
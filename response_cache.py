@@ -0,0 +1,184 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from config import settings
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalizes a prompt for exact-match lookup: case, surrounding whitespace,
+    repeated whitespace and trailing punctuation are ignored.
+    """
+    return re.sub(r"\s+", " ", prompt.strip().lower()).rstrip(" ?!.")
+
+class SQLiteResponseBackend:
+    """
+    Persistent response store in a local SQLite file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Returns (response, stored_at) or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, response: str, stored_at: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, stored_at) VALUES (?, ?, ?)",
+                (key, response, stored_at)
+            )
+
+    def delete_older_than(self, cutoff: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE stored_at < ?", (cutoff,))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class ResponseCache:
+    """
+    Exact-match cache for general-intent LLM answers.
+
+    Prompts are normalized and looked up in a bounded in-memory LRU with a
+    TTL, optionally backed by a persistent store (e.g. SQLiteResponseBackend)
+    that survives restarts. Hits skip the LLM entirely; the latency saved is
+    estimated from the average latency of the LLM calls that filled the cache.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        backend: Optional[SQLiteResponseBackend] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.enabled = enabled
+        self.max_size = max_size if max_size is not None else settings.RESPONSE_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else settings.RESPONSE_CACHE_TTL
+        self.backend = backend
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._reset_counters()
+        if self.backend is not None:
+            self.backend.delete_older_than(self._clock() - self.ttl)
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.llm_calls = 0
+        self.llm_latency_total = 0.0
+        self.latency_saved = 0.0
+
+    @staticmethod
+    def key(prompt: str, model: str = "") -> str:
+        return f"{model}\x00{normalize_prompt(prompt)}"
+
+    def _avg_llm_latency(self) -> float:
+        return self.llm_latency_total / self.llm_calls if self.llm_calls else 0.0
+
+    def get(self, prompt: str, model: str = "") -> Optional[str]:
+        """Returns the cached answer for `prompt`, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        key = self.key(prompt, model)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None and self.backend is not None:
+            entry = self.backend.get(key)
+            if entry is not None and now - entry[1] > self.ttl:
+                entry = None
+            if entry is not None:
+                self._store(key, entry)
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.latency_saved += self._avg_llm_latency()
+            return entry[0]
+
+    def put(self, prompt: str, response: str, model: str = "", latency: Optional[float] = None) -> None:
+        """
+        Stores an LLM answer. `latency` is how long the LLM call took and feeds
+        the latency-saved estimate.
+        """
+        if not self.enabled:
+            return
+
+        key = self.key(prompt, model)
+        entry = (response, self._clock())
+        self._store(key, entry)
+        if self.backend is not None:
+            self.backend.set(key, response, entry[1])
+        if latency is not None:
+            with self._lock:
+                self.llm_calls += 1
+                self.llm_latency_total += latency
+
+    def _store(self, key: str, entry: Tuple[str, float]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries (including the backend) and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self._reset_counters()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Get hit rate, eviction and latency-saved counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "avg_llm_latency": self._avg_llm_latency(),
+                "latency_saved": self.latency_saved
+            }
+
+response_cache = ResponseCache(
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+    backend=SQLiteResponseBackend(settings.RESPONSE_CACHE_DB) if settings.RESPONSE_CACHE_DB else None
+)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Universe-wide screener: ranks every symbol of a (large) universe by the
+secret indicator and keeps the top k.
+
+    python screener.py --top 20 --universe 10000 --workers 4
+
+The universe is split into one shard per worker process. Each worker
+fetches its shard concurrently on its own event loop, scores every batch
+of snapshots in one vectorized pass and keeps only its k best in a
+min-heap, so memory stays O(k) per worker however large the universe is.
+The per-shard heaps are merged into the final ranking.
+"""
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import tools
+from config import settings
+from tools import MarketSnapshot, afetch_mock_marketdata, secret_indicator_batch
+
+class ScreenHit(NamedTuple):
+    symbol: str
+    score: float
+    snapshot: MarketSnapshot
+
+class ScreenResult(NamedTuple):
+    hits: List[ScreenHit]  # best first
+    screened: int
+    errors: int
+    workers: int
+    elapsed: float
+
+# (score, symbol, snapshot); ordered by score, ties by symbol
+_Entry = Tuple[float, str, MarketSnapshot]
+
+def default_universe(size: Optional[int] = None) -> List[str]:
+    """The supported symbols plus `size` (SCREENER_UNIVERSE_SIZE) synthetic tickers."""
+    size = size if size is not None else settings.SCREENER_UNIVERSE_SIZE
+    return list(settings.SUPPORTED_SYMBOLS) + [f"TKN{i:05d}" for i in range(size)]
+
+def _push(heap: List[_Entry], entry: _Entry, k: int) -> None:
+    if len(heap) < k:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+async def _ascreen_shard(symbols: Sequence[str], k: int, concurrency: int) -> Tuple[List[_Entry], int]:
+    """Top-k heap and error count for one shard, fetching `concurrency` symbols at a time."""
+    heap: List[_Entry] = []
+    errors = 0
+    for start in range(0, len(symbols), concurrency):
+        chunk = symbols[start:start + concurrency]
+        results = await asyncio.gather(
+            *(afetch_mock_marketdata(symbol, record=False) for symbol in chunk),
+            return_exceptions=True
+        )
+        snapshots = [result for result in results if not isinstance(result, BaseException)]
+        errors += len(chunk) - len(snapshots)
+        if not snapshots:
+            continue
+        scores = secret_indicator_batch(
+            [snapshot.price for snapshot in snapshots],
+            [snapshot.volume for snapshot in snapshots],
+            [snapshot.market_cap for snapshot in snapshots],
+            [snapshot.change_24h for snapshot in snapshots]
+        )
+        for score, snapshot in zip(scores.tolist(), snapshots):
+            _push(heap, (score, snapshot.symbol, snapshot), k)
+    return heap, errors
+
+def _screen_shard(symbols: Sequence[str], k: int, concurrency: int, fetch_latency: float) -> Tuple[List[_Entry], int]:
+    """Worker process entry point."""
+    tools.MOCK_FETCH_LATENCY = fetch_latency
+    return asyncio.run(_ascreen_shard(symbols, k, concurrency))
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Long-lived worker pool per size, so screens after the first don't pay
+    for process start-up. Spawned rather than forked: the parent runs
+    threads (fetch pool, feed) whose locks a fork could copy mid-use.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        return pool
+
+def shutdown_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(cancel_futures=True)
+        _pools.clear()
+
+def _shards(universe: Sequence[str], workers: int) -> List[Sequence[str]]:
+    size, extra = divmod(len(universe), workers)
+    bounds = [0]
+    for i in range(workers):
+        bounds.append(bounds[-1] + size + (i < extra))
+    return [universe[lo:hi] for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
+
+def _plan(universe: Optional[Iterable[str]], workers: Optional[int]) -> Tuple[List[str], int]:
+    universe = list(universe) if universe is not None else default_universe()
+    workers = workers or settings.SCREENER_WORKERS or os.cpu_count() or 1
+    return universe, max(1, min(workers, len(universe)))
+
+def _merge(parts: List[Tuple[List[_Entry], int]], k: int, screened: int, workers: int, start: float) -> ScreenResult:
+    best = heapq.nlargest(k, itertools.chain.from_iterable(heap for heap, _ in parts))
+    return ScreenResult(
+        hits=[ScreenHit(symbol, score, snapshot) for score, symbol, snapshot in best],
+        screened=screened - sum(errors for _, errors in parts),
+        errors=sum(errors for _, errors in parts),
+        workers=workers,
+        elapsed=time.perf_counter() - start
+    )
+
+def screen(
+    top_k: Optional[int] = None,
+    universe: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
+    concurrency: Optional[int] = None
+) -> ScreenResult:
+    """
+    Ranks `universe` (default_universe() if omitted) by the secret indicator
+    and returns the `top_k` best. `workers` processes (SCREENER_WORKERS, or
+    one per core) each fetch `concurrency` symbols at a time; a single
+    worker runs in this process.
+    """
+    start = time.perf_counter()
+    k = top_k or settings.SCREENER_TOP_K
+    concurrency = concurrency or settings.SCREENER_FETCH_CONCURRENCY
+    universe, workers = _plan(universe, workers)
+    if workers == 1:
+        parts = [asyncio.run(_ascreen_shard(universe, k, concurrency))]
+    else:
+        pool = _pool(workers)
+        futures = [
+            pool.submit(_screen_shard, shard, k, concurrency, tools.MOCK_FETCH_LATENCY)
+            for shard in _shards(universe, workers)
+        ]
+        parts = [future.result() for future in futures]
+    return _merge(parts, k, len(universe), workers, start)
+
+async def ascreen(
+    top_k: Optional[int] = None,
+    universe: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
+    concurrency: Optional[int] = None
+) -> ScreenResult:
+    """Async variant of `screen`: a single worker runs on the caller's loop, shards are awaited."""
+    start = time.perf_counter()
+    k = top_k or settings.SCREENER_TOP_K
+    concurrency = concurrency or settings.SCREENER_FETCH_CONCURRENCY
+    universe, workers = _plan(universe, workers)
+    if workers == 1:
+        parts = [await _ascreen_shard(universe, k, concurrency)]
+    else:
+        pool = _pool(workers)
+        parts = await asyncio.gather(*(
+            asyncio.wrap_future(pool.submit(_screen_shard, shard, k, concurrency, tools.MOCK_FETCH_LATENCY))
+            for shard in _shards(universe, workers)
+        ))
+    return _merge(list(parts), k, len(universe), workers, start)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank a token universe by the secret indicator")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--universe", type=int, default=settings.SCREENER_UNIVERSE_SIZE, help="synthetic symbols to add")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (0 = one per core)")
+    parser.add_argument("--concurrency", type=int, default=0, help="concurrent fetches per worker")
+    parser.add_argument("--fetch-latency", type=float, default=tools.MOCK_FETCH_LATENCY)
+    args = parser.parse_args()
+
+    tools.MOCK_FETCH_LATENCY = args.fetch_latency
+    result = screen(args.top, default_universe(args.universe), args.workers or None, args.concurrency or None)
+    for rank, hit in enumerate(result.hits, 1):
+        print(f"{rank:>3}. {hit.symbol:<10} {hit.score:6.2f}  ${hit.snapshot.price:,.2f}  {hit.snapshot.change_24h:+.2f}%")
+    print(f"Screened {result.screened:,} symbols ({result.errors} errors) with {result.workers} "
+          f"worker(s) in {result.elapsed:.2f}s")
+    shutdown_pools()
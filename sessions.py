@@ -0,0 +1,428 @@
+import asyncio
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id
+)
+
+from config import settings
+
+# Channels that carry over between turns; everything else is per-turn scratch
+PERSISTENT_CHANNELS = ("messages", "summary")
+
+SessionKey = Tuple[str, str]
+
+class _Session:
+    __slots__ = ("checkpoint", "metadata", "parent_id", "writes", "last_access")
+
+    def __init__(self, checkpoint: Checkpoint, metadata: CheckpointMetadata, parent_id: Optional[str]):
+        self.checkpoint = checkpoint
+        self.metadata = metadata
+        self.parent_id = parent_id
+        self.writes: List[Tuple[str, str, Any]] = []
+        self.last_access = 0.0
+
+class SQLiteSessionSpill:
+    """
+    Local SQLite file holding sessions evicted from memory. The file is only
+    created once the first session is spilled.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self, create: bool) -> Optional[sqlite3.Connection]:
+        # Caller holds the lock.
+        if self._conn is None and (create or os.path.exists(self.path)):
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS sessions ("
+                    "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, data BLOB NOT NULL, "
+                    "PRIMARY KEY (thread_id, checkpoint_ns))"
+                )
+        return self._conn
+
+    def save(self, key: SessionKey, data: bytes) -> None:
+        with self._lock:
+            conn = self._connect(create=True)
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sessions (thread_id, checkpoint_ns, data) VALUES (?, ?, ?)",
+                    (*key, data)
+                )
+
+    def pop(self, key: SessionKey) -> Optional[bytes]:
+        """Removes and returns the spilled session, or None."""
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is None:
+                return None
+            with conn:
+                row = conn.execute(
+                    "SELECT data FROM sessions WHERE thread_id = ? AND checkpoint_ns = ?", key
+                ).fetchone()
+                if row is not None:
+                    conn.execute("DELETE FROM sessions WHERE thread_id = ? AND checkpoint_ns = ?", key)
+        return row[0] if row else None
+
+    def keys(self) -> List[SessionKey]:
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is None:
+                return []
+            return [tuple(row) for row in conn.execute("SELECT thread_id, checkpoint_ns FROM sessions")]
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is not None:
+                with conn:
+                    conn.execute("DELETE FROM sessions WHERE thread_id = ?", (thread_id,))
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is not None:
+                with conn:
+                    conn.execute("DELETE FROM sessions")
+
+    def count(self) -> int:
+        with self._lock:
+            conn = self._connect(create=False)
+            return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] if conn is not None else 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class SessionStore(BaseCheckpointSaver):
+    """
+    Checkpointer that keeps one live checkpoint per session.
+
+    Sessions are keyed by the `thread_id` in the run config. Only the latest
+    checkpoint of each session is kept, holding just the channels that carry
+    over between turns (PERSISTENT_CHANNELS), so a session costs its memory
+    window rather than its full history and resuming it is a dict lookup.
+    Checkpoint objects are kept as-is in memory, with no serialization on
+    the hot path.
+
+    The in-memory tier is an LRU of at most `max_sessions` sessions; sessions
+    idle for longer than `idle_ttl` seconds, or pushed out by newer ones, are
+    pickled into a local SQLite file and brought back transparently on
+    their next turn. That disk I/O never runs under the in-memory lock, and
+    the async methods run it in a worker thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        path: Optional[str] = None,
+        channels: Iterable[str] = PERSISTENT_CHANNELS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        super().__init__()
+        self.max_sessions = max_sessions if max_sessions is not None else settings.SESSION_MAX_ACTIVE
+        self.idle_ttl = idle_ttl if idle_ttl is not None else settings.SESSION_IDLE_TTL
+        self.spill = SQLiteSessionSpill(path if path is not None else settings.SESSION_DB)
+        self.channels = frozenset(channels)
+        self._clock = clock
+        self._sessions: "OrderedDict[SessionKey, _Session]" = OrderedDict()
+        # Evicted sessions not written to the spill file yet, still served from here
+        self._spilling: Dict[SessionKey, _Session] = {}
+        self._lock = threading.Lock()
+        # Serializes spill file I/O; taken before `_lock`, never while holding it
+        self._io_lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.spills = 0
+
+    @staticmethod
+    def _key(config: RunnableConfig) -> SessionKey:
+        configurable = config["configurable"]
+        return configurable["thread_id"], configurable.get("checkpoint_ns", "")
+
+    def _cached(self, key: SessionKey) -> Optional[_Session]:
+        """Looks a session up in memory, including evicted ones not written yet. Caller holds the lock."""
+        session = self._sessions.get(key)
+        if session is not None:
+            self.hits += 1
+            self._sessions.move_to_end(key)
+        else:
+            session = self._spilling.pop(key, None)
+            if session is None:
+                return None
+            self.hits += 1
+            self._sessions[key] = session
+        session.last_access = self._clock()
+        self._evict()
+        return session
+
+    def _load(self, key: SessionKey) -> Optional[_Session]:
+        """Looks a session up in memory, then brings it back from the spill file. Reads the file without the lock."""
+        with self._io_lock:
+            with self._lock:
+                session = self._cached(key)
+            if session is not None:
+                return session
+            data = self.spill.pop(key)
+            if data is None:
+                return None
+            session = pickle.loads(data)
+            with self._lock:
+                self.loads += 1
+                self._sessions[key] = session
+                session.last_access = self._clock()
+                self._evict()
+        return session
+
+    def _evict(self) -> None:
+        """
+        Moves over-capacity and idle sessions, least recently used first, to
+        the ones waiting to be spilled by `_flush`. Caller holds the lock.
+        """
+        cutoff = self._clock() - self.idle_ttl
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and session.last_access >= cutoff:
+                break
+            del self._sessions[key]
+            self._spilling[key] = session
+
+    def _flush(self) -> None:
+        """Pickles evicted sessions into the spill file. Called without the lock."""
+        if not self._spilling:
+            return
+        with self._io_lock:
+            while True:
+                with self._lock:
+                    if not self._spilling:
+                        return
+                    key, session = next(iter(self._spilling.items()))
+                self.spill.save(key, pickle.dumps(session, protocol=pickle.HIGHEST_PROTOCOL))
+                with self._lock:
+                    written = self._spilling.get(key) is session
+                    if written:
+                        del self._spilling[key]
+                        self.spills += 1
+                    # Brought back, replaced or deleted while being written: the row is stale
+                    stale = not written and key not in self._spilling
+                if stale:
+                    self.spill.pop(key)
+
+    def _tuple(self, key: SessionKey, session: _Session) -> CheckpointTuple:
+        thread_id, checkpoint_ns = key
+        checkpoint = session.checkpoint
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"]
+            }},
+            checkpoint=checkpoint,
+            metadata=session.metadata,
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": session.parent_id
+                }}
+                if session.parent_id else None
+            ),
+            pending_writes=list(session.writes)
+        )
+
+    def _checkpoint_tuple(self, key: SessionKey, session: Optional[_Session], config: RunnableConfig) -> Optional[CheckpointTuple]:
+        checkpoint_id = get_checkpoint_id(config)
+        if session is None or (checkpoint_id and checkpoint_id != session.checkpoint["id"]):
+            return None
+        with self._lock:
+            return self._tuple(key, session)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Returns the session's latest checkpoint (older ones are not kept)."""
+        key = self._key(config)
+        with self._lock:
+            session = self._cached(key)
+        if session is None:
+            session = self._load(key)
+        self._flush()
+        return self._checkpoint_tuple(key, session, config)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[CheckpointTuple]:
+        """Yields the latest checkpoint of the matching session(s)."""
+        if config is not None:
+            tuples = [self.get_tuple(config)]
+        else:
+            with self._lock:
+                keys = list(self._sessions) + list(self._spilling)
+            keys += [key for key in self.spill.keys() if key not in keys]
+            tuples = [
+                self.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}})
+                for thread_id, checkpoint_ns in keys
+            ]
+        before_id = get_checkpoint_id(before) if before else None
+        count = 0
+        for checkpoint_tuple in tuples:
+            if checkpoint_tuple is None:
+                continue
+            if filter and any(checkpoint_tuple.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            if before_id and checkpoint_tuple.checkpoint["id"] >= before_id:
+                continue
+            if limit is not None and count >= limit:
+                return
+            count += 1
+            yield checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        """Replaces the session's checkpoint, keeping only the persistent channels."""
+        new_config = self._put(config, checkpoint, metadata)
+        self._flush()
+        return new_config
+
+    def _put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata) -> RunnableConfig:
+        key = self._key(config)
+        values = checkpoint["channel_values"]
+        stored = {
+            **checkpoint,
+            "channel_values": {name: values[name] for name in self.channels if name in values}
+        }
+        # Per-step node outputs would pin the turn's scratch state to the session
+        metadata = {name: value for name, value in metadata.items() if name != "writes"}
+        with self._lock:
+            self._spilling.pop(key, None)
+            self._sessions[key] = session = _Session(stored, metadata, config["configurable"].get("checkpoint_id"))
+            self._sessions.move_to_end(key)
+            session.last_access = self._clock()
+            self._evict()
+        thread_id, checkpoint_ns = key
+        return {"configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"]
+        }}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        """Records pending writes against the session's current checkpoint."""
+        key = self._key(config)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None or session.checkpoint["id"] != config["configurable"].get("checkpoint_id"):
+                return
+            session.writes.extend((task_id, channel, value) for channel, value in writes)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Forgets every session of `thread_id`, in memory and on disk."""
+        with self._io_lock:
+            with self._lock:
+                for key in [key for key in self._sessions if key[0] == thread_id]:
+                    del self._sessions[key]
+                for key in [key for key in self._spilling if key[0] == thread_id]:
+                    del self._spilling[key]
+            self.spill.delete_thread(thread_id)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        key = self._key(config)
+        with self._lock:
+            session = self._cached(key)
+        if session is None:
+            session = await asyncio.to_thread(self._load, key)
+        if self._spilling:
+            await asyncio.to_thread(self._flush)
+        return self._checkpoint_tuple(key, session, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuples = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint_tuple in tuples:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        new_config = self._put(config, checkpoint, metadata)
+        if self._spilling:
+            await asyncio.to_thread(self._flush)
+        return new_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Get in-memory/spilled session counts and resume counters."""
+        spilled = self.spill.count()
+        with self._lock:
+            return {
+                "active": len(self._sessions),
+                "spilled": spilled + len(self._spilling),
+                "hits": self.hits,
+                "loads": self.loads,
+                "spills": self.spills
+            }
+
+    def clear(self) -> None:
+        """Drop every session, including spilled ones, and reset counters."""
+        with self._io_lock:
+            with self._lock:
+                self._sessions.clear()
+                self._spilling.clear()
+                self.hits = self.loads = self.spills = 0
+            self.spill.clear()
+
+session_store = SessionStore()
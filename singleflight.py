@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from hedging import DeadlineExceeded
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    Threaded callers go through `do`, asyncio callers through `ado`. While a
+    call for a key is in flight, every other caller for that key waits for it
+    and receives the same result (or exception) instead of calling again.
+
+    Each caller may pass its own `deadline` (a `time.monotonic()` value):
+    it stops waiting then with DeadlineExceeded, whoever is running the
+    call. A shared call that itself failed with DeadlineExceeded (its
+    runner's deadline) is not handed to waiters that still have time; they
+    retry, one of them running the call anew.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[int, Hashable], "asyncio.Future"] = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the call counters."""
+        self.calls = 0
+        self.executions = 0
+        self.deduplicated = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, deadline: Optional[float] = None, **kwargs) -> Any:
+        """
+        Runs `fn(*args, **kwargs)` unless a call for `key` is already in
+        flight, in which case that call's outcome is shared. `deadline`
+        bounds this caller's wait and is not passed to `fn`.
+        """
+        with self._lock:
+            self.calls += 1
+        return self._do(key, fn, args, kwargs, deadline)
+
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    @staticmethod
+    def _retry(error: Optional[BaseException], deadline: Optional[float]) -> bool:
+        """Whether a waiter should retry after the shared call ran out of its runner's time."""
+        return isinstance(error, DeadlineExceeded) and (deadline is None or time.monotonic() < deadline)
+
+    def _do(self, key: Hashable, fn: Callable[..., Any], args: tuple, kwargs: dict, deadline: Optional[float]) -> Any:
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    self._calls[key] = call
+                    self.executions += 1
+                else:
+                    self.deduplicated += 1
+
+            if leader:
+                return self._lead(key, call, fn, args, kwargs)
+            if not call.done.wait(self._remaining(deadline)):
+                raise DeadlineExceeded(f"No response within the deadline (waiting on {key!r})")
+            if self._retry(call.error, deadline):
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+    def _lead(self, key: Hashable, call: _Call, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def ado(self, key: Hashable, fn: Callable[..., Any], *args, deadline: Optional[float] = None, **kwargs) -> Any:
+        """
+        Async counterpart of `do`. Coroutine functions are awaited on the
+        running loop; plain functions run in the default executor and also
+        join in-flight threaded calls for the same key.
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+
+        with self._lock:
+            self.calls += 1
+        while True:
+            with self._lock:
+                future = self._async_calls.get(loop_key)
+                if future is not None:
+                    self.deduplicated += 1
+                else:
+                    if asyncio.iscoroutinefunction(fn):
+                        self.executions += 1
+                        future = loop.create_task(fn(*args, **kwargs))
+                    else:
+                        future = loop.run_in_executor(None, lambda: self._do(key, fn, args, kwargs, deadline))
+                    self._async_calls[loop_key] = future
+                    future.add_done_callback(lambda f: self._forget_async(loop_key, f))
+
+            try:
+                # Shield so one cancelled or timed-out caller doesn't cancel the shared call.
+                return await asyncio.wait_for(asyncio.shield(future), self._remaining(deadline))
+            except DeadlineExceeded as e:
+                if not self._retry(e, deadline):
+                    raise
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"No response within the deadline (waiting on {key!r})") from None
+
+    def _forget_async(self, loop_key: Tuple[int, Hashable], future: "asyncio.Future") -> None:
+        with self._lock:
+            if self._async_calls.get(loop_key) is future:
+                del self._async_calls[loop_key]
+
+    def stats(self) -> Dict[str, int]:
+        """Get call, execution and deduplication counters."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "deduplicated": self.deduplicated,
+                "in_flight": len(self._calls) + len(self._async_calls)
+            }
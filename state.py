@@ -1,31 +1,226 @@
+import threading
+from collections.abc import Mapping, Sequence
+from itertools import islice
 from typing_extensions import Annotated, TypedDict
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 from langchain_core.messages import BaseMessage
 
-def merge_lists(left: List, right: List) -> List:
+class _SharedLog:
+    __slots__ = ("items", "lock")
+
+    def __init__(self, items: list):
+        self.items = items
+        self.lock = threading.Lock()
+
+class MessageLog(Sequence):
+    """
+    Immutable, append-only message list with structural sharing.
+
+    Every MessageLog is a snapshot: a length over a backing list shared with
+    the snapshots it was derived from. Appending to the newest snapshot
+    extends the backing list in place, which is O(1) amortized, and older
+    snapshots keep seeing only their own prefix. Appending to an older
+    snapshot (a branch) copies its prefix first.
+    """
+
+    __slots__ = ("_log", "_length")
+
+    def __init__(self, items=()):
+        items = list(items)
+        self._log = _SharedLog(items)
+        self._length = len(items)
+
+    @classmethod
+    def _snapshot(cls, log: _SharedLog, length: int) -> "MessageLog":
+        snapshot = cls.__new__(cls)
+        snapshot._log = log
+        snapshot._length = length
+        return snapshot
+
+    def appended(self, items) -> "MessageLog":
+        """Returns a new snapshot with `items` added at the end."""
+        items = list(items)
+        if not items:
+            return self
+        log = self._log
+        with log.lock:
+            if len(log.items) == self._length:
+                log.items.extend(items)
+                return MessageLog._snapshot(log, self._length + len(items))
+            prefix = log.items[:self._length]
+        return MessageLog(prefix + items)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # Bounds within this snapshot's prefix, so only the slice itself is copied
+            start, stop, step = index.indices(self._length)
+            if not len(range(start, stop, step)):
+                return []
+            return self._log.items[start:stop if stop >= 0 else None:step]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("MessageLog index out of range")
+        return self._log.items[index]
+
+    def __iter__(self) -> Iterator[BaseMessage]:
+        return islice(self._log.items, self._length)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (MessageLog, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __reduce__(self):
+        # Pickles as a plain snapshot; the shared backing list stays private
+        return (MessageLog, (list(self),))
+
+    def __repr__(self) -> str:
+        return f"MessageLog({list(self)!r})"
+
+class ReplaceMessages(list):
+    """
+    Update for the messages channel that replaces the history instead of
+    appending to it, e.g. when the memory window drops older turns.
+    """
+
+class _SharedMap:
+    __slots__ = ("base", "versions", "lock", "tip")
+
+    def __init__(self, base: dict):
+        # Values present at version 0, plus key -> [(version, value), ...]
+        # (increasing versions) for everything written later
+        self.base = base
+        self.versions: Dict[Any, list] = {}
+        self.lock = threading.Lock()
+        self.tip = 0
+
+class CacheMap(Mapping):
+    """
+    Immutable mapping with structural sharing, used for cache channels.
+
+    Snapshots share one versioned store. Merging updates into the newest
+    snapshot records only the changed keys under a new version, so it costs
+    O(len(updates)) instead of copying the whole map, and older snapshots
+    keep resolving keys at their own version. Merging into an older
+    snapshot copies it first.
+    """
+
+    __slots__ = ("_store", "_version", "_size")
+
+    def __init__(self, data: Optional[Mapping] = None):
+        self._store = _SharedMap(dict(data) if data else {})
+        self._version = 0
+        self._size = len(self._store.base)
+
+    def merged(self, updates: Mapping) -> "CacheMap":
+        """Returns a new snapshot with `updates` applied on top."""
+        if not updates:
+            return self
+        store = self._store
+        with store.lock:
+            if store.tip == self._version:
+                version = store.tip + 1
+                size = self._size
+                for key, value in updates.items():
+                    history = store.versions.get(key)
+                    if history is None:
+                        store.versions[key] = [(version, value)]
+                        if key not in store.base:
+                            size += 1
+                    else:
+                        history.append((version, value))
+                store.tip = version
+                snapshot = CacheMap.__new__(CacheMap)
+                snapshot._store = store
+                snapshot._version = version
+                snapshot._size = size
+                return snapshot
+        data = dict(self)
+        data.update(updates)
+        return CacheMap(data)
+
+    def _lookup(self, key):
+        store = self._store
+        history = store.versions.get(key)
+        if history is not None:
+            for version, value in reversed(history):
+                if version <= self._version:
+                    return True, value
+        if key in store.base:
+            return True, store.base[key]
+        return False, None
+
+    def __getitem__(self, key):
+        found, value = self._lookup(key)
+        if not found:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return self._lookup(key)[0]
+
+    def __iter__(self):
+        store = self._store
+        version = self._version
+        yield from store.base
+        for key, history in list(store.versions.items()):
+            if key not in store.base and history[0][0] <= version:
+                yield key
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __reduce__(self):
+        return (CacheMap, (dict(self),))
+
+    def __repr__(self) -> str:
+        return f"CacheMap({dict(self)!r})"
+
+def merge_lists(left: List, right: List) -> MessageLog:
     if left is None:
         left = []
     if right is None:
         right = []
-    return left + right
+    if isinstance(right, ReplaceMessages):
+        return MessageLog(right)
+    if not isinstance(left, MessageLog):
+        # Plain input (e.g. the initial state): one copy, then share from here on
+        return MessageLog(list(left) + list(right))
+    return left.appended(right)
 
 def override_state(left, right):
     if right is None:
         return left
     return right
 
-def merge_cache(left: Dict, right: Dict) -> Dict:
+def merge_cache(left: Dict, right: Dict) -> CacheMap:
     if left is None:
         left = {}
     if right is None:
         right = {}
-    return {**left, **right}
+    if not isinstance(left, CacheMap):
+        # Plain input (e.g. the initial state): one copy, then share from here on
+        return CacheMap({**left, **right})
+    return left.merged(right)
 
 class MarketAnalysisState(TypedDict):
     messages: Annotated[List[BaseMessage], merge_lists]
+    summary: Annotated[str, override_state]  # running summary of turns that left the memory window
     market_data_cache: Annotated[Dict[str, Any], merge_cache]
     current_symbol: Annotated[str, override_state]
+    symbols: Annotated[List[str], override_state]
+    stale_symbols: Annotated[List[str], override_state]  # served from the last cached snapshot after a fetch deadline
     secret_indicator_result: Annotated[float, override_state]
-    intent: Annotated[str, override_state]  # "greet", "calculate_indicator", "general"
+    indicator_results: Annotated[Dict[str, float], merge_cache]
+    indicator_ema: Annotated[Dict[str, float], override_state]  # rolling EMA of the score per symbol
+    window: Annotated[int, override_state]  # seconds of history to score over, 0 for the latest snapshot
+    window_points: Annotated[Dict[str, int], override_state]  # history rows scored per symbol
+    top_k: Annotated[int, override_state]  # results asked for by a screen
+    screen_results: Annotated[Dict[str, Any], override_state]  # {"hits": [...], "screened": n, ...}
+    intent: Annotated[str, override_state]  # "greet", "calculate_indicator", "screen", "general"
     next_node: Annotated[str, override_state]
-    error_message: Annotated[str, override_state] 
\ No newline at end of file
+    error_message: Annotated[str, override_state]
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stub server for tests and benchmarks.
+
+Serves POST /v1/chat/completions with a canned reply (streamed as
+server-sent events when requested), so the agent can run end to end
+without an API key:
+
+    python stub_llm.py --port 8001
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 python agent.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+DEFAULT_REPLY = "This is a test response from the stub LLM."
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        with self.server.stats_lock:
+            self.server.requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if body.get("stream"):
+            self._stream_reply(body.get("model", "stub"))
+            return
+
+        reply = self.server.reply
+        payload = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": sum(len(str(m.get("content", "")).split()) for m in body.get("messages", [])),
+                "completion_tokens": len(reply.split()),
+                "total_tokens": 0
+            }
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    def _stream_reply(self, model: str) -> None:
+        """Streams the reply word by word as server-sent events."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        words = self.server.reply.split(" ")
+        deltas = [{"role": "assistant", "content": ""}]
+        deltas += [{"content": word if i == 0 else " " + word} for i, word in enumerate(words)]
+        for i, delta in enumerate(deltas + [{}]):
+            if i and delta and self.server.token_delay:
+                time.sleep(self.server.token_delay)
+            event = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None if delta else "stop"}]
+            }
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+            self.wfile.flush()
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+        self.wfile.flush()
+
+class StubLLMServer(ThreadingHTTPServer):
+    """
+    Threaded OpenAI-compatible stub that counts requests and TCP connections.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        reply: str = DEFAULT_REPLY,
+        latency: float = 0.0,
+        token_delay: float = 0.0
+    ):
+        super().__init__((host, port), _StubHandler)
+        self.reply = reply
+        self.latency = latency
+        self.token_delay = token_delay
+        self.requests = 0
+        self.connections = 0
+        self.stats_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubLLMServer":
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before replying")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed tokens")
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.host, args.port, reply=args.reply, latency=args.latency, token_delay=args.token_delay)
+    print(f"Stub LLM listening on {server.base_url}")
+    server.serve_forever()
@@ -5,9 +5,23 @@ This script can be used to test the agent functionality without needing OpenAI A
 """
 
 import os
+import time
 from unittest.mock import patch, MagicMock
+
+import pytest
+
 from agent import MarketAnalysisChat
 
+@pytest.fixture(autouse=True)
+def history_in_tmp_path(tmp_path):
+    """Keeps the snapshot history each test records in its own temporary directory."""
+    from history import OHLCVStore
+    
+    store = OHLCVStore(str(tmp_path / "history"))
+    with patch('tools.history_store', store), patch('nodes.history_store', store):
+        yield store
+    store.close()
+
 def test_mock_responses():
     """Test the agent with mocked LLM responses."""
     
@@ -74,6 +88,1065 @@ def test_tools_directly():
     indicator_score = secret_indicator(sol_data)
     print(f"\nSOL Secret Indicator Score: {indicator_score}/100")
 
+def test_market_cache():
+    """Test TTL expiry, stale-while-revalidate and LRU eviction of the market cache."""
+    from cache import MarketDataCache
+    
+    now = [0.0]
+    calls = []
+    
+    def fetcher(symbol):
+        calls.append(symbol)
+        return {"symbol": symbol, "price": float(len(calls))}
+    
+    cache = MarketDataCache(max_size=2, default_ttl=10, stale_ttl=5,
+                            symbol_ttls={"BTC": 1}, clock=lambda: now[0])
+    
+    # Fresh hits never reach the fetcher
+    assert cache.get_or_fetch("SOL", fetcher)["price"] == 1.0
+    assert cache.get_or_fetch("sol", fetcher)["price"] == 1.0
+    assert calls == ["SOL"]
+    
+    # BTC has a shorter TTL, so it goes stale first and is refreshed in the background
+    cache.get_or_fetch("BTC", fetcher)
+    now[0] = 2.0
+    assert cache.get_or_fetch("BTC", fetcher)["price"] == 2.0
+    for _ in range(100):
+        if cache.stats()["refreshes"]:
+            break
+        time.sleep(0.01)
+    assert cache.get_or_fetch("BTC", fetcher)["price"] == 3.0
+    
+    # Past the stale window an entry is a plain miss
+    now[0] = 20.0
+    assert cache.get_or_fetch("SOL", fetcher)["price"] == 4.0
+    
+    # A third symbol evicts the least recently used one (BTC)
+    cache.get_or_fetch("ETH", fetcher)
+    assert "BTC" not in cache and "SOL" in cache
+    
+    stats = cache.stats()
+    print(f"\nMarket cache stats: {stats}")
+    assert stats["evictions"] == 1
+    assert stats["stale_hits"] == 1
+    assert stats["misses"] == 4
+
+def test_single_flight():
+    """Test that concurrent fetches for one symbol share a single upstream call, each caller under its own deadline."""
+    import asyncio
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from hedging import DeadlineExceeded
+    from singleflight import SingleFlight
+    
+    calls = []
+    
+    def slow_fetch(symbol):
+        calls.append(symbol)
+        time.sleep(0.2)
+        return {"symbol": symbol}
+    
+    flight = SingleFlight()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: flight.do("SOL", slow_fetch, "SOL"), range(8)))
+    assert all(result is results[0] for result in results)
+    assert calls == ["SOL"]
+    assert flight.stats()["deduplicated"] == 7
+    
+    async def burst():
+        return await asyncio.gather(*(flight.ado("BTC", slow_fetch, "BTC") for _ in range(8)))
+    
+    results = asyncio.run(burst())
+    assert all(result is results[0] for result in results)
+    assert calls == ["SOL", "BTC"]
+    
+    stats = flight.stats()
+    print(f"\nSingle-flight stats: {stats}")
+    assert stats == {"calls": 16, "executions": 2, "deduplicated": 14, "in_flight": 0}
+    
+    # Waiters keep their own deadline: one with time left retries after the
+    # runner ran out of its own, one with less time gives up on its own
+    started, release = threading.Event(), threading.Event()
+    attempts = []
+    
+    def runs_out(symbol):
+        attempts.append(symbol)
+        if len(attempts) == 1:
+            started.set()
+            release.wait()
+            raise DeadlineExceeded("runner's deadline")
+        return symbol
+    
+    flight = SingleFlight()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "ETH", runs_out, "ETH", deadline=time.monotonic() + 60)
+        started.wait()
+        follower = pool.submit(flight.do, "ETH", runs_out, "ETH", deadline=time.monotonic() + 60)
+        while flight.stats()["deduplicated"] < 1:
+            time.sleep(0.001)
+        release.set()
+        assert isinstance(leader.exception(), DeadlineExceeded)
+        assert follower.result() == "ETH" and attempts == ["ETH", "ETH"]
+    
+    release.clear()
+    
+    def stuck(symbol):
+        release.wait()
+        return symbol
+    
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(flight.do, "ADA", stuck, "ADA")
+        while flight.stats()["in_flight"] < 1:
+            time.sleep(0.001)
+        try:
+            flight.do("ADA", stuck, "ADA", deadline=time.monotonic() + 0.05)
+            assert False, "expected DeadlineExceeded"
+        except DeadlineExceeded:
+            pass
+        assert not leader.done()
+        release.set()
+        assert leader.result() == "ADA"
+    
+    async def waits_alone():
+        gate = asyncio.Event()
+        
+        async def astuck(symbol):
+            await gate.wait()
+            return symbol
+        
+        leader = asyncio.ensure_future(flight.ado("DOT", astuck, "DOT"))
+        await asyncio.sleep(0)
+        try:
+            await flight.ado("DOT", astuck, "DOT", deadline=time.monotonic() + 0.05)
+            assert False, "expected DeadlineExceeded"
+        except DeadlineExceeded:
+            pass
+        assert not leader.done()
+        gate.set()
+        assert await leader == "DOT"
+    
+    asyncio.run(waits_alone())
+
+def test_async_chat():
+    """Test that concurrent achat sessions overlap their I/O waits."""
+    import asyncio
+    from unittest.mock import AsyncMock
+    import tools
+    from cache import market_cache
+    from config import settings
+    
+    mock_response = MagicMock()
+    mock_response.content = "This is a test response from the mock LLM."
+    market_cache.clear()
+    
+    symbols = ["SOL", "BTC", "ETH", "ADA", "DOT"]
+    in_flight = set()
+    
+    async def run_sessions():
+        all_in_flight = asyncio.Event()
+        
+        async def fetch(symbol, record=True):
+            # Answers only once every session is waiting on its fetch, so serialized turns time out
+            in_flight.add(symbol)
+            if len(in_flight) == len(symbols):
+                all_in_flight.set()
+            await asyncio.wait_for(all_in_flight.wait(), 5)
+            return generate(symbol)
+        
+        chats = [MarketAnalysisChat() for _ in symbols]
+        with patch.object(tools, "afetch_mock_marketdata", fetch):
+            return await asyncio.gather(*(
+                chat.achat(f"Calculate secret indicator for {symbol}")
+                for chat, symbol in zip(chats, symbols)
+            ))
+    
+    generate = tools._generate_mock_marketdata
+    with patch('nodes.get_llm_client') as mock_llm, patch.object(settings, "FETCH_DEADLINE", 0):
+        mock_llm.return_value.ainvoke = AsyncMock(return_value=mock_response)
+        
+        responses = asyncio.run(run_sessions())
+        assert in_flight == set(symbols)
+        assert all("Secret Indicator Analysis" in response for response in responses)
+        
+        chat = MarketAnalysisChat()
+        assert asyncio.run(chat.achat("What is cryptocurrency?")) == mock_response.content
+        assert len(chat.conversation_history) == 2
+
+def test_multi_symbol_fan_out():
+    """Test that several symbols in one turn are fetched in parallel and reported together."""
+    import threading
+    import tools
+    from cache import market_cache
+    from config import settings
+    
+    symbols = ["SOL", "BTC", "ETH"]
+    in_flight = set()
+    lock = threading.Lock()
+    all_in_flight = threading.Event()
+    generate = tools._generate_mock_marketdata
+    
+    def fetch(symbol, record=True):
+        # Answers only once every symbol's fetch has started, so sequential fetches never finish
+        with lock:
+            in_flight.add(symbol)
+            if len(in_flight) == len(symbols):
+                all_in_flight.set()
+        assert all_in_flight.wait(5), "fetches did not overlap"
+        return generate(symbol)
+    
+    market_cache.clear()
+    chat = MarketAnalysisChat()
+    with patch.object(tools, "fetch_mock_marketdata", fetch), patch.object(settings, "FETCH_DEADLINE", 0):
+        response = chat.chat("Analyze SOL, BTC and ETH")
+    
+    print("\nInput: Analyze SOL, BTC and ETH")
+    print(f"Response: {response}")
+    assert in_flight == set(symbols)
+    assert "Secret Indicator Analysis for SOL, BTC, ETH" in response
+    assert all(f"📊 {symbol}:" in response for symbol in symbols)
+
+def test_secret_indicator_batch_matches_scalar():
+    """Test that batch scoring matches the scalar indicator exactly under a fixed seed."""
+    import numpy as np
+    from tools import fetch_mock_marketdata, secret_indicator, secret_indicator_batch
+    
+    data_rng = np.random.default_rng(0)
+    n = 1000
+    columns = {
+        "price": data_rng.uniform(1, 50000, n),
+        "volume": data_rng.integers(1000000, 10000000, n),
+        "market_cap": data_rng.integers(1000000000, 100000000000, n),
+        "24h_change": data_rng.uniform(-15, 15, n)
+    }
+    
+    batch = secret_indicator_batch(
+        columns["price"], columns["volume"], columns["market_cap"], columns["24h_change"],
+        rng=np.random.default_rng(42)
+    )
+    scalar_rng = np.random.default_rng(42)
+    scalar = [
+        secret_indicator({key: values[i] for key, values in columns.items()}, rng=scalar_rng)
+        for i in range(n)
+    ]
+    
+    assert batch.tolist() == scalar
+    assert 0 <= secret_indicator(fetch_mock_marketdata("SOL")) <= 100
+
+def test_intent_matcher():
+    """Test the compiled single-pass intent and symbol matcher."""
+    from matcher import IntentMatcher
+    from nodes import intent_of
+    
+    matcher = IntentMatcher(["SOL", "BTC", "ETH", "ADA", "DOT"])
+    
+    assert matcher.match("Hello!").greet
+    assert matcher.match("Good Morning there").greet
+    assert not matcher.match("What is this thing?").greet
+    
+    match = matcher.match("Analyze sol, BTC and Ethereum, then sol again")
+    assert match.indicator and match.crypto
+    assert match.symbols == ["SOL", "BTC", "ETH"]
+    
+    match = matcher.match("Calculate the indicator for top coins")
+    assert match.indicator and match.crypto and match.symbols == []
+    assert match.screen and match.top == 0
+    assert matcher.match("top 20 tokens by secret indicator").top == 20
+    assert matcher.match("Top 5 coins").screen and matcher.match("rank tokens by score").screen
+    
+    # A ranking word alone is not a request to screen the universe
+    for text in ("What's the best crypto wallet?", "What are the top crypto news today?", "rank my coins"):
+        match = matcher.match(text)
+        assert match.crypto and not match.screen, text
+        assert intent_of(match) == "general", text
+    
+    match = matcher.match("What is cryptocurrency?")
+    assert match.crypto and not match.indicator
+    
+    # Large ticker universes use the same single scan
+    universe = IntentMatcher([f"T{i:03d}" for i in range(500)] + ["SOL"])
+    assert universe.match("analyze t123 and sol").symbols == ["T123", "SOL"]
+
+def test_pooled_llm_clients():
+    """Test that LLM clients are reused and share pooled connections against a local stub, and are closed."""
+    import asyncio
+    from llm_clients import LLMClientRegistry
+    from stub_llm import StubLLMServer
+    
+    server = StubLLMServer().start()
+    registry = LLMClientRegistry(max_connections=4, max_keepalive_connections=4, api_key="test")
+    try:
+        for _ in range(3):
+            llm = registry.get("gpt-4o-mini", 0.7, server.base_url)
+            assert llm.invoke("What is crypto?").content == server.reply
+        registry.get("gpt-4o-mini", 0.0, server.base_url).invoke("hi")
+        
+        stats = registry.stats()
+        print(f"\nLLM client stats: {stats}, stub connections: {server.connections}")
+        assert stats == {"clients": 2, "created": 2, "reused": 2}
+        assert server.requests == 4
+        assert server.connections == 1
+        
+        # Closing shuts the async transport as well, not just the sync one
+        async_client = registry._http_async_client
+        registry.close()
+        assert async_client.is_closed and registry.stats()["clients"] == 0
+        
+        async def async_turn():
+            assert (await registry.get("gpt-4o-mini", 0.7, server.base_url).ainvoke("hi")).content == server.reply
+            async_client = registry._http_async_client
+            await registry.aclose()
+            return async_client
+        
+        assert asyncio.run(async_turn()).is_closed
+    finally:
+        registry.close()
+        server.stop()
+
+def test_response_cache(tmp_path):
+    """Test exact-match response caching, TTL/size eviction and the SQLite backend."""
+    from response_cache import ResponseCache, SQLiteResponseBackend
+    
+    now = [0.0]
+    db_path = str(tmp_path / "responses.db")
+    cache = ResponseCache(max_size=2, ttl=60, backend=SQLiteResponseBackend(db_path), clock=lambda: now[0])
+    
+    assert cache.get("What is crypto?", "gpt") is None
+    cache.put("What is crypto?", "Crypto is...", "gpt", latency=1.5)
+    assert cache.get("  what is   CRYPTO ", "gpt") == "Crypto is..."
+    assert cache.get("What is crypto?", "other-model") is None
+    
+    # Evicted from memory but still served from SQLite
+    cache.put("a", "A", "gpt")
+    cache.put("b", "B", "gpt")
+    assert cache.get("what is crypto", "gpt") == "Crypto is..."
+    
+    # A fresh process sees the persisted answer until it expires
+    restarted = ResponseCache(backend=SQLiteResponseBackend(db_path), clock=lambda: now[0], ttl=60)
+    assert restarted.get("what is crypto", "gpt") == "Crypto is..."
+    now[0] = 61.0
+    assert cache.get("what is crypto", "gpt") is None
+    
+    stats = cache.stats()
+    print(f"\nResponse cache stats: {stats}")
+    assert stats["hits"] == 2 and stats["misses"] == 3 and stats["evictions"] >= 1
+    assert stats["latency_saved"] == 3.0
+    
+    # Hits skip the LLM entirely
+    import nodes
+    with patch.object(nodes, "response_cache", ResponseCache()), patch('nodes.get_llm_client') as mock_llm:
+        mock_llm.return_value.invoke.return_value = MagicMock(content="Cached answer")
+        chat = MarketAnalysisChat()
+        assert chat.chat("What can you do?") == "Cached answer"
+        assert chat.chat("what can you do") == "Cached answer"
+        assert mock_llm.return_value.invoke.call_count == 1
+
+def test_chat_stream():
+    """Test that LLM tokens are streamed incrementally and templated replies arrive whole."""
+    import asyncio
+    from llm_clients import LLMClientRegistry
+    from stub_llm import StubLLMServer
+    
+    server = StubLLMServer(token_delay=0.01).start()
+    registry = LLMClientRegistry(api_key="test")
+    try:
+        with patch('nodes.get_llm_client', lambda temperature=0.7: registry.get("gpt-4o-mini", temperature, server.base_url)):
+            chat = MarketAnalysisChat()
+            
+            chunks = list(chat.chat_stream("Hello!"))
+            assert len(chunks) == 1 and chunks[0].startswith("Hello!")
+            
+            chunks = list(chat.chat_stream("What is cryptocurrency?"))
+            print(f"\nStreamed chunks: {chunks}")
+            assert len(chunks) == len(server.reply.split(" "))
+            assert "".join(chunks) == server.reply
+            assert chat.conversation_history[-1].content == server.reply
+            assert len(chat.conversation_history) == 4
+            
+            async def collect():
+                try:
+                    return [chunk async for chunk in chat.achat_stream("What else can you do?")]
+                finally:
+                    await registry.aclose()
+            
+            assert "".join(asyncio.run(collect())) == server.reply
+    finally:
+        registry.close()
+        server.stop()
+
+def test_bounded_memory():
+    """Test that conversation memory stays windowed and folds older turns into a summary."""
+    from langchain_core.messages import AIMessage, HumanMessage
+    from memory import ConversationMemory
+    
+    memory = ConversationMemory(max_messages=4, max_tokens=0)
+    messages = []
+    for i in range(10):
+        messages += [HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")]
+    
+    window, summary = memory.compact(messages)
+    assert [m.content for m in window] == ["question 8", "answer 8", "question 9", "answer 9"]
+    assert "question 7" in summary and "answer" not in summary
+    assert memory.compact(window, summary) is None
+    
+    # Token window
+    memory = ConversationMemory(max_messages=0, max_tokens=10)
+    window, _ = memory.compact([HumanMessage(content="x" * 16) for _ in range(5)])
+    assert len(window) == 2
+    
+    chat = MarketAnalysisChat(memory=ConversationMemory(max_messages=2))
+    for _ in range(3):
+        chat.chat("Hello!")
+    assert len(chat.conversation_history) == 2
+    assert chat.summary.count("User asked: Hello!") == 2
+    
+    # General answers get the summary of the turns that left the window as context
+    mock_response = MagicMock()
+    mock_response.content = "Crypto is digital money."
+    with patch('nodes.get_llm_client') as mock_llm:
+        mock_llm.return_value.invoke.return_value = mock_response
+        assert chat.chat("What is cryptocurrency?") == mock_response.content
+    prompt = mock_llm.return_value.invoke.call_args[0][0]
+    assert prompt[1]["role"] == "system" and "User asked: Hello!" in prompt[1]["content"]
+    assert prompt[-1] == {"role": "user", "content": "What is cryptocurrency?"}
+
+def test_session_store(tmp_path):
+    """Test that sessions share one graph, resume by id and spill idle sessions to SQLite."""
+    import asyncio
+    import threading
+    from langchain_core.messages import HumanMessage
+    from agent import create_market_analysis_agent, get_market_analysis_agent
+    from sessions import SessionStore
+    
+    assert MarketAnalysisChat().agent is MarketAnalysisChat().agent is get_market_analysis_agent()
+    
+    now = [0.0]
+    store = SessionStore(max_sessions=2, idle_ttl=60, path=str(tmp_path / "sessions.db"), clock=lambda: now[0])
+    agent = create_market_analysis_agent(checkpointer=store)
+    
+    def turn(session_id, text):
+        return agent.invoke(
+            {"messages": [HumanMessage(content=text)], "market_data_cache": {}},
+            {"configurable": {"thread_id": session_id}}
+        )
+    
+    for session_id in ["a", "b", "c"]:
+        turn(session_id, "Hello!")
+    stats = store.stats()
+    assert stats["active"] == 2 and stats["spilled"] == 1 and stats["spills"] == 1
+    
+    # "a" was pushed out to disk and resumes with its history intact
+    result = turn("a", "Hi again")
+    assert [m.content for m in result["messages"]][::2] == ["Hello!", "Hi again"]
+    assert store.stats()["loads"] == 1 and "a" in {key[0] for key in store._sessions}
+    
+    # Idle sessions are spilled on the next write, even under capacity
+    now[0] += 120
+    turn("d", "Hello!")
+    assert store.stats()["active"] == 1
+    
+    # Only the cross-turn channels are kept in the session
+    checkpoint = store.get_tuple({"configurable": {"thread_id": "a"}}).checkpoint
+    assert set(checkpoint["channel_values"]) <= {"messages", "summary"}
+    
+    store.delete_thread("a")
+    assert store.get_tuple({"configurable": {"thread_id": "a"}}) is None
+    
+    # Async turns spill and restore off the event loop, never holding the in-memory lock
+    io_threads = []
+    
+    def off_loop(method):
+        def wrapper(*args):
+            assert not store._lock.locked()
+            io_threads.append(threading.current_thread())
+            return method(*args)
+        return wrapper
+    
+    async def aturn(session_id, text):
+        return await agent.ainvoke(
+            {"messages": [HumanMessage(content=text)], "market_data_cache": {}},
+            {"configurable": {"thread_id": session_id}}
+        )
+    
+    async def spill_and_restore():
+        for session_id in ["e", "f", "g"]:
+            await aturn(session_id, "Hello!")
+        result = await aturn("e", "Hi again")
+        return threading.current_thread(), [m.content for m in result["messages"]][::2]
+    
+    loads = store.stats()["loads"]
+    with patch.object(store.spill, "save", off_loop(store.spill.save)), \
+            patch.object(store.spill, "pop", off_loop(store.spill.pop)):
+        loop_thread, contents = asyncio.run(spill_and_restore())
+    assert contents == ["Hello!", "Hi again"] and store.stats()["loads"] == loads + 1
+    assert io_threads and loop_thread not in io_threads
+    
+    # A new chat object with the same session id picks up the conversation
+    chat = MarketAnalysisChat()
+    chat.chat("Hello!")
+    resumed = MarketAnalysisChat(session_id=chat.session_id)
+    assert len(resumed.conversation_history) == 2
+    resumed.reset_conversation()
+    assert chat.conversation_history == []
+
+def test_structural_sharing_reducers():
+    """Test that the state reducers keep immutable-update semantics while sharing storage."""
+    from state import CacheMap, MessageLog, merge_cache, merge_lists
+    
+    base = merge_lists(["a", "b"], ["c"])
+    tip = merge_lists(base, ["d"])
+    assert list(base) == ["a", "b", "c"] and list(tip) == ["a", "b", "c", "d"]
+    assert tip._log is base._log
+    
+    # Appending to an older snapshot branches without disturbing the tip
+    branch = merge_lists(base, ["x"])
+    assert list(branch) == ["a", "b", "c", "x"] and list(tip) == ["a", "b", "c", "d"]
+    assert branch[-1] == "x" and tip[-1] == "d" and base[1:] == ["b", "c"]
+    # Slices stay within the snapshot even though the shared list runs past it
+    assert base[-2:] == ["b", "c"] and base[::-1] == ["c", "b", "a"] and base[5:] == [] and base[-9::-1] == []
+    assert merge_lists(None, None) == []
+    
+    v1 = merge_cache({"SOL": 1}, {"BTC": 2})
+    v2 = merge_cache(v1, {"SOL": 3, "ETH": 4})
+    assert dict(v1) == {"SOL": 1, "BTC": 2}
+    assert dict(v2) == {"SOL": 3, "BTC": 2, "ETH": 4}
+    assert "ETH" not in v1 and len(v1) == 2 and len(v2) == 3
+    assert v2._store is v1._store
+    
+    fork = merge_cache(v1, {"ADA": 5})
+    assert dict(fork) == {"SOL": 1, "BTC": 2, "ADA": 5} and "ADA" not in v2
+    assert isinstance(fork, CacheMap) and isinstance(base, MessageLog)
+
+def test_api_service():
+    """Test the HTTP service: session affinity, fast 429 under overload and timeouts."""
+    import asyncio
+    import httpx
+    from api import ChatService, create_app
+    
+    async def slow_achat(self, user_input):
+        await asyncio.sleep(0.2)
+        return f"echo {user_input}"
+    
+    async def scenario():
+        service = ChatService(max_concurrency=2, request_timeout=5)
+        transport = httpx.ASGITransport(app=create_app(service))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = (await client.post("/chat", json={"message": "Hello!"})).json()
+            assert first["response"].startswith("Hello!")
+            session_id = first["session_id"]
+            await client.post("/chat", json={"message": "Hello again!", "session_id": session_id})
+            assert len(MarketAnalysisChat(session_id=session_id).conversation_history) == 4
+            
+            with patch.object(MarketAnalysisChat, "achat", slow_achat):
+                # Two slots busy: the third request is rejected without waiting
+                start = time.perf_counter()
+                responses = await asyncio.gather(
+                    client.post("/chat", json={"message": "a", "session_id": "s1"}),
+                    client.post("/chat", json={"message": "b", "session_id": "s2"}),
+                    client.post("/chat", json={"message": "c", "session_id": "s3"})
+                )
+                statuses = sorted(response.status_code for response in responses)
+                assert statuses == [200, 200, 429] and time.perf_counter() - start < 0.4
+                
+                # Turns of one session run one after the other
+                start = time.perf_counter()
+                responses = await asyncio.gather(*(
+                    client.post("/chat", json={"message": message, "session_id": "s1"}) for message in "xy"
+                ))
+                assert [r.json()["response"] for r in responses] == ["echo x", "echo y"]
+                assert time.perf_counter() - start >= 0.4
+                
+                service.request_timeout = 0.05
+                assert (await client.post("/chat", json={"message": "slow"})).status_code == 504
+                service.request_timeout = 5
+            
+            health = (await client.get("/health")).json()
+            assert health["rejected"] == 1 and health["timed_out"] == 1 and health["in_flight"] == 0
+    
+    asyncio.run(scenario())
+
+def test_metrics():
+    """Test node latency, cache, LLM and error instrumentation plus both export formats."""
+    import json
+    from langchain_core.messages import AIMessage
+    from cache import market_cache
+    from metrics import metrics
+    
+    metrics.reset()
+    market_cache.clear()
+    chat = MarketAnalysisChat()
+    chat.chat("Calculate secret indicator for SOL")
+    chat.chat("Calculate secret indicator for SOL")
+    with patch('nodes.fetch_market_data_coalesced', side_effect=RuntimeError("upstream down")):
+        chat.chat("Calculate secret indicator for BTC")
+    with patch('nodes.get_llm_client') as mock_llm:
+        mock_llm.return_value.invoke.return_value = AIMessage(
+            content="Answer", usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15}
+        )
+        chat.chat("What is cryptocurrency?")
+    
+    data = metrics.to_dict()
+    durations = {s["labels"]["node"]: s["count"] for s in data["histograms"]["node_duration_seconds"]}
+    assert durations["intent_classifier"] == 4 and durations["fetch_market_data"] == 3
+    assert durations["response"] == 3 and durations["error_response"] == 1
+    cache = {s["labels"]["result"]: s["value"] for s in data["counters"]["market_cache_requests_total"]}
+    assert cache == {"miss": 2, "hit": 1}
+    assert data["counters"]["node_errors_total"] == [{"labels": {"node": "fetch_market_data"}, "value": 1}]
+    assert data["counters"]["llm_calls_total"][0]["value"] == 1
+    tokens = {s["labels"]["kind"]: s["value"] for s in data["counters"]["llm_tokens_total"]}
+    assert tokens == {"input": 12, "output": 3}
+    json.loads(metrics.to_json())
+    
+    text = metrics.to_prometheus()
+    print(f"\n{text}")
+    assert '# TYPE market_agent_node_duration_seconds histogram' in text
+    assert 'market_agent_node_duration_seconds_count{node="fetch_market_data"} 3' in text
+    assert 'market_agent_node_duration_seconds_bucket{node="fetch_market_data",le="+Inf"} 3' in text
+    assert 'market_agent_market_cache_requests_total{result="hit"} 1' in text
+    
+    # Switched off, nothing is recorded
+    metrics.enabled = False
+    try:
+        chat.chat("Hello!")
+    finally:
+        metrics.enabled = True
+    assert metrics.to_dict()["histograms"]["node_duration_seconds"] == data["histograms"]["node_duration_seconds"]
+
+def test_loadtest(tmp_path):
+    """Test that the load test replays a corpus and reports diffable results."""
+    import json
+    import loadtest
+    
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text("\n".join(json.dumps(session) for session in [
+        {"session": "a", "turns": ["Hello!", "Analyze SOL and BTC", "What is cryptocurrency?"]},
+        {"session": "b", "turns": ["Calculate secret indicator for ETH"]}
+    ]) + "\n")
+    
+    results = loadtest.run(corpus=str(corpus), concurrency=2, repeat=2, fetch_latency=0.0)
+    assert results["turns"] == 8 and results["errors"] == 0
+    assert results["latency"]["indicator"]["count"] == 4 and results["llm_requests"] == 2
+    assert {"p50_ms", "p95_ms", "p99_ms"} <= set(results["latency"]["all"])
+    assert results["turns_per_s"] > 0 and results["peak_rss_mb"] > 0
+    
+    lines = loadtest.compare(json.loads(json.dumps(results)), results)
+    assert lines[0].startswith("turns/s") and "+0.0%" in lines[0]
+
+def test_market_feed():
+    """Test the tick ring buffers and that the fetch node reads the feed without I/O."""
+    from feed import TICK_DTYPE, MarketFeed, TickRing
+    from tools import _generate_mock_marketdata
+    
+    ring = TickRing("SOL", capacity=4)
+    for i in range(6):
+        ring.push(_generate_mock_marketdata("SOL")._replace(price=float(i)))
+    assert len(ring) == 4 and ring.pushed == 6 and ring.nbytes == 4 * TICK_DTYPE.itemsize
+    assert ring.latest().price == 5.0 and ring.latest().symbol == "SOL"
+    assert ring.window()["price"].tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert ring.window(2)["price"].tolist() == [4.0, 5.0]
+    
+    feed = MarketFeed(["SOL", "BTC"], interval=0.01, capacity=16)
+    assert feed.latest("SOL") is None
+    feed.start()
+    try:
+        time.sleep(0.1)
+        stats = feed.stats()
+        assert stats["bytes"] == 2 * 16 * TICK_DTYPE.itemsize
+        assert stats["symbols"]["SOL"]["pushed"] > 1 and stats["symbols"]["SOL"]["held"] <= 16
+        
+        with patch('nodes.market_feed', feed), \
+                patch('nodes.fetch_market_data_coalesced', side_effect=AssertionError("fetched")):
+            response = MarketAnalysisChat().chat("Analyze SOL and BTC")
+        assert "Secret Indicator Analysis for SOL, BTC" in response
+    finally:
+        feed.stop()
+    assert not feed.running and feed.latest("SOL") is None
+
+def test_market_snapshot():
+    """Test that MarketSnapshot keeps the legacy dict accessors working."""
+    import numpy as np
+    from tools import MarketSnapshot, SNAPSHOT_KEYS, fetch_mock_marketdata, secret_indicator
+    
+    snapshot = fetch_mock_marketdata("SOL")
+    assert isinstance(snapshot, MarketSnapshot) and snapshot.symbol == "SOL"
+    assert snapshot["24h_change"] == snapshot.change_24h and snapshot["price"] == snapshot[1]
+    assert snapshot.get("volume") == snapshot.volume and snapshot.get("missing", 0) == 0
+    assert list(snapshot.keys()) == list(SNAPSHOT_KEYS) and dict(snapshot) == snapshot.to_dict()
+    assert MarketSnapshot.from_dict(snapshot.to_dict()) == snapshot
+    try:
+        snapshot["missing"]
+        assert False, "expected KeyError"
+    except KeyError:
+        pass
+    
+    # Dict and snapshot inputs score identically
+    assert secret_indicator(snapshot, rng=np.random.default_rng(1)) == \
+        secret_indicator(snapshot.to_dict(), rng=np.random.default_rng(1))
+
+def test_history_store(tmp_path):
+    """Test the memory-mapped OHLCV store, its range reads and windowed indicator answers."""
+    import numpy as np
+    import tools
+    from history import OHLCVStore, backfill
+    
+    store = OHLCVStore(str(tmp_path))
+    now = int(time.time())
+    assert backfill(store, "sol", hours=48, interval=3600, end=now) == 49
+    assert store.count("SOL") == 49 and store.symbols() == ["SOL"]
+    
+    day = store.range("SOL", now - 86400, now)
+    assert len(day["timestamp"]) == 25 and day["timestamp"][0] == now - 86400
+    assert isinstance(day["price"], np.memmap)  # a view into the file, not a copy
+    assert len(store.range("SOL", now + 1)["price"]) == 0
+    
+    # Out-of-order rows are dropped; appends are visible to the next read
+    snapshot = tools._generate_mock_marketdata("SOL")
+    assert store.append(snapshot._replace(timestamp=now - 10)) == 0
+    assert store.append(snapshot._replace(timestamp=now + 5, price=1.5)) == 1
+    assert store.range("SOL", now + 1)["price"].tolist() == [1.5]
+    
+    # A reopened store sees the same rows
+    store.close()
+    assert OHLCVStore(str(tmp_path)).count("SOL") == 50
+    
+    # Rows past the retention are dropped once a tenth of it has piled up
+    kept = OHLCVStore(str(tmp_path / "kept"), retention=10 * 3600)
+    backfill(kept, "ETH", hours=10, interval=3600, end=now)
+    assert kept.append(snapshot._replace(symbol="ETH", timestamp=now + 3600)) == 1
+    assert kept.count("ETH") == 12
+    assert kept.append(snapshot._replace(symbol="ETH", timestamp=now + 2 * 3600)) == 1
+    assert kept.count("ETH") == 11 and kept.range("ETH")["timestamp"][0] == now - 8 * 3600
+    assert kept.symbols() == ["ETH"] and OHLCVStore(str(tmp_path / "kept")).count("ETH") == 11
+    kept.close()
+    
+    with patch('tools.history_store', store), patch('nodes.history_store', store), \
+            patch.object(tools, "MOCK_FETCH_LATENCY", 0):
+        tools.fetch_mock_marketdata("BTC")
+        assert store.count("BTC") == 1
+        
+        response = MarketAnalysisChat().chat("SOL indicator over the last 24h")
+        assert "Secret Indicator Analysis for SOL" in response
+        assert "data points over the last 24h" in response
+        response = MarketAnalysisChat().chat("Analyze ADA for the past 2 days")
+        assert "no stored history for the last 2d" in response or "over the last 2d" in response
+
+def test_incremental_indicators():
+    """Test that rolling indicator state matches a batch recompute and is fed by arriving snapshots."""
+    import numpy as np
+    import tools
+    from indicators import IndicatorEngine, batch_state, indicator_engine
+    
+    engine = IndicatorEngine(span=10)
+    rng = np.random.default_rng(7)
+    base = tools._generate_mock_marketdata("SOL")
+    scores = rng.uniform(0, 100, 5_000)
+    volumes = rng.integers(1_000_000, 10_000_000, 5_000)
+    for i, (score, volume) in enumerate(zip(scores, volumes)):
+        engine.update(base._replace(timestamp=i + 1, volume=int(volume)), score=float(score))
+        if i in (0, 1, 99, 4_999):
+            expected = batch_state(scores[:i + 1], volumes[:i + 1], span=10)
+            state = engine.get("SOL").to_dict()
+            for key, value in expected.items():
+                assert np.isclose(state[key], value, rtol=1e-9, atol=1e-9), (i, key)
+    
+    # The last snapshot seen again, or an older one, is not folded in twice
+    last = engine.get("SOL").snapshot
+    assert engine.update(last) is None and engine.update(base._replace(timestamp=4_000)) is None
+    assert engine.get("SOL").count == 5_000
+    
+    # A different snapshot from the same second is, and its own score is reported
+    same_second = last._replace(price=last.price * 2, volume=last.volume + 1)
+    assert engine.update(same_second, score=12.5) is not None and engine.get("SOL").count == 5_001
+    assert engine.latest_score(same_second) == 12.5 and engine.latest_score(last) is None
+    assert engine.latest_score(same_second.to_dict()) == 12.5
+    
+    # Fetched snapshots reach the global engine, and the agent reports its EMA
+    with patch.object(tools, "MOCK_FETCH_LATENCY", 0):
+        snapshot = tools.fetch_mock_marketdata("DOT")
+    assert indicator_engine.latest_score(snapshot) is not None
+    assert indicator_engine.value("DOT") is not None
+    assert "Smoothed Score (EMA-" in MarketAnalysisChat().chat("Analyze DOT")
+
+def test_screener():
+    """Test heap top-k screening in process and across a worker pool, and the screen intent."""
+    import asyncio
+    import numpy as np
+    import tools
+    import screener
+    from config import settings
+    
+    universe = [f"TKN{i:05d}" for i in range(500)]
+    
+    async def fetch(symbol, record=True):
+        return tools._generate_mock_marketdata(symbol)._replace(price=float(int(symbol[3:])))
+    
+    # Score by price, so the top k is known: the k highest ticker numbers
+    with patch.object(screener, "afetch_mock_marketdata", fetch), \
+            patch.object(screener, "secret_indicator_batch", lambda price, *columns: np.asarray(price)):
+        result = screener.screen(top_k=5, universe=universe, workers=1, concurrency=64)
+        assert [hit.symbol for hit in result.hits] == [f"TKN{i:05d}" for i in range(499, 494, -1)]
+        assert result.screened == 500 and result.errors == 0
+        assert asyncio.run(screener.ascreen(top_k=3, universe=universe, workers=1)).hits[0].symbol == "TKN00499"
+    
+    with patch.object(tools, "MOCK_FETCH_LATENCY", 0):
+        result = screener.screen(top_k=10, universe=universe, workers=2)
+        assert result.workers == 2 and result.screened == 500 and len(result.hits) == 10
+        scores = [hit.score for hit in result.hits]
+        assert scores == sorted(scores, reverse=True)
+        
+        with patch.object(settings, "SCREENER_UNIVERSE_SIZE", 300), patch.object(settings, "SCREENER_WORKERS", 1):
+            response = MarketAnalysisChat().chat("Top 3 tokens by secret indicator")
+    assert "Top 3 of 305 tokens by Secret Indicator" in response
+    assert response.count("/100 (") == 3
+
+def test_hedged_fetch():
+    """Test hedging a stuck first attempt, giving up at the deadline, and the stale fallback."""
+    import asyncio
+    import threading
+    import numpy as np
+    import tools
+    from cache import MarketDataCache
+    from config import settings
+    from hedging import MIN_SAMPLES, DeadlineExceeded, HedgedExecutor
+    
+    # Fake upstream: whichever attempt starts first hangs until released, the other answers at once
+    stuck = threading.Event()
+    attempts = []
+    
+    def upstream(symbol):
+        attempts.append(symbol)
+        if len(attempts) == 1:
+            stuck.wait(5)
+        return symbol
+    
+    executor = HedgedExecutor(initial_delay=0.0)
+    assert executor.call(upstream, "SOL") == "SOL"
+    assert attempts == ["SOL", "SOL"] and not stuck.is_set()  # answered while one attempt still hangs
+    assert executor.stats()["hedges"] == 1
+    stuck.set()
+    
+    # Without hedging only the first attempt is ever sent
+    attempts.clear()
+    unhedged = HedgedExecutor(hedging=False, initial_delay=0.0)
+    assert unhedged.call(upstream, "BTC") == "BTC" and attempts == ["BTC"]
+    assert unhedged.stats()["hedges"] == 0
+    
+    async def ahedged():
+        release = asyncio.Event()
+        calls = []
+        
+        async def aupstream(symbol):
+            calls.append(symbol)
+            if len(calls) == 1:
+                await release.wait()
+            return symbol
+        
+        executor = HedgedExecutor(initial_delay=0.0)
+        assert await executor.acall(aupstream, "ETH") == "ETH"
+        assert calls == ["ETH", "ETH"] and executor.stats()["hedge_wins"] == 1
+    
+    asyncio.run(ahedged())
+    
+    # Once enough latencies are known the hedge waits for their percentile
+    executor = HedgedExecutor(percentile=90, initial_delay=1.0)
+    latencies = [i / 1000 for i in range(1, MIN_SAMPLES + 1)]
+    for latency in latencies:
+        executor.record(latency)
+    assert executor.hedge_delay() == float(np.percentile(latencies, 90))
+    
+    # Nothing back by the deadline: both paths give up while the upstream is still running
+    hung = threading.Event()
+    executor = HedgedExecutor(initial_delay=0.01)
+    try:
+        executor.call(hung.wait, 5, deadline=time.monotonic() + 0.05)
+        assert False, "expected DeadlineExceeded"
+    except DeadlineExceeded:
+        assert not hung.is_set()
+    hung.set()
+    
+    async def agives_up():
+        never = asyncio.Event()
+        try:
+            await executor.acall(never.wait, deadline=time.monotonic() + 0.05)
+            assert False, "expected DeadlineExceeded"
+        except DeadlineExceeded:
+            pass
+    
+    asyncio.run(agives_up())
+    assert executor.stats()["deadline_misses"] == 2
+    
+    # The agent answers from the last cached snapshot, marked stale
+    expired = MarketDataCache(default_ttl=0, stale_ttl=0)
+    expired.put("SOL", tools._generate_mock_marketdata("SOL"))
+    with patch('nodes.market_cache', expired), patch.object(tools, "MOCK_FETCH_LATENCY", 0.3), \
+            patch.object(settings, "FETCH_DEADLINE", 0.05):
+        response = MarketAnalysisChat().chat("Analyze SOL")
+        assert "Live data timed out; showing the last cached snapshot" in response
+        response = asyncio.run(MarketAnalysisChat().achat("Analyze SOL"))
+        assert "Live data timed out; showing the last cached snapshot" in response
+    
+    # A hedged fetch records only the winner, not the losing attempt as well
+    attempts = []
+    both_done = threading.Event()
+    recorded = []
+    
+    def fetch(symbol, record=True):
+        snapshot = original(symbol, record=record)
+        attempts.append(snapshot)
+        if len(attempts) == 2:
+            both_done.set()
+        return snapshot
+    
+    original = tools.fetch_mock_marketdata
+    tools.snapshot_listeners.append(recorded.append)
+    try:
+        with patch.object(tools, "fetch_mock_marketdata", fetch), patch.object(tools, "MOCK_FETCH_LATENCY", 0.02), \
+                patch.object(tools, "market_data_executor", HedgedExecutor(initial_delay=0.0)):
+            snapshot = tools.fetch_market_data_coalesced("ETH")
+            both_done.wait()
+    finally:
+        tools.snapshot_listeners.remove(recorded.append)
+    assert len(attempts) == 2 and recorded == [snapshot]
+
+def test_lazy_llm_import():
+    """Test that greet and indicator turns never load the LLM stack, and the graph compiles on first use."""
+    import subprocess
+    import sys
+    
+    code = """
+import sys, agent, tools
+assert "langgraph.graph" not in sys.modules
+chat = agent.MarketAnalysisChat()
+assert agent.get_market_analysis_agent.cache_info().currsize == 0
+tools.MOCK_FETCH_LATENCY = 0
+chat.chat("Hello!")
+chat.chat("Analyze SOL")
+assert agent.get_market_analysis_agent.cache_info().currsize == 1
+assert "langchain_openai" not in sys.modules and "openai" not in sys.modules
+from llm_clients import llm_clients
+llm_clients.api_key = "test"
+from nodes import get_llm_client
+get_llm_client()
+assert "langchain_openai" in sys.modules
+"""
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+def test_batch(tmp_path):
+    """Test offline batch processing: input order, batched general turns, and resuming from a checkpoint."""
+    import json
+    import batch
+    import tools
+    from config import settings
+    from llm_clients import llm_clients
+    from response_cache import response_cache
+    from stub_llm import StubLLMServer
+    
+    messages = ["Hello!", "Calculate secret indicator for ETH", "What is a blockchain?", "Analyze SOL"]
+    source = tmp_path / "messages.jsonl"
+    source.write_text("\n".join(
+        json.dumps({"id": f"m{i}", "message": f"{messages[i % 4]} #{i // 4}" if i % 4 == 2 else messages[i % 4]})
+        for i in range(25)
+    ) + "\n\nnot json\n")
+    output = tmp_path / "results.jsonl"
+    
+    stub = StubLLMServer(reply="Batched answer.").start()
+    response_cache.clear()
+    try:
+        with patch.object(settings, "OPENAI_BASE_URL", stub.base_url), \
+                patch.object(llm_clients, "api_key", llm_clients.api_key or "stub"), \
+                patch.object(tools, "MOCK_FETCH_LATENCY", 0):
+            stats = batch.run_batch(str(source), str(output), workers=4, chunk_size=10)
+            results = [json.loads(line) for line in output.read_text().splitlines()]
+            assert [result["line"] for result in results] == list(range(1, 26)) + [27]
+            assert results[0] == {"id": "m0", "line": 1, "intent": "greet", "response": results[0]["response"]}
+            assert "Secret Indicator" in results[1]["response"] and results[2]["response"] == "Batched answer."
+            assert "error" in results[-1] and stats["errors"] == 1 and stats["records"] == 26
+            assert stats["intents"]["general"] == 6 and stats["llm_batches"] == 3 and stub.requests == 6
+            
+            # A run that died after its first chunk: resume drops the partial output and redoes the rest
+            head = b"".join(output.read_bytes().splitlines(keepends=True)[:10])
+            batch.Checkpoint(f"{output}.ckpt").save(str(source), 10, len(head))
+            with open(output, "ab") as f:
+                f.write(b'{"partial": ')
+            stats = batch.run_batch(str(source), str(output), workers=4, chunk_size=10)
+            assert stats["resumed_from_line"] == 10 and stats["records"] == 16
+            assert output.read_bytes().startswith(head)
+            assert [json.loads(line)["line"] for line in output.read_text().splitlines()] == list(range(1, 26)) + [27]
+            
+            # Checkpoint covers the whole input: nothing left to do
+            assert batch.run_batch(str(source), str(output))["records"] == 0
+    finally:
+        llm_clients.close()
+        stub.stop()
+
+def test_prefetch():
+    """Test that hot symbols are refreshed before expiry within the budget, and the hit/waste accounting."""
+    import tools
+    from cache import MarketDataCache
+    from prefetch import Prefetcher, prefetcher
+    
+    now = [0.0]
+    clock = lambda: now[0]
+    fetched = []
+    
+    def fetcher(symbol, deadline=None):
+        fetched.append(symbol)
+        return tools._generate_mock_marketdata(symbol)
+    
+    cache = MarketDataCache(default_ttl=10, stale_ttl=0, clock=clock)
+    p = Prefetcher(cache, fetcher, top_n=2, budget=60, interval=1, half_life=60, lead=2, feed=None, clock=clock)
+    p.record(["SOL", "SOL", "BTC", "SOL", "BTC", "ETH"])
+    assert p.tick() == ["SOL", "BTC"] and p.hot() == ["SOL", "BTC"]  # ETH was asked for once: not hot
+    
+    p.record(["SOL", "BTC"])
+    assert p.stats()["prefetch_hits"] == 2
+    now[0] = 5.0
+    assert p.tick() == []  # still fresh for longer than the lead time
+    now[0] = 8.5
+    assert sorted(p.tick()) == ["BTC", "SOL"]
+    now[0] = 17.0
+    p.tick()  # the 8.5 s prefetches were never served: wasted
+    
+    stats = p.stats()
+    assert stats["cold_hot_requests"] == 0 and stats["prefetches"] == 6 and stats["wasted"] == 2
+    assert stats["hit_ratio"] == 2 / 8 and stats["wasted_ratio"] == 2 / 6
+    
+    # Out of budget: due symbols are skipped, and a hot symbol found cold is reported
+    p.budget = 0
+    now[0] = 30.0
+    assert p.tick() == [] and p.stats()["budget_skips"] == 2
+    p.record(["SOL"])
+    assert p.stats()["cold_hot_requests"] == 1 and fetched.count("ETH") == 0
+    
+    # Indicator turns are counted by the agent's prefetcher
+    requests = prefetcher.stats()["requests"]
+    with patch.object(tools, "MOCK_FETCH_LATENCY", 0):
+        MarketAnalysisChat().chat("Analyze SOL and BTC")
+    assert prefetcher.stats()["requests"] == requests + 2
+
+def test_graph_paths():
+    """Test the nodes each path runs: greetings short-circuit, indicator turns run fetch -> score -> respond."""
+    import tools
+    from agent import create_market_analysis_agent, initial_turn_state
+    from nodes import GREETING_RESPONSE
+    
+    agent = create_market_analysis_agent()
+    
+    def path(text):
+        return [node for update in agent.stream(initial_turn_state(text), stream_mode="updates") for node in update]
+    
+    assert path("Hello!") == ["intent_classifier", "compact_memory"]
+    with patch.object(tools, "MOCK_FETCH_LATENCY", 0):
+        assert path("Calculate secret indicator for SOL") == [
+            "intent_classifier", "fetch_market_data", "calculate_secret_indicator", "response", "compact_memory"
+        ]
+    assert "state_modifier" not in agent.get_graph().nodes
+    
+    # The greeting reaches chat and stream callers, and the history
+    chat = MarketAnalysisChat()
+    assert chat.chat("Hello!") == GREETING_RESPONSE
+    assert "".join(chat.chat_stream("Hi")) == GREETING_RESPONSE
+    assert [m.content for m in chat.conversation_history][1::2] == [GREETING_RESPONSE] * 2
+
 if __name__ == "__main__":
     print("Market Analysis Agent Test Suite")
     print("This script tests the agent without requiring OpenAI API key")
@@ -84,4 +1157,4 @@ if __name__ == "__main__":
     test_tools_directly()
     
     # Test agent with mocked LLM
-    test_mock_responses() 
\ No newline at end of file
+    test_mock_responses() 
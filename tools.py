@@ -1,15 +1,89 @@
+import asyncio
 import random
 import time
-from typing import Dict, Any
+from functools import partial
+from typing import Callable, Dict, Any, Iterator, List, NamedTuple, Optional, Tuple
 
-def fetch_mock_marketdata(symbol: str) -> Dict[str, Any]:
+import numpy as np
+from numpy.typing import ArrayLike
+
+from config import settings
+from hedging import HedgedExecutor
+from history import history_store
+from metrics import metrics
+from singleflight import SingleFlight
+
+# Simulated upstream API delay in seconds
+MOCK_FETCH_LATENCY = 0.5
+
+# Generator behind the secret multiplier; see seed_indicator_rng
+_indicator_rng = np.random.default_rng()
+
+# Shared by every caller so concurrent requests for a symbol hit upstream once
+market_data_flight = SingleFlight()
+
+# Upstream market data calls run under the turn's deadline, hedged when slow
+market_data_executor = HedgedExecutor(
+    percentile=settings.FETCH_HEDGE_PERCENTILE,
+    hedging=settings.FETCH_HEDGE_ENABLED,
+    initial_delay=settings.FETCH_DEADLINE / 2 if settings.FETCH_DEADLINE else 1.0,
+    max_workers=settings.FETCH_POOL_SIZE * 2
+)
+
+# Keys of the legacy snapshot dict, in order; "24h_change" maps to change_24h
+SNAPSHOT_KEYS = ("symbol", "price", "open", "high", "low", "volume", "market_cap", "timestamp", "24h_change")
+_KEY_TO_FIELD = {key: "change_24h" if key == "24h_change" else key for key in SNAPSHOT_KEYS}
+
+class MarketSnapshot(NamedTuple):
     """
-    Mock function to fetch market data for a given symbol.
-    Returns mock price data that would typically come from an API.
+    One market data snapshot.
+
+    Stores its nine fields in a tuple instead of a per-snapshot dict. For
+    code still written against the old dict, string keys work too
+    (`snapshot["24h_change"]`, `snapshot.get("price")`, `keys()`, `items()`),
+    alongside the usual tuple indexing.
+    """
+    symbol: str
+    price: float
+    open: float
+    high: float
+    low: float
+    volume: int
+    market_cap: int
+    timestamp: int
+    change_24h: float
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MarketSnapshot":
+        """Builds a snapshot from a legacy market data dict."""
+        return cls(*(data[key] for key in SNAPSHOT_KEYS))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The snapshot as a legacy market data dict."""
+        return dict(zip(SNAPSHOT_KEYS, self))
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, _KEY_TO_FIELD[key])
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        field = _KEY_TO_FIELD.get(key)
+        return getattr(self, field) if field is not None else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return SNAPSHOT_KEYS
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return zip(SNAPSHOT_KEYS, self)
+
+def _generate_mock_marketdata(symbol: str) -> MarketSnapshot:
+    """
+    Generates a mock market data snapshot for a given symbol.
     """
-    # Simulate API delay
-    time.sleep(0.5)
-    
     # Mock price
     base_prices = {
         "SOL": 100.0,
@@ -22,44 +96,145 @@ def fetch_mock_marketdata(symbol: str) -> Dict[str, Any]:
     base_price = base_prices.get(symbol.upper(), 50.0)
     
     # Generate mock OHLCV data
-    mock_data = {
-        "symbol": symbol.upper(),
-        "price": round(base_price * (1 + random.uniform(-0.1, 0.1)), 2),
-        "open": round(base_price * (1 + random.uniform(-0.05, 0.05)), 2),
-        "high": round(base_price * (1 + random.uniform(0.0, 0.15)), 2),
-        "low": round(base_price * (1 + random.uniform(-0.15, 0.0)), 2),
-        "volume": random.randint(1000000, 10000000),
-        "market_cap": random.randint(1000000000, 100000000000),
-        "timestamp": int(time.time()),
-        "24h_change": round(random.uniform(-15.0, 15.0), 2)
-    }
+    return MarketSnapshot(
+        symbol=symbol.upper(),
+        price=round(base_price * (1 + random.uniform(-0.1, 0.1)), 2),
+        open=round(base_price * (1 + random.uniform(-0.05, 0.05)), 2),
+        high=round(base_price * (1 + random.uniform(0.0, 0.15)), 2),
+        low=round(base_price * (1 + random.uniform(-0.15, 0.0)), 2),
+        volume=random.randint(1000000, 10000000),
+        market_cap=random.randint(1000000000, 100000000000),
+        timestamp=int(time.time()),
+        change_24h=round(random.uniform(-15.0, 15.0), 2)
+    )
+
+# Called with every snapshot that arrives from upstream, e.g. to update rolling indicators
+snapshot_listeners: List[Callable[[MarketSnapshot], Any]] = []
+
+def record_snapshot(snapshot: MarketSnapshot) -> MarketSnapshot:
+    """Appends a newly arrived snapshot to the OHLCV history, if enabled, and notifies the listeners."""
+    if history_store is not None:
+        history_store.append(snapshot)
+    for listener in snapshot_listeners:
+        listener(snapshot)
+    return snapshot
+
+@metrics.tool("fetch_mock_marketdata")
+def fetch_mock_marketdata(symbol: str, record: bool = True) -> MarketSnapshot:
+    """
+    Mock function to fetch market data for a given symbol.
+    Returns mock price data that would typically come from an API.
+    With `record` off the snapshot is not kept in history or passed to listeners.
+    """
+    # Simulate API delay
+    time.sleep(MOCK_FETCH_LATENCY)
     
-    return mock_data
+    snapshot = _generate_mock_marketdata(symbol)
+    return record_snapshot(snapshot) if record else snapshot
 
-def secret_indicator(market_data: Dict[str, Any]) -> float:
+@metrics.tool("fetch_mock_marketdata")
+async def afetch_mock_marketdata(symbol: str, record: bool = True) -> MarketSnapshot:
     """
-    Mock secret indicator calculation.
-    This is a proprietary trading indicator that takes market data and returns a score.
-    Higher scores indicate better buying opportunities.
+    Async variant of `fetch_mock_marketdata` that yields to the event loop
+    while waiting on the simulated API.
     """
-    if not market_data:
-        raise ValueError("Market data is required for secret indicator calculation")
+    await asyncio.sleep(MOCK_FETCH_LATENCY)
+    
+    snapshot = _generate_mock_marketdata(symbol)
+    return record_snapshot(snapshot) if record else snapshot
+
+def _hedged_fetch(symbol: str, deadline: Optional[float]) -> MarketSnapshot:
+    # Attempts don't record: only the winner is kept, once, not a losing hedge too
+    snapshot = market_data_executor.call(fetch_mock_marketdata, symbol, record=False, deadline=deadline)
+    return record_snapshot(snapshot)
+
+async def _ahedged_fetch(symbol: str, deadline: Optional[float]) -> MarketSnapshot:
+    snapshot = await market_data_executor.acall(afetch_mock_marketdata, symbol, record=False, deadline=deadline)
+    return record_snapshot(snapshot)
+
+def fetch_market_data_coalesced(symbol: str, deadline: Optional[float] = None) -> MarketSnapshot:
+    """
+    Fetches market data, sharing one in-flight upstream call between all
+    concurrent threaded callers asking for the same symbol. The call is
+    hedged when slow and raises DeadlineExceeded past `deadline`
+    (a `time.monotonic()` value); callers joining another's call still
+    give up at their own deadline. Only the winning attempt's snapshot is
+    recorded.
+    """
+    return market_data_flight.do(symbol.upper(), partial(_hedged_fetch, symbol, deadline), deadline=deadline)
+
+async def afetch_market_data_coalesced(symbol: str, deadline: Optional[float] = None) -> MarketSnapshot:
+    """
+    Asyncio counterpart of `fetch_market_data_coalesced`.
+    """
+    return await market_data_flight.ado(symbol.upper(), partial(_ahedged_fetch, symbol, deadline), deadline=deadline)
+
+def seed_indicator_rng(seed: Optional[int] = None) -> None:
+    """
+    Reseeds the generator behind the secret multiplier, e.g. for reproducible backtests.
+    """
+    global _indicator_rng
+    _indicator_rng = np.random.default_rng(seed)
+
+@metrics.tool("secret_indicator")
+def secret_indicator_batch(
+    price: ArrayLike,
+    volume: ArrayLike,
+    market_cap: ArrayLike,
+    change_24h: ArrayLike,
+    rng: Optional[np.random.Generator] = None
+) -> np.ndarray:
+    """
+    Vectorized secret indicator over columnar market data.
+    Scores every row in one NumPy pass and returns a float64 array of scores.
+    Uses the module generator unless `rng` is given.
+    """
+    price = np.asarray(price, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    market_cap = np.asarray(market_cap, dtype=np.float64)
+    change_24h = np.asarray(change_24h, dtype=np.float64)
     
-    price = market_data.get("price", 0)
-    volume = market_data.get("volume", 0)
-    market_cap = market_data.get("market_cap", 0)
-    change_24h = market_data.get("24h_change", 0)
+    n = price.shape[0]
+    if not (volume.shape[0] == market_cap.shape[0] == change_24h.shape[0] == n):
+        raise ValueError("All market data columns must have the same length")
+    
+    if rng is None:
+        rng = _indicator_rng
     
     # Mock secret formula (obviously not a real indicator 💀)
     volume_factor = (volume / 1000000) * 0.1
-    price_momentum = abs(change_24h) * 0.05
+    price_momentum = np.abs(change_24h) * 0.05
     market_cap_factor = (market_cap / 1000000000) * 0.02
     
-    secret_multiplier = random.uniform(0.8, 1.2)
+    secret_multiplier = rng.uniform(0.8, 1.2, size=n)
     
     indicator_score = (volume_factor + price_momentum + market_cap_factor) * secret_multiplier
     
     # Normalize to 0-100 scale
-    normalized_score = min(100, max(0, indicator_score * 10))
+    normalized_score = np.clip(indicator_score * 10, 0, 100)
+    
+    return np.round(normalized_score, 2)
+
+def secret_indicator(market_data: MarketSnapshot, rng: Optional[np.random.Generator] = None) -> float:
+    """
+    Mock secret indicator calculation.
+    This is a proprietary trading indicator that takes market data and returns a score.
+    Higher scores indicate better buying opportunities.
+    Thin wrapper over `secret_indicator_batch` for a single snapshot; legacy
+    market data dicts are still accepted.
+    """
+    if not market_data:
+        raise ValueError("Market data is required for secret indicator calculation")
+    
+    if isinstance(market_data, MarketSnapshot):
+        columns = ([market_data.price], [market_data.volume], [market_data.market_cap], [market_data.change_24h])
+    else:
+        columns = (
+            [market_data.get("price", 0)],
+            [market_data.get("volume", 0)],
+            [market_data.get("market_cap", 0)],
+            [market_data.get("24h_change", 0)]
+        )
+    scores = secret_indicator_batch(*columns, rng=rng)
     
-    return round(normalized_score, 2) 
\ No newline at end of file
+    return float(scores[0])